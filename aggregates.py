@@ -0,0 +1,258 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from charts import histogram_bins, sampled_correlation
+
+# Dimensions of the aggregate cube, when present in the frame
+CUBE_COLUMNS = ["district_name", "Cadre", "designation_title"]
+
+# Datasets whose cubes are kept in memory
+AGGREGATE_CACHE_DATASETS = 16
+
+# Statistics of the numeric summary (all of them can be merged across appended rows)
+NUMERIC_STATS = ["count", "mean", "std", "min", "max"]
+
+
+def merge_numeric_summaries(first, second):
+    """Combine two numeric summaries (NUMERIC_STATS x columns) of disjoint rows exactly."""
+    if len(second.columns) == 0:
+        return first
+    if len(first.columns) == 0:
+        return second
+    n1, n2 = first.loc["count"], second.loc["count"]
+    n = n1 + n2
+    mean = (n1 * first.loc["mean"].fillna(0) + n2 * second.loc["mean"].fillna(0)) / n
+    delta = second.loc["mean"] - first.loc["mean"]
+    sum_squares = (first.loc["std"].fillna(0) ** 2 * (n1 - 1).clip(lower=0)
+                   + second.loc["std"].fillna(0) ** 2 * (n2 - 1).clip(lower=0)
+                   + (delta.fillna(0) ** 2) * n1 * n2 / n)
+    merged = pd.DataFrame(np.nan, index=NUMERIC_STATS, columns=first.columns)
+    merged.loc["count"] = n
+    merged.loc["mean"] = mean
+    merged.loc["std"] = np.sqrt(sum_squares / (n - 1))
+    merged.loc["min"] = np.fmin(first.loc["min"], second.loc["min"])
+    merged.loc["max"] = np.fmax(first.loc["max"], second.loc["max"])
+    return merged
+
+
+class AggregateCube:
+    """Precomputed aggregates of one dataset.
+
+    Holds row counts grouped by district x Cadre x designation (whichever of
+    them exist), the count, mean, std, min and max of each numeric column and
+    the per-column memory usage. Value counts of any dimension are rolled up
+    from the cube instead of the rows.
+    """
+
+    def __init__(self, counts, dims, n_rows, numeric_summary, memory_bytes, numeric_columns):
+        self.counts = counts
+        self.dims = dims
+        self.n_rows = n_rows
+        self.numeric_summary = numeric_summary
+        self.memory_bytes = memory_bytes
+        self.numeric_columns = numeric_columns
+        self._value_counts = {}
+        self._histograms = {}
+        self._correlation = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df):
+        """Scan df once and build its cube."""
+        dims = [column for column in CUBE_COLUMNS if column in df.columns]
+        if dims:
+            counts = df.groupby(dims, observed=True, dropna=False, sort=False).size()
+            counts = counts.rename("count").reset_index()
+        else:
+            counts = pd.DataFrame({"count": [len(df)]})
+
+        numeric = df.select_dtypes(include=["number"])
+        numeric_summary = numeric.agg(NUMERIC_STATS) if len(numeric.columns) else pd.DataFrame()
+        return cls(
+            counts,
+            dims,
+            len(df),
+            numeric_summary,
+            df.memory_usage(deep=True, index=False),
+            list(numeric.columns),
+        )
+
+    def value_counts(self, column):
+        """Return counts per value of a cube dimension, largest first (like Series.value_counts)."""
+        with self._lock:
+            if column not in self._value_counts:
+                counts = self.counts.groupby(column, observed=True, sort=False)["count"].sum()
+                counts = counts[counts > 0].sort_values(ascending=False, kind="stable")
+                counts.index = pd.Index(counts.index.astype(object), name=column)
+                self._value_counts[column] = counts
+            return self._value_counts[column]
+
+    def rows_where(self, column, value):
+        """Return the cube rows (combinations and counts) where column == value."""
+        return self.counts[self.counts[column] == value]
+
+    def histogram(self, df, column):
+        """Return (counts, edges) histogram bins of a numeric column, computed once."""
+        with self._lock:
+            if column not in self._histograms:
+                self._histograms[column] = histogram_bins(df[column].to_numpy(dtype="float64", na_value=np.nan))
+            return self._histograms[column]
+
+    def correlation(self, df):
+        """Correlation matrix of the numeric columns (sampled on large frames), computed once."""
+        with self._lock:
+            if self._correlation is None:
+                self._correlation = sampled_correlation(df, self.numeric_columns)
+            return self._correlation
+
+    def numeric_stat(self, column, stat):
+        """Return one of NUMERIC_STATS for a numeric column (None when it has no values)."""
+        value = self.numeric_summary.at[stat, column]
+        return None if pd.isna(value) else float(value)
+
+    def memory_usage(self):
+        """Total memory of the dataset in bytes, as measured when the cube was built."""
+        return int(self.memory_bytes.sum())
+
+    def appended(self, delta, df):
+        """Return the cube of df, where df is this cube's rows followed by delta.
+
+        Only the delta is scanned; its counts are added to the cube's and the
+        numeric summaries are merged. Falls back to a full build when delta
+        has different columns.
+        """
+        delta_cube = AggregateCube.from_frame(delta)
+        if delta_cube.dims != self.dims or delta_cube.numeric_columns != self.numeric_columns:
+            return AggregateCube.from_frame(df)
+
+        if self.dims:
+            counts = pd.concat([self.counts, delta_cube.counts], ignore_index=True)
+            for column in self.dims:
+                counts[column] = counts[column].astype(object)
+            counts = counts.groupby(self.dims, dropna=False, sort=False)["count"].sum().reset_index()
+            for column in self.dims:
+                counts[column] = counts[column].astype("category")
+        else:
+            counts = pd.DataFrame({"count": [self.n_rows + delta_cube.n_rows]})
+
+        # Text columns are categoricals whose size does not add up; measure those again (cheap)
+        memory_bytes = self.memory_bytes.add(delta_cube.memory_bytes, fill_value=0)
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                memory_bytes[column] = df[column].memory_usage(deep=True, index=False)
+
+        return AggregateCube(
+            counts,
+            self.dims,
+            self.n_rows + delta_cube.n_rows,
+            merge_numeric_summaries(self.numeric_summary, delta_cube.numeric_summary),
+            memory_bytes,
+            self.numeric_columns,
+        )
+
+    def remapped(self, changed, df=None):
+        """Return the cube after designation -> Cadre changes, without rescanning rows.
+
+        Cadre is a function of the designation, so relabeling the Cadre of the
+        affected designation cells and regrouping the (small) cube gives the
+        same result as rebuilding it from the remapped frame.
+        """
+        if not changed or "Cadre" not in self.dims or "designation_title" not in self.dims:
+            return self
+
+        counts = self.counts.copy()
+        cadre = counts["Cadre"].astype(object)
+        new_cadre = counts["designation_title"].astype(object).map(changed)
+        counts["Cadre"] = new_cadre.where(new_cadre.notna(), cadre).astype("category")
+        counts = counts.groupby(self.dims, observed=True, dropna=False, sort=False)["count"].sum()
+        counts = counts.reset_index()
+
+        memory_bytes = self.memory_bytes.copy()
+        if df is not None and "Cadre" in df.columns:
+            memory_bytes["Cadre"] = df["Cadre"].memory_usage(deep=True, index=False)
+
+        cube = AggregateCube(
+            counts, self.dims, self.n_rows, self.numeric_summary, memory_bytes, self.numeric_columns
+        )
+        # Numeric columns are unaffected by mappings
+        cube._histograms = self._histograms
+        cube._correlation = self._correlation
+        return cube
+
+
+class AggregateStore:
+    """LRU of aggregate cubes per dataset key.
+
+    Dataset keys are (dataset digest, mapping version). When a dataset is
+    requested at a newer mapping version and changes_since is provided, the
+    cube of the latest older version is remapped instead of rescanning the
+    frame.
+    """
+
+    def __init__(self, max_datasets=AGGREGATE_CACHE_DATASETS, changes_since=None):
+        self.max_datasets = max_datasets
+        self.changes_since = changes_since
+        self._cubes = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"builds": 0, "remaps": 0, "appends": 0, "hits": 0}
+
+    def _previous(self, dataset_key):
+        """Return the key of the newest cube of the same dataset at an older mapping version."""
+        if not isinstance(dataset_key, tuple) or len(dataset_key) != 2 or dataset_key[1] is None:
+            return None
+        digest, version = dataset_key
+        older = [key for key in self._cubes
+                 if isinstance(key, tuple) and len(key) == 2 and key[0] == digest
+                 and key[1] is not None and key[1] < version]
+        return max(older, key=lambda key: key[1]) if older else None
+
+    def _store(self, dataset_key, cube):
+        self._cubes[dataset_key] = cube
+        self._cubes.move_to_end(dataset_key)
+        while len(self._cubes) > self.max_datasets:
+            self._cubes.popitem(last=False)
+
+    def cube(self, dataset_key, df):
+        """Return the cube for a dataset, building or remapping it on first use."""
+        with self._lock:
+            cube = self._cubes.get(dataset_key)
+            if cube is not None:
+                self._cubes.move_to_end(dataset_key)
+                self.stats["hits"] += 1
+                return cube
+            previous = self._previous(dataset_key) if self.changes_since else None
+            previous_cube = self._cubes.get(previous) if previous else None
+
+        if previous_cube is not None and previous_cube.n_rows == len(df):
+            cube = previous_cube.remapped(self.changes_since(previous[1], dataset_key[1]), df)
+            stat = "remaps"
+        else:
+            cube = AggregateCube.from_frame(df)
+            stat = "builds"
+
+        with self._lock:
+            self.stats[stat] += 1
+            self._store(dataset_key, cube)
+        return cube
+
+    def append(self, dataset_key, previous_key, previous_df, delta, df):
+        """Store the cube of df (previous_df followed by delta) by extending the previous cube."""
+        cube = self.cube(previous_key, previous_df).appended(delta, df)
+        with self._lock:
+            self.stats["appends"] += 1
+            self._store(dataset_key, cube)
+        return cube
+
+    def value_counts(self, dataset_key, df, column):
+        """Return value counts of a column, rolled up from the cube when possible."""
+        cube = self.cube(dataset_key, df)
+        if column in cube.dims:
+            return cube.value_counts(column)
+        return df[column].value_counts()
+
+    def summary(self):
+        with self._lock:
+            return {**self.stats, "datasets": len(self._cubes)}
@@ -2,14 +2,29 @@ import os
 from dotenv import load_dotenv
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import google.generativeai as genai
-from langchain_google_genai import GoogleGenerativeAI
-from io import BytesIO
 
-# Load environment variables
+# Load environment variables (before the local modules read their settings)
 load_dotenv()
 
+import processing
+import llm
+import llm_batch
+from aggregates import AggregateCube, AggregateStore
+import instrumentation
+import startup
+from instrumentation import instrumented, span
+from charts import CORR_SAMPLE_ROWS, MAX_CORR_COLUMNS, correlation_figure, histogram_figure, pie_figure
+from pipeline_cache import PipelineCache, SessionLease, combined_digest, file_digest, make_cache_key
+from cadre_mapping import remap_changed, unmapped_designations
+from fuzzy_match import FuzzyMatcher
+from search_index import SEARCH_MODES, SearchIndex
+from dedup import DEDUP_ACROSS_UPLOADS, DEDUP_KEY_COLUMNS, Deduplicator, SeenHashStore
+from incremental import INCREMENTAL_PROCESSING, DeltaState, find_new_rows, lineage_key, raw_row_hashes
+from columnar_store import COLUMNAR_STORE_DIR, COLUMNAR_THRESHOLD_MB, ColumnarDataset, ColumnarView
+from views import PAGE_SIZES, FrameView, ViewCache, combine_masks, mask_positions, page_count
+from exporters import EXPORT_FORMATS, export_bytes, export_file_name, export_mime
+from ingestion import STREAMING_THRESHOLD_MB, supports_streaming
+
 # Get API key securely
 def get_api_key():
     """Get API key from environment variables or secrets."""
@@ -18,100 +33,200 @@ def get_api_key():
     except:
         return os.getenv('GOOGLE_API_KEY')
 
-# Set the API key
+# Set the API key (Gemini is configured when the first question needs it)
 GOOGLE_API_KEY = get_api_key()
 
-# Configure Gemini
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
 # Configure page settings
 st.set_page_config(page_title="Excel Automation App", layout="wide")
 
-# Declare CADRE_MAPPINGS at the top level of your script, before any functions
-CADRE_MAPPINGS = {
-    "District NSTOP Officer": "District Level",
-    "DCO/DHCSO": "District Level",
-    "Disease Surveillance Officer": "District Level",
-    "Immunization Officer": "District Level",
-    "Federal/Provincial/District Facilitator": "District Level",
-    "Divisional NSTOP Officer": "District Level",
-    "ComNET staff": "District Level",
-    "Area Coordinator / District Coordinator": "District Level",
-    "Provincial Facilitator (M&E, Campaign, HRMP, etc.)": "District Level",
-    "DDHO": "District Level",
-    "CEO/DHO": "District Level",
-    "DSV / ASV": "District Level",
-    "Federal Facilitator (UNICEF)": "Federal Level",
-    "EPI Coordinator": "Provincial Level",
-    "Provincial Facilitator (EPI, Coordinator etc)": "Provincial Level",
-    "Federal/Provincial/District Facilitator": "Provincial Level",
-    "TPO/ TDO": "Town Level",
-    "ComNET staff": "Town Level",
-    "TCO": "Town Level",
-    "UCPO / UCSP/ UCDO": "UC Level",
-    "UCMO": "UC Level",
-    "TTSP/TUSP": "UC Level",
-    "Social Mobilizers": "UC Level",
-    "Independent Monitor": "UC Level",
-}
-
-def upload_and_parse_file(uploaded_file):
-    """Handle file upload and parsing."""
+@st.cache_resource
+def start_warm_up():
+    """Import the LLM and plotting stacks in the background, once per process."""
+    return startup.warm_up_in_background()
+
+@st.cache_resource
+def get_mapping_store():
+    """Return the persistent, versioned designation → cadre mapping store."""
+    return processing.get_mapping_store()
+
+@st.cache_resource
+def get_seen_hash_store():
+    """Return the persisted row hashes of earlier uploads (for skipping repeated rows)."""
+    return SeenHashStore(key_columns=DEDUP_KEY_COLUMNS)
+
+@st.cache_resource
+def get_pipeline_cache():
+    """Return the process-wide cache of parsed, cleaned and mapped uploads."""
+    return PipelineCache()
+
+@instrumented("parse")
+def upload_and_parse_files(uploaded_files, all_sheets=True):
+    """Handle file upload and parsing of all files (and sheets) in parallel."""
     try:
-        # Detect file type and parse accordingly
-        if uploaded_file.name.endswith(".csv"):
-            df = pd.read_csv(uploaded_file)
-        else:
-            # Handle multi-level headers
-            df = pd.read_excel(uploaded_file, header=[0, 1])
-        
-        # If multi-level headers exist, combine them
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = [' '.join(str(col) for col in cols if str(col) != 'nan').strip() 
-                        for cols in df.columns.values]
-        
+        df = processing.parse_uploads(
+            [(uploaded_file, uploaded_file.name) for uploaded_file in uploaded_files], all_sheets
+        )
+        # Sheets that could not be parsed (notes, cover pages) are left out
+        for error in df.attrs.get("skipped_sheets", []):
+            st.warning(f"Skipped sheet {error}")
         return df
     except Exception as e:
         st.error(f"Error reading file: {str(e)}")
         return None
 
-def clean_data(df):
-    """Perform data cleaning on the DataFrame."""
+@instrumented("stream_process")
+def stream_and_process_file(uploaded_file, deduplicator=None, version=None):
+    """Read a large file in chunks, cleaning and mapping each chunk as it arrives."""
     try:
-        # Remove duplicate rows
-        df = df.drop_duplicates()
+        progress_bar = st.progress(0.0, text="Reading file...")
+        preview = st.empty()
         
-        # Fill NA values
-        df = df.fillna("N/A")
+        def on_chunk(chunk, progress, rows):
+            # Show the first rows as soon as the first chunk is ready
+            if rows == len(chunk):
+                preview.dataframe(chunk.head(50), use_container_width=True, height=300)
+            progress_bar.progress(progress or 0.0, text=f"Processed {rows:,} rows...")
         
-        # Remove leading/trailing whitespace from string columns
-        for col in df.select_dtypes(include=['object']):
-            df[col] = df[col].str.strip()
+        # Record the version up front so later mapping changes are picked up by update_mappings
+        store = get_mapping_store()
+        if version is None:
+            version = store.version()
         
+        uploaded_file.seek(0)
+        df = processing.stream_and_process_file(
+            uploaded_file, store.snapshot(version), version, on_chunk, deduplicator=deduplicator
+        )
+        progress_bar.empty()
+        preview.empty()
         return df
+    except Exception as e:
+        st.error(f"Error reading file: {str(e)}")
+        return None
+
+@instrumented("clean")
+def clean_data(df, compact=True, deduplicator=None):
+    """Perform data cleaning on the DataFrame."""
+    try:
+        return processing.clean_data(df, compact=compact, deduplicator=deduplicator)
     except Exception as e:
         st.error(f"Error cleaning data: {str(e)}")
         return df
 
-def map_designations(df, column_name="designation_title"):
-    """Map designations to cadres dynamically."""
+@instrumented("map")
+def map_designations(df, column_name="designation_title", version=None):
+    """Map designations to cadres dynamically (with the latest mappings unless version is given)."""
     try:
         if column_name not in df.columns:
             st.error(f"Column '{column_name}' not found in the uploaded file.")
             return df
 
-        # Create Cadre column using the mapping
-        df["Cadre"] = df[column_name].map(CADRE_MAPPINGS).fillna("Unmapped")
-        return df
+        # Create Cadre column from the shared mapping snapshot, looked up once per unique designation
+        store = get_mapping_store()
+        if version is None:
+            version = store.version()
+        return processing.map_designations(df, store.snapshot(version), version, column_name)
     except Exception as e:
         st.error(f"Error mapping designations: {str(e)}")
         return df
 
-def handle_new_designations(df, column_name="designation_title"):
-    """Handle new designations and update the CADRE_MAPPINGS dictionary."""
+@instrumented("remap")
+def update_mappings(df, column_name="designation_title", version=None):
+    """Bring the Cadre column up to the latest (or given) mapping version, remapping only changed rows."""
+    store = get_mapping_store()
+    if version is None:
+        version = store.version()
+    df_version = df.attrs.get("mapping_version")
+    if df_version is None:
+        return map_designations(df, column_name, version)
+    if df_version != version:
+        df = remap_changed(df, store.changes_since(df_version, version), column_name)
+        df.attrs["mapping_version"] = version
+    return df
+
+@st.cache_resource
+def get_delta_state():
+    """Return the on-disk record of the last processed upload of each dataset."""
+    return DeltaState()
+
+@instrumented("delta")
+def process_increment(raw, raw_hashes, lineage, dataset_digest, deduplicator, version=None):
+    """Clean and map only the rows added since the last upload of this dataset.
+    
+    Returns the combined frame, or None when the upload must be processed in
+    full (first upload, changed columns, removed rows or the previous frame
+    is no longer cached).
+    """
+    state = get_delta_state().load(lineage)
+    if state is None or state.get("columns") != [str(col) for col in raw.columns]:
+        return None
+    found = find_new_rows(raw_hashes, state["raw_hashes"])
+    if found is None:
+        return None
+    new_rows, mode = found
+    
+    previous = get_pipeline_cache().get(state["cache_key"])
+    if previous is None:
+        return None
+    store = get_mapping_store()
+    if version is None:
+        version = store.version()
+    if "Cadre" in previous.columns:
+        previous = update_mappings(previous, version=version)
+    
+    try:
+        deduplicator.remember(state["kept_hashes"])
+        df, delta = processing.process_delta(raw, previous, new_rows, store.snapshot(version), version, deduplicator)
+    except Exception as e:
+        st.error(f"Error processing new rows: {str(e)}")
+        return None
+    
+    # Extend the previous aggregates with the new rows instead of rescanning everything
+    get_aggregate_store().append(
+        (dataset_digest, df.attrs.get("mapping_version")),
+        (state["dataset_digest"], previous.attrs.get("mapping_version")),
+        previous, delta, df
+    )
+    df.attrs["delta_report"] = {
+        "mode": mode, "previous_rows": len(previous), "new_rows": len(new_rows), "added": len(delta)
+    }
+    return df
+
+@instrumented("delta_state")
+def record_delta_state(uploaded_files, all_sheets, lineage, cache_key, dataset_digest):
+    """Record the delta state of a dataset served from the pipeline cache.
+    
+    Without it, a dataset processed before incremental mode was switched on
+    (or only ever served from the cache) would be reprocessed in full on its
+    next appended upload. The upload is parsed and hashed, but not cleaned.
+    """
+    delta_state = get_delta_state()
+    state = delta_state.load(lineage)
+    if state is not None and state.get("cache_key") == cache_key:
+        return
+    if state is not None and state.get("dataset_digest") == dataset_digest:
+        # Same upload under a newer mapping version: only the cache key moved
+        raw_hashes, kept_hashes, columns = state["raw_hashes"], state["kept_hashes"], state["columns"]
+    else:
+        raw = upload_and_parse_files(uploaded_files, all_sheets)
+        if raw is None:
+            return
+        raw_hashes = raw_row_hashes(raw)
+        deduplicator = Deduplicator()
+        deduplicator.drop(raw)
+        kept_hashes = deduplicator.kept_hashes()
+        columns = [str(col) for col in raw.columns]
+    delta_state.save(
+        lineage, raw_hashes, kept_hashes, columns=columns, cache_key=cache_key, dataset_digest=dataset_digest
+    )
+
+@st.cache_resource(max_entries=4)
+def get_fuzzy_matcher(version):
+    """Build the fuzzy matcher over the known designations of a mapping version."""
+    return FuzzyMatcher(get_mapping_store().snapshot(version).keys())
+
+def handle_new_designations(df, current_designations, column_name="designation_title"):
+    """Handle new designations and save their cadres to the mapping store."""
     try:
-        current_designations = set(df[df['Cadre'] == 'Unmapped'][column_name].unique())
-        
         if current_designations:
             st.warning(f"📝 Found {len(current_designations)} new designation(s) that need mapping!")
             
@@ -125,30 +240,43 @@ def handle_new_designations(df, column_name="designation_title"):
             
             new_mappings = {}
             
+            # Suggest a cadre for each designation from its closest known designation
+            store = get_mapping_store()
+            version = store.version()
+            known_mappings = store.snapshot(version)
+            suggestions = get_fuzzy_matcher(version).suggest_many(current_designations)
+            
             with st.expander("Map New Designations", expanded=True):
                 st.markdown("### New Designations Found")
                 st.markdown("Please assign appropriate cadres to the following designations:")
                 
                 # Create a form for mapping new designations
                 for idx, designation in enumerate(current_designations):
+                    suggestion = suggestions.get(designation)
+                    suggested_cadre = known_mappings.get(suggestion[0]) if suggestion else None
+                    
                     col1, col2 = st.columns([2, 1])
                     with col1:
                         st.text(designation)
+                        if suggested_cadre:
+                            st.caption(f"Closest match: {suggestion[0]} ({suggestion[1]:.0%})")
                     with col2:
                         selected_cadre = st.selectbox(
                             "Select Cadre",
                             options=CADRE_LEVELS,
+                            index=CADRE_LEVELS.index(suggested_cadre) if suggested_cadre in CADRE_LEVELS else 0,
                             key=f"new_designation_{idx}"
                         )
                         new_mappings[designation] = selected_cadre
                 
                 # Button to confirm mappings
                 if st.button("Confirm New Mappings"):
-                    # Update CADRE_MAPPINGS
-                    CADRE_MAPPINGS.update(new_mappings)
+                    # Save the new mappings as a new version
+                    store = get_mapping_store()
+                    new_version, _ = store.update(new_mappings, note="Mapped from upload")
                     
-                    # Update the DataFrame with new mappings
-                    df["Cadre"] = df[column_name].map(CADRE_MAPPINGS).fillna("Unmapped")
+                    # Update only the rows whose designation changed
+                    df = update_mappings(df, column_name, new_version)
                     
                     st.success("✅ Mappings updated successfully!")
                     
@@ -159,7 +287,7 @@ def handle_new_designations(df, column_name="designation_title"):
                     
                     # Option to export updated mappings
                     if st.button("Export Updated Mappings"):
-                        export_mappings(CADRE_MAPPINGS)
+                        export_mappings(store.mappings())
         
         return df
                     
@@ -167,27 +295,78 @@ def handle_new_designations(df, column_name="designation_title"):
         st.error(f"Error handling new designations: {str(e)}")
         return df
 
-def show_interactive_preview(df):
-    """Show interactive data preview with enhanced features."""
+@st.cache_resource(max_entries=8)
+@instrumented("search_index")
+def get_search_index(dataset_key, _df):
+    """Build the search index for a dataset once and reuse it across reruns."""
+    return SearchIndex(_df)
+
+@st.cache_resource(max_entries=4, show_spinner="Writing columnar copy...")
+def get_columnar_dataset(dataset_key, _df):
+    """Write a dataset to a memory-mapped Arrow file once and query it from disk."""
+    path = os.path.join(COLUMNAR_STORE_DIR, f"{make_cache_key(*dataset_key)}.arrow")
+    return ColumnarDataset.from_frame(_df, path)
+
+@st.cache_resource
+def get_view_cache():
+    """Return the process-wide cache of filtered preview rows (positions per view)."""
+    return ViewCache()
+
+def preview_mask(df, search_index, dataset, search, search_cols, search_mode, filter_col, filter_value):
+    """Compose the search and the column filter into one boolean row mask (None: all rows)."""
+    masks = []
+    if search:
+        if dataset is not None:
+            masks.append(dataset.search(search, search_cols, search_mode))
+        else:
+            if search_index is None:
+                search_index = SearchIndex(df)
+            masks.append(search_index.search(search, search_cols, search_mode))
+    
+    if filter_col != "None":
+        kind, value = filter_value
+        if dataset is not None:
+            if kind == "range":
+                masks.append(dataset.filter_range(filter_col, *value))
+            else:
+                masks.append(dataset.filter_values(filter_col, list(value)))
+        else:
+            column = df[filter_col]
+            if kind == "range":
+                masks.append(((column >= value[0]) & (column <= value[1])).to_numpy(dtype=bool, na_value=False))
+            else:
+                masks.append(column.isin(list(value)).to_numpy(dtype=bool, na_value=False))
+    return combine_masks(masks)
+
+@instrumented("preview")
+def show_interactive_preview(df, search_index=None, cube=None, dataset=None, dataset_key=None):
+    """Show interactive data preview with enhanced features.
+    
+    Search and filters are composed into one row mask whose positions are
+    cached per view, and only the current page of rows is sent to the
+    browser. Returns a FrameView (or, with a ColumnarDataset, a ColumnarView
+    computed on disk) that is only copied when exported.
+    """
     st.subheader("📋 Interactive Data Preview")
+    columns = dataset.columns if dataset is not None else df.columns.tolist()
+    n_rows = len(dataset) if dataset is not None else len(df)
     
     # View options in an expander
     with st.expander("🔧 View Options", expanded=False):
         # Column selection
         cols = st.multiselect(
             "Select columns to display:",
-            df.columns.tolist(),
-            default=df.columns.tolist(),
+            columns,
+            default=columns,
             key="preview_columns"  # Added unique key
         )
         
-        # Row count slider
-        row_count = st.slider(
-            "Number of rows to display:",
-            min_value=5,
-            max_value=len(df),
-            value=min(50, len(df)),
-            key="row_count_slider"  # Added unique key
+        # Rows are paged server-side instead of sending the whole frame
+        page_size = st.selectbox(
+            "Rows per page:",
+            PAGE_SIZES,
+            index=PAGE_SIZES.index(50),
+            key="page_size_select"
         )
         
         # Index visibility
@@ -198,56 +377,100 @@ def show_interactive_preview(df):
         # Global search
         search = st.text_input("Search in all columns:", "", key="search_input")  # Added unique key
         
+        search_col1, search_col2 = st.columns([1, 2])
+        with search_col1:
+            search_mode = st.radio(
+                "Match mode:",
+                SEARCH_MODES,
+                horizontal=True,
+                key="search_mode_radio"
+            )
+        with search_col2:
+            search_cols = st.multiselect(
+                "Search only in these columns (all when empty):",
+                columns,
+                key="search_columns"
+            )
+        
         # Column-specific filters
         filter_col = st.selectbox(
             "Filter by column:",
-            ["None"] + df.columns.tolist(),
+            ["None"] + columns,
             key="filter_column_selectbox"  # Added unique key
         )
         
+        filter_value = None
         if filter_col != "None":
-            if df[filter_col].dtype in ['int64', 'float64']:
+            if dataset is not None:
+                numeric_filter = dataset.is_numeric(filter_col)
+            else:
+                numeric_filter = df[filter_col].dtype in ['int64', 'float64']
+            if numeric_filter:
                 # Numeric filter
+                if dataset is not None:
+                    low, high = dataset.min_max(filter_col)
+                else:
+                    low, high = df[filter_col].min(), df[filter_col].max()
                 min_val, max_val = st.slider(
                     f"Range for {filter_col}:",
-                    float(df[filter_col].min()),
-                    float(df[filter_col].max()),
-                    (float(df[filter_col].min()), float(df[filter_col].max())),
+                    float(low),
+                    float(high),
+                    (float(low), float(high)),
                     key=f"filter_{filter_col}_range_slider"  # Added unique key
                 )
+                filter_value = ("range", (min_val, max_val))
             else:
                 # Category filter
-                unique_vals = df[filter_col].unique().tolist()
+                if dataset is not None:
+                    unique_vals = dataset.unique(filter_col)
+                else:
+                    unique_vals = df[filter_col].unique().tolist()
                 selected_vals = st.multiselect(
                     f"Select values for {filter_col}:",
                     unique_vals,
                     default=unique_vals,
                     key=f"filter_{filter_col}_multiselect"  # Added unique key
                 )
+                filter_value = ("values", tuple(selected_vals))
     
-    # Apply filters
-    filtered_df = df.copy()
+    # Identify this view (search + filter) so its rows and exports can be cached
+    view_key = (search, search_mode, tuple(search_cols), filter_col)
+    if filter_value is not None:
+        kind, value = filter_value
+        view_key += value if kind == "range" else (tuple(str(val) for val in value),)
     
-    # Apply search
-    if search:
-        mask = filtered_df.astype(str).apply(
-            lambda x: x.str.contains(search, case=False, na=False)
-        ).any(axis=1)
-        filtered_df = filtered_df[mask]
-
-    # Fix the filter logic
-    if filter_col != "None":
-        if df[filter_col].dtype in ['int64', 'float64']:
-            filtered_df = filtered_df[
-                (filtered_df[filter_col] >= min_val) & 
-                (filtered_df[filter_col] <= max_val)
-            ]
+    # One mask for search and filters, kept as row positions per (dataset, view)
+    cache_key = (dataset_key, dataset is not None, view_key)
+    hit, positions = get_view_cache().get(cache_key) if dataset_key is not None else (False, None)
+    if not hit:
+        try:
+            positions = mask_positions(preview_mask(
+                df, search_index, dataset, search, search_cols, search_mode, filter_col, filter_value
+            ))
+        except ValueError as e:
+            st.error(f"Error in search: {str(e)}")
+            positions = None
         else:
-            filtered_df = filtered_df[filtered_df[filter_col].isin(selected_vals)]
-
-    # Show the filtered dataframe
+            if dataset_key is not None:
+                get_view_cache().put(cache_key, positions)
+    
+    filtered_df = ColumnarView(dataset, positions) if dataset is not None else FrameView(df, positions)
+    filtered_df.attrs["view_key"] = view_key
+    
+    # Back to the first page whenever the view changes
+    pages = page_count(len(filtered_df), page_size)
+    if st.session_state.get("preview_view_key") != (view_key, page_size):
+        st.session_state["preview_view_key"] = (view_key, page_size)
+        st.session_state["preview_page"] = 1
+    elif st.session_state.get("preview_page", 1) > pages:
+        st.session_state["preview_page"] = pages
+    
+    # Show the current page of the filtered rows
+    page_col, _ = st.columns([1, 3])
+    with page_col:
+        page = st.number_input(f"Page (of {pages:,}):", min_value=1, max_value=pages, step=1, key="preview_page")
     st.dataframe(
-        filtered_df[cols].head(row_count),
+        filtered_df.page(page - 1, page_size, cols),
         use_container_width=True,
         height=400,  # Fixed height for scrolling
         hide_index=hide_index,
@@ -256,27 +479,36 @@ def show_interactive_preview(df):
     # Show statistics
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.caption(f"Showing {len(filtered_df)} of {len(df)} rows")
+        first = min((page - 1) * page_size + 1, len(filtered_df))
+        last = min(page * page_size, len(filtered_df))
+        st.caption(f"Showing rows {first:,}–{last:,} of {len(filtered_df):,} matching ({n_rows:,} total)")
     with col2:
         st.caption(f"Selected {len(cols)} columns")
     with col3:
-        st.caption(f"Memory usage: {df.memory_usage().sum() / 1024:.2f} KB")
+        if dataset is not None:
+            st.caption(f"On disk (memory-mapped): {dataset.file_bytes / 1024:.2f} KB")
+        else:
+            memory_bytes = cube.memory_usage() if cube is not None else df.memory_usage().sum()
+            st.caption(f"Memory usage: {memory_bytes / 1024:.2f} KB")
     
     return filtered_df
 
-def show_visualizations(df):
-    """Display various visualizations of the data."""
+@instrumented("visualizations")
+def show_visualizations(df, cube=None, dataset=None):
+    """Display various visualizations of the data (histograms and correlation from dataset when given)."""
     try:
         st.subheader("📊 Data Visualizations")
+        if cube is None:
+            cube = AggregateCube.from_frame(df)
         
         # Cadre distribution if available
         if "Cadre" in df.columns:
             with st.expander("Cadre Distribution", expanded=True):
-                fig_cadre = px.pie(df, names="Cadre", title="Distribution of Cadres")
+                fig_cadre = pie_figure(cube.value_counts("Cadre"), "Distribution of Cadres")
                 st.plotly_chart(fig_cadre, use_container_width=True)
         
         # Numeric column distributions
-        numeric_cols = df.select_dtypes(include=['number']).columns
+        numeric_cols = cube.numeric_columns
         if len(numeric_cols) > 0:
             with st.expander("Numeric Distributions", expanded=False):
                 selected_column = st.selectbox(
@@ -284,128 +516,193 @@ def show_visualizations(df):
                     numeric_cols,
                     key="numeric_column"
                 )
-                fig_dist = px.histogram(
-                    df, 
-                    x=selected_column,
-                    title=f"Distribution of {selected_column}"
-                )
+                # Bins are computed server-side, so the chart size does not grow with rows
+                if dataset is not None:
+                    counts, edges = dataset.histogram(selected_column)
+                else:
+                    counts, edges = cube.histogram(df, selected_column)
+                fig_dist = histogram_figure(counts, edges, selected_column)
                 st.plotly_chart(fig_dist, use_container_width=True)
         
         # Correlation matrix for numeric columns
         if len(numeric_cols) > 1:
             with st.expander("Correlation Matrix", expanded=False):
-                corr_matrix = df[numeric_cols].corr()
-                fig_corr = px.imshow(
-                    corr_matrix,
-                    title="Correlation Matrix"
-                )
+                corr_matrix = dataset.correlation() if dataset is not None else cube.correlation(df)
+                if len(df) > CORR_SAMPLE_ROWS or len(numeric_cols) > MAX_CORR_COLUMNS:
+                    st.caption(
+                        f"Computed on up to {CORR_SAMPLE_ROWS:,} sampled rows and "
+                        f"the {MAX_CORR_COLUMNS} most variable columns"
+                    )
+                fig_corr = correlation_figure(corr_matrix)
                 st.plotly_chart(fig_corr, use_container_width=True)
                 
     except Exception as e:
         st.error(f"Error creating visualizations: {str(e)}")
 
-def query_gemini(df, question):
-    """Query Gemini AI with enhanced analytics capabilities"""
-    try:
+@st.cache_resource
+def get_aggregate_store():
+    """Return the per-dataset aggregate cubes shared by visualizations and AI context."""
+    return AggregateStore(changes_since=get_mapping_store().changes_since)
+
+@st.cache_resource
+def get_response_cache():
+    """Return the process-wide cache of AI responses."""
+    return llm.ResponseCache()
+
+@st.cache_resource
+def get_latency_stats():
+    """Return the process-wide answer latency record (local vs LLM)."""
+    return llm.LatencyStats()
+
+def get_llm_backend():
+    """Return the pooled client for the configured LLM backend (None without an API key)."""
+    if llm.LLM_BACKEND == "gemini":
         if not GOOGLE_API_KEY:
-            st.error("Google API Key not configured")
-            return "Error: API Key not found"
-            
-        llm = GoogleGenerativeAI(
-            model="gemini-1.5-pro",
-            google_api_key=GOOGLE_API_KEY,
-            temperature=0.1
-        )
-        
-        # Analyze the question to determine what data to include
-        question_lower = question.lower()
-        
-        # Initialize context parts
-        context_parts = []
-        
-        # Add basic dataset info
-        context_parts.append(f"Total Records: {len(df)}")
-        context_parts.append(f"Available Columns: {', '.join(df.columns.tolist())}")
-        
-        # Add relevant data based on question
-        if 'district' in question_lower:
-            district_counts = df['district_name'].value_counts()
-            context_parts.append("\nDistrict Information:")
-            context_parts.append(f"Total Districts: {len(district_counts)}")
-            context_parts.append("Top Districts by Count:")
-            context_parts.append(district_counts.head().to_string())
-            
-        if 'cadre' in question_lower:
-            cadre_counts = df['Cadre'].value_counts()
-            context_parts.append("\nCadre Information:")
-            context_parts.append(cadre_counts.to_string())
-            
-        if 'designation' in question_lower:
-            designation_counts = df['designation_title'].value_counts()
-            context_parts.append("\nDesignation Information:")
-            context_parts.append(designation_counts.head().to_string())
-            
-        # For questions about "most" or "highest"
-        if any(word in question_lower for word in ['most', 'highest', 'maximum', 'top']):
-            if 'district' in question_lower:
-                top_district = df['district_name'].value_counts().head(1)
-                context_parts.append(f"\nHighest Count District:")
-                context_parts.append(f"{top_district.index[0]}: {top_district.values[0]} records")
-        
-        # Combine all context parts
-        context = "\n".join(context_parts)
-        
-        prompt = f"""You are an expert Operational data analyst who has more than 15 years of experience in Polio Program internationally. Answer the following question using the provided data:
-
-        Context:
-        {context}
-
-        Question: {question}
-
-        Requirements for your answer:
-        1. Give ONLY the exact answer with specific numbers
-        2. For questions about "most" or "highest", give the specific name and count
-        3. Format: "[Name/Value] with [count] records" or similar
-        4. If asking about a specific column, give values from that column only
-        5. Do not mention other columns unless specifically asked
-        6. Do not explain methodology
-        7. Keep response to one sentence
-        8. If data isn't available, say "Data not available"
-
-        Examples:
-        Q: "Which district has most data?" 
-        A: "Karachi South with 1,234 records."
-        
-        Q: "What is the total count?"
-        A: "The dataset contains 5,678 total records."
+            return None
+        return llm.get_backend("gemini", api_key=GOOGLE_API_KEY)
+    return llm.get_backend(llm.LLM_BACKEND)
 
-        Answer the question directly and concisely."""
+@instrumented("llm_query")
+def query_gemini(df, question, dataset_key=None):
+    """Query Gemini AI with enhanced analytics capabilities"""
+    try:
+        # Without a dataset key, fall back to hashing the frame contents
+        if dataset_key is None:
+            dataset_key = int(pd.util.hash_pandas_object(df, index=False).sum())
 
         with st.spinner('Analyzing data...'):
-            response = llm.invoke(prompt)
+            response, context, source, seconds = llm.ask(
+                df,
+                question,
+                dataset_key,
+                get_llm_backend(),
+                get_aggregate_store(),
+                get_response_cache(),
+                get_latency_stats()
+            )
             
             # Debug logging
             st.session_state['last_context'] = context
             st.session_state['last_response'] = response
+            st.session_state['last_response_source'] = source
+            st.session_state['last_response_seconds'] = seconds
             
             return response
 
+    except llm.BackendUnavailable:
+        st.error("Google API Key not configured")
+        return "Error: API Key not found"
+
     except Exception as e:
         st.error(f"Error in analysis: {str(e)}")
         return "Error occurred during analysis"
 
-def export_data(df):
+@instrumented("llm_batch")
+def run_all_questions(df, questions, dataset_key=None):
+    """Run all suggested questions (and optionally follow-ups) concurrently."""
+    st.subheader("⚡ Full Report")
+    
+    with st.expander("Batch Settings", expanded=False):
+        concurrency = st.slider("Concurrent requests", 1, 16, llm_batch.LLM_CONCURRENCY, key="llm_concurrency")
+        rate_per_minute = st.number_input(
+            "Max requests per minute (0 = unlimited)",
+            min_value=0,
+            value=int(llm_batch.LLM_RATE_PER_MINUTE),
+            key="llm_rate_per_minute"
+        )
+        timeout = st.number_input(
+            "Timeout per request (seconds)",
+            min_value=1,
+            value=int(llm_batch.LLM_TIMEOUT_SECONDS),
+            key="llm_timeout"
+        )
+        retries = st.number_input("Retries", min_value=0, max_value=5, value=llm_batch.LLM_RETRIES, key="llm_retries")
+        include_follow_ups = st.checkbox("Include follow-up questions", value=False, key="llm_include_follow_ups")
+    
+    if not st.button("Run All Suggested Questions", key="run_all_questions"):
+        return None
+    
+    if get_llm_backend() is None:
+        st.warning("Google API Key not configured; only questions answerable locally will be answered")
+    
+    questions = list(questions)
+    if include_follow_ups:
+        questions += [llm_batch.follow_up_question(question) for question in questions]
+    
+    # One placeholder per question, filled in as each answer arrives
+    placeholders = []
+    for question in questions:
+        st.markdown(f"**{question}**")
+        placeholders.append(st.empty())
+        placeholders[-1].caption("Waiting...")
+    progress_bar = st.progress(0.0)
+    completed = []
+    
+    def on_result(idx, result):
+        completed.append(idx)
+        if result["error"]:
+            placeholders[idx].error(f"Failed after {result['attempts']} attempt(s): {result['error']}")
+        else:
+            placeholders[idx].markdown(
+                f"{result['response']}  \n*({result['source']}, {result['seconds'] * 1000:.0f} ms)*"
+            )
+        progress_bar.progress(len(completed) / len(questions))
+    
+    if dataset_key is None:
+        dataset_key = int(pd.util.hash_pandas_object(df, index=False).sum())
+    
+    try:
+        return llm_batch.run_questions(
+            df,
+            questions,
+            dataset_key,
+            get_llm_backend(),
+            get_aggregate_store(),
+            get_response_cache(),
+            concurrency=concurrency,
+            rate_per_minute=rate_per_minute,
+            timeout=timeout,
+            retries=retries,
+            on_result=on_result,
+            latency_stats=get_latency_stats()
+        )
+    except Exception as e:
+        st.error(f"Error in analysis: {str(e)}")
+        return None
+
+@st.cache_data(max_entries=16, show_spinner=False)
+@instrumented("export")
+def build_export(dataset_key, view_key, export_format, _df):
+    """Serialize a dataset view once per (dataset, filter, format) key."""
+    # Filtered views are only copied into a frame here, once per cached export
+    if isinstance(_df, (FrameView, ColumnarView)):
+        _df = _df.to_pandas()
+    return export_bytes(_df, export_format)
+
+def export_data(df, dataset_key=None):
     """Allow users to download the processed DataFrame."""
     try:
-        towrite = BytesIO()
-        df.to_excel(towrite, index=False, engine="openpyxl")
-        towrite.seek(0)
+        export_format = st.selectbox(
+            "Export format:",
+            list(EXPORT_FORMATS),
+            key="export_format_selectbox"
+        )
+        
+        # Build the file only on request; the same view is then served from cache
+        export_key = (dataset_key, df.attrs.get("view_key"), export_format)
+        if st.session_state.get("prepared_export") != export_key:
+            if not st.button("⚙️ Prepare Download", key="prepare_export_button"):
+                return None
+            st.session_state["prepared_export"] = export_key
+        
+        with st.spinner('Preparing export...'):
+            data = build_export(dataset_key, df.attrs.get("view_key"), export_format, df)
         
         return st.download_button(
             label="📥 Download Processed Data",
-            data=towrite,
-            file_name="processed_data.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            data=data,
+            file_name=export_file_name("processed_data", export_format),
+            mime=export_mime(export_format)
         )
     except Exception as e:
         st.error(f"Error exporting data: {str(e)}")
@@ -424,9 +721,122 @@ def export_mappings(mappings):
     except Exception as e:
         st.error(f"Error exporting mappings: {str(e)}")
 
+def find_previous_version(pipeline_cache, dataset_digest, version, lookback=10):
+    """Return the cache key of the newest older mapping version cached for a dataset."""
+    for previous in range(version - 1, max(version - 1 - lookback, 0), -1):
+        key = make_cache_key(dataset_digest, previous)
+        if pipeline_cache.contains(key):
+            return key
+    return None
+
+def show_cleaning_report(df):
+    """Show per-column memory savings from the cleaning step."""
+    report = df.attrs.get("cleaning_report")
+    if not report:
+        return
+    
+    report_df = pd.DataFrame(report)
+    saved = report_df["Saved (KB)"].sum()
+    before = report_df["Before (KB)"].sum()
+    with st.expander("🧹 Cleaning Report", expanded=False):
+        st.caption(
+            f"Memory: {before:,.2f} KB → {before - saved:,.2f} KB "
+            f"({saved:,.2f} KB saved)"
+        )
+        dedup_report = df.attrs.get("dedup_report")
+        if dedup_report:
+            st.caption(
+                f"Duplicates removed: {dedup_report['duplicates']:,} | "
+                f"Seen in earlier uploads: {dedup_report['seen_before']:,}"
+            )
+        st.dataframe(report_df, use_container_width=True, hide_index=True)
+
+def show_cache_stats(pipeline_cache):
+    """Show pipeline cache hit/miss counters in the sidebar."""
+    stats = pipeline_cache.summary()
+    with st.sidebar.expander("⚡ Pipeline Cache", expanded=False):
+        st.caption(
+            f"Hits: {stats['hits']} (from disk: {stats['spill_hits']}) | "
+            f"Misses: {stats['misses']}"
+        )
+        st.caption(
+            f"Entries: {stats['entries']} | "
+            f"Memory: {stats['used_mb']:.2f} / {stats['max_mb']:.0f} MB | "
+            f"Evictions: {stats['evictions']}"
+        )
+        st.caption(f"Sessions: {stats['sessions']} | Datasets shared by several sessions: {stats['shared']}")
+        cube_stats = get_aggregate_store().summary()
+        st.caption(
+            f"Aggregate cubes: {cube_stats['datasets']} | Built: {cube_stats['builds']} | "
+            f"Remapped: {cube_stats['remaps']} | Appended: {cube_stats['appends']} | Hits: {cube_stats['hits']}"
+        )
+
+def get_session_lease():
+    """Return this session's reference to the shared dataset it is viewing."""
+    if "dataset_lease" not in st.session_state:
+        st.session_state["dataset_lease"] = SessionLease(get_pipeline_cache())
+    return st.session_state["dataset_lease"]
+
+def get_span_recorder():
+    """Return this session's stage timing recorder."""
+    if "span_recorder" not in st.session_state:
+        st.session_state["span_recorder"] = instrumentation.SpanRecorder(
+            log_path=instrumentation.INSTRUMENTATION_LOG_PATH if instrumentation.INSTRUMENTATION_LOG else None
+        )
+    return st.session_state["span_recorder"]
+
+def show_diagnostics(recorder):
+    """Show per-stage timings and memory for the latest run in the sidebar."""
+    with st.sidebar.expander("🩺 Diagnostics", expanded=False):
+        spans = recorder.spans(recorder.run_id)
+        if spans:
+            st.caption("This run (slowest first):")
+            run = pd.DataFrame(spans).sort_values("seconds", ascending=False)
+            columns = [col for col in ["stage", "seconds", "rows_in", "rows_out", "rss_mb",
+                                       "rss_delta_mb", "peak_alloc_mb", "error"] if col in run.columns]
+            st.dataframe(run[columns], hide_index=True, use_container_width=True)
+        else:
+            st.caption("No stages ran in this run.")
+        
+        summary = recorder.summary()
+        if len(summary) > 0:
+            st.caption("All runs in this session:")
+            st.dataframe(summary, use_container_width=True)
+        
+        log_enabled = st.checkbox(
+            "Append spans to log file",
+            value=recorder.log_path is not None,
+            key="instrumentation_log",
+            help=f"Writes JSON lines to {instrumentation.INSTRUMENTATION_LOG_PATH}"
+        )
+        recorder.log_path = instrumentation.INSTRUMENTATION_LOG_PATH if log_enabled else None
+        recorder.trace_memory = st.checkbox(
+            "Trace Python allocations (slower)",
+            value=recorder.trace_memory,
+            key="instrumentation_trace_memory"
+        )
+        
+        # Which lazily imported stacks this process has loaded so far
+        loaded = [group for group, is_loaded in startup.loaded_groups().items() if is_loaded]
+        st.caption(f"Loaded on demand: {', '.join(loaded) or 'none yet'}")
+        warm_up_times = startup.warm_up_times()
+        if warm_up_times:
+            st.caption("Warm-up: " + ", ".join(
+                f"{module} {seconds:.2f}s" for module, seconds in warm_up_times.items() if seconds is not None
+            ))
+
 def main():
     """Main application function."""
     try:
+        # Record stage timings for this session's run
+        recorder = get_span_recorder()
+        instrumentation.set_recorder(recorder)
+        recorder.start_run()
+        
+        # Optionally load the LLM and plotting stacks while the first page renders
+        if startup.STARTUP_WARM_UP:
+            start_warm_up()
+        
         st.title("📊 Excel Automation App with Gemini AI")
         
         # Add sidebar for app navigation
@@ -464,49 +874,217 @@ def main():
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            uploaded_file = st.file_uploader("Upload your file (CSV/XLS/XLSX)", type=["csv", "xls", "xlsx"])
+            uploaded_files = st.file_uploader(
+                "Upload your file(s) (CSV/XLS/XLSX)",
+                type=["csv", "xls", "xlsx"],
+                accept_multiple_files=True
+            )
             
-            if uploaded_file:
+            if uploaded_files:
                 try:
-                    # Use the upload_and_parse_file function
-                    df = upload_and_parse_file(uploaded_file)
+                    uploaded_file = uploaded_files[0]
+                    read_all_sheets = st.sidebar.checkbox(
+                        "Read all sheets",
+                        value=True,
+                        key="read_all_sheets",
+                        help="Combine every sheet of each workbook, with source_file/source_sheet columns"
+                    )
+                    
+                    # Drop rows already processed in earlier uploads (e.g. overlapping reporting periods)
+                    skip_seen = st.sidebar.checkbox(
+                        "Skip rows seen in earlier uploads",
+                        value=DEDUP_ACROSS_UPLOADS,
+                        key="skip_seen_rows",
+                        help="Rows are matched on " + (", ".join(DEDUP_KEY_COLUMNS) or "all columns")
+                    )
+                    if skip_seen:
+                        seen_store = get_seen_hash_store()
+                        seen_stats = seen_store.summary()
+                        st.sidebar.caption(
+                            f"Remembered: {seen_stats['hashes']:,} rows from {seen_stats['uploads']} upload(s)"
+                        )
+                        if st.sidebar.button("Forget earlier uploads", key="forget_seen_rows"):
+                            seen_store.clear()
+                    
+                    # A single large CSV/XLSX file is streamed in chunks by default (first sheet only)
+                    file_mb = uploaded_file.size / (1024 * 1024)
+                    streaming = len(uploaded_files) == 1 and supports_streaming(uploaded_file.name) and st.sidebar.checkbox(
+                        "Streaming ingestion (large files)",
+                        value=file_mb >= STREAMING_THRESHOLD_MB,
+                        key="streaming_ingestion"
+                    )
+                    if streaming and read_all_sheets and not uploaded_file.name.lower().endswith(".csv"):
+                        st.sidebar.caption("Streaming reads only the first sheet; turn it off to combine all sheets.")
+                    
+                    # Reuse the processed frame when the same file(s) and mappings were seen before
+                    pipeline_cache = get_pipeline_cache()
+                    mapping_store = get_mapping_store()
+                    with span("hash_upload"):
+                        digests = [file_digest(f.getvalue(), f.name) for f in uploaded_files]
+                        if streaming:
+                            # Streamed frames hold the first sheet only, so they are cached apart
+                            upload_digest = combined_digest(digests, "streamed_first_sheet")
+                        elif len(digests) == 1 and not read_all_sheets:
+                            upload_digest = digests[0]
+                        else:
+                            upload_digest = combined_digest(digests, f"all_sheets={read_all_sheets}")
+                        # The rows kept depend on earlier uploads, so such results are cached under
+                        # the state of the seen-row store (saving another upload or forgetting changes it)
+                        dataset_digest = upload_digest
+                        if skip_seen:
+                            dataset_digest = combined_digest(
+                                [upload_digest], f"skip_seen={seen_store.fingerprint(exclude=upload_digest)}"
+                            )
+                    # Appended daily reports: process only the rows added since the last upload of the same files
+                    incremental = st.sidebar.checkbox(
+                        "Incremental processing (appended reports)",
+                        value=INCREMENTAL_PROCESSING,
+                        key="incremental_processing",
+                        help="Clean and map only rows that were not in the previous upload of the same file(s)"
+                    )
+                    lineage_options = f"all_sheets={read_all_sheets};skip_seen={skip_seen}"
+                    if skip_seen:
+                        # Forgetting earlier uploads starts every dataset afresh
+                        lineage_options += f";generation={seen_store.generation()}"
+                    lineage = lineage_key([f.name for f in uploaded_files], lineage_options)
+                    deduplicator = None
+                    if skip_seen:
+                        deduplicator = Deduplicator(store=seen_store, source=upload_digest)
+                    elif incremental:
+                        deduplicator = Deduplicator()
+                    current_version = mapping_store.version()
+                    cache_key = make_cache_key(dataset_digest, current_version)
+                    with span("cache_lookup") as record:
+                        df = pipeline_cache.get(cache_key)
+                        record["hit"] = df is not None
+                    
+                    if df is None:
+                        # Processed under an older mapping version: remap only the changed rows
+                        previous_key = find_previous_version(pipeline_cache, dataset_digest, current_version)
+                        if previous_key is not None:
+                            df = pipeline_cache.get(previous_key)
+                            if df is not None:
+                                if "Cadre" in df.columns:
+                                    df = update_mappings(df, version=current_version)
+                                pipeline_cache.put(cache_key, df)
+                    
+                    if df is not None and incremental and not streaming:
+                        # Served from the cache: still record it so the next appended upload is a delta
+                        record_delta_state(uploaded_files, read_all_sheets, lineage, cache_key, dataset_digest)
+                    
+                    if df is None and streaming:
+                        df = stream_and_process_file(uploaded_file, deduplicator, current_version)
+                        if df is not None:
+                            pipeline_cache.put(cache_key, df)
+                            if deduplicator is not None:
+                                deduplicator.commit()
+                    elif df is None:
+                        # Parse every file and sheet in parallel
+                        df = upload_and_parse_files(uploaded_files, read_all_sheets)
+                        if df is not None:
+                            raw_columns = [str(col) for col in df.columns]
+                            increment = None
+                            if incremental:
+                                with span("hash_rows", len(df)):
+                                    raw_hashes = raw_row_hashes(df)
+                                increment = process_increment(
+                                    df, raw_hashes, lineage, dataset_digest, deduplicator, current_version
+                                )
+                            
+                            if increment is not None:
+                                df = increment
+                            else:
+                                # Clean data with progress indicator
+                                with st.spinner('Cleaning data...'):
+                                    df = clean_data(df, deduplicator=deduplicator)
+                                
+                                # Map designations to cadres (if applicable)
+                                if "designation_title" in df.columns:
+                                    with st.spinner('Mapping designations to cadres...'):
+                                        df = map_designations(df, version=current_version)
+                            
+                            pipeline_cache.put(cache_key, df)
+                            if deduplicator is not None:
+                                deduplicator.commit()
+                            if incremental:
+                                get_delta_state().save(
+                                    lineage, raw_hashes, deduplicator.kept_hashes(),
+                                    columns=raw_columns, cache_key=cache_key, dataset_digest=dataset_digest
+                                )
+                    
+                    show_cache_stats(pipeline_cache)
+                    
                     if df is not None:
                         st.success("File uploaded successfully!")
+                        delta_report = df.attrs.get("delta_report")
+                        if delta_report:
+                            st.info(
+                                f"Incremental update: {delta_report['new_rows']:,} new rows processed "
+                                f"and appended to {delta_report['previous_rows']:,} earlier rows"
+                            )
                         
-                        # Clean data with progress indicator
-                        with st.spinner('Cleaning data...'):
-                            df = clean_data(df)
-                        
-                        # Map designations to cadres (if applicable)
                         if "designation_title" in df.columns:
-                            with st.spinner('Mapping designations to cadres...'):
-                                df = map_designations(df)
-                            
+                            with st.spinner('Checking designation mappings...'), span("unmapped_check", len(df)):
                                 # Show the unique designations that weren't mapped
-                                unmapped = df[df['Cadre'] == 'Unmapped']['designation_title'].unique()
+                                unmapped = unmapped_designations(df)
                                 if len(unmapped) > 0:
                                     st.warning(f"Found {len(unmapped)} unmapped designations!")
 
                                 # Handle new designations if any are unmapped
                                 if len(unmapped) > 0:
-                                    df = handle_new_designations(df)
-                                    # Reapply mapping after handling new designations
-                                    df = map_designations(df)
+                                    df = handle_new_designations(df, unmapped)
+                                    if df.attrs.get("mapping_version", current_version) != current_version:
+                                        pipeline_cache.put(
+                                            make_cache_key(dataset_digest, df.attrs["mapping_version"]), df
+                                        )
+                        
+                        # Identifies this dataset and mapping version for the per-dataset caches
+                        dataset_key = (dataset_digest, df.attrs.get("mapping_version"))
+                        # Keep the shared copy in memory while this session views it
+                        get_session_lease().hold(make_cache_key(dataset_digest, dataset_key[1] or current_version))
+                        
+                        # Counts and summaries computed once per dataset (remapped, not rebuilt, on new mappings)
+                        with span("aggregate_cube", len(df)):
+                            cube = get_aggregate_store().cube(dataset_key, df)
+                        
+                        # Large datasets are previewed and charted from a memory-mapped columnar copy
+                        out_of_core = st.sidebar.checkbox(
+                            "Out-of-core preview (on-disk Arrow)",
+                            value=cube.memory_usage() >= COLUMNAR_THRESHOLD_MB * 1024 * 1024,
+                            key="out_of_core_preview",
+                            help="Search, filter and chart from disk; only the shown rows are loaded"
+                        )
+                        if out_of_core:
+                            # Processing, mapping updates and AI answers still work on the in-memory frame
+                            st.sidebar.caption(
+                                "The processed data also stays in memory; the on-disk copy saves the "
+                                "search index and preview copies, not the dataset itself."
+                            )
+                        dataset = None
+                        if out_of_core:
+                            try:
+                                with span("columnar_store", len(df)):
+                                    dataset = get_columnar_dataset(dataset_key, df)
+                            except Exception as e:
+                                st.warning(f"Out-of-core preview unavailable, using memory: {str(e)}")
                         
                         if app_mode == "Data Processing":
-                            # Show interactive preview
-                            filtered_df = show_interactive_preview(df)
+                            show_cleaning_report(df)
+                            
+                            # Show interactive preview, searching through a per-dataset index
+                            search_index = get_search_index(dataset_key, df) if dataset is None else None
+                            filtered_df = show_interactive_preview(df, search_index, cube, dataset, dataset_key)
                             
                             # Export Options
                             st.subheader("📥 Export Options")
                             col1, col2 = st.columns(2)
                             with col1:
-                                export_data(filtered_df)
+                                export_data(filtered_df, dataset_key)
                             with col2:
-                                export_mappings(CADRE_MAPPINGS)
+                                export_mappings(mapping_store.mappings())
                         
                         elif app_mode == "Analysis & Visualization":
-                            show_visualizations(df)
+                            show_visualizations(df, cube, dataset)
                             
                             # Gemini AI Query Section
                             st.subheader("💬 Ask Gemini AI about your data")
@@ -534,9 +1112,11 @@ def main():
                             
                             if question:
                                 with st.spinner('Analyzing data...'):
-                                    response = query_gemini(df, question)
+                                    response = query_gemini(df, question, dataset_key)
                                     st.markdown("### Analysis Results")
                                     st.markdown(response)
+                                    if st.session_state.get('last_response_source') == "local":
+                                        st.caption("⚡ Answered locally from the data (no AI call)")
                                     
                                     # Add debug expander
                                     with st.expander("Debug Information", expanded=False):
@@ -546,16 +1126,36 @@ def main():
                                         if 'last_response' in st.session_state:
                                             st.text("Raw AI Response:")
                                             st.code(st.session_state['last_response'])
+                                        source = st.session_state.get('last_response_source')
+                                        if source:
+                                            st.caption(
+                                                f"Answered by: {source} in "
+                                                f"{st.session_state['last_response_seconds'] * 1000:.1f} ms"
+                                            )
+                                        latency = get_latency_stats().summary()
+                                        if latency:
+                                            st.caption("Latency by source:")
+                                            st.dataframe(pd.DataFrame.from_dict(latency, orient="index"))
+                                        cache_stats = get_response_cache().summary()
+                                        st.caption(
+                                            f"Response cache: {cache_stats['hits']} hits, "
+                                            f"{cache_stats['misses']} misses, {cache_stats['entries']} entries"
+                                        )
                                     
                                     if st.button("Generate Follow-up Questions", key="followup_questions"):
-                                        follow_up_prompt = f"Based on the previous analysis about '{question}', what are 3 relevant follow-up questions we could ask about this data?"
-                                        follow_up_response = query_gemini(df, follow_up_prompt)
+                                        follow_up_prompt = llm_batch.follow_up_question(question)
+                                        follow_up_response = query_gemini(df, follow_up_prompt, dataset_key)
                                         st.markdown("### Suggested Follow-up Questions")
                                         st.markdown(follow_up_response)
+                            
+                            # Answer every suggested question concurrently
+                            run_all_questions(df, suggested_questions[:-1], dataset_key)
                 
                 except Exception as e:
                     st.error(f"Error processing file: {str(e)}")
         
+        show_diagnostics(recorder)
+        
         # Add footer
         st.markdown("---")
         st.markdown("Built with Streamlit and Gemini AI")
@@ -0,0 +1,189 @@
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+# Load environment variables (before the local modules read their settings)
+load_dotenv()
+
+import pandas as pd
+
+import processing
+from cleaning import compact_frame
+from exporters import EXPORT_FORMATS, export_file_name, write_export
+
+SUPPORTED_EXTENSIONS = (".csv", ".xls", ".xlsx")
+OUTPUT_FORMATS = list(EXPORT_FORMATS)
+
+
+def collect_inputs(paths):
+    """Expand files, directories and glob patterns into a sorted list of input files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = [os.path.join(path, name) for name in os.listdir(path)]
+        else:
+            candidates = glob.glob(path) or [path]
+        files.extend(
+            candidate for candidate in candidates
+            if os.path.isfile(candidate) and candidate.lower().endswith(SUPPORTED_EXTENSIONS)
+        )
+    return sorted(dict.fromkeys(files))
+
+
+def write_output(df, path, output_format):
+    """Write a processed frame straight to disk in the requested format."""
+    write_export(df, path, output_format)
+
+
+def process_one(path, mappings, version, output_dir, output_format, streaming, keep_frame,
+                all_sheets=False):
+    """Process one file in a worker process and write its output."""
+    start = time.perf_counter()
+    result = {"file": path, "worker": os.getpid(), "rows": 0, "output": None, "error": None}
+    try:
+        df = processing.process_file(path, mappings, version, streaming=streaming, file_name=path,
+                                     all_sheets=all_sheets)
+
+        stem = os.path.splitext(os.path.basename(path))[0]
+        output = os.path.join(output_dir, export_file_name(f"{stem}_processed", output_format))
+        write_output(df, output, output_format)
+
+        result["rows"] = len(df)
+        result["output"] = output
+        result["skipped_sheets"] = df.attrs.get("skipped_sheets", [])
+        if keep_frame:
+            if processing.SOURCE_FILE_COLUMN not in df.columns:
+                df.insert(0, processing.SOURCE_FILE_COLUMN, os.path.basename(path))
+            result["frame"] = df
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def throughput_summary(results, wall_seconds):
+    """Summarize rows/s and files/s overall and per worker process."""
+    done = [r for r in results if r["error"] is None]
+    total_rows = sum(r["rows"] for r in done)
+
+    workers = {}
+    for r in done:
+        stats = workers.setdefault(r["worker"], {"files": 0, "rows": 0, "busy_seconds": 0.0})
+        stats["files"] += 1
+        stats["rows"] += r["rows"]
+        stats["busy_seconds"] += r["seconds"]
+    for stats in workers.values():
+        busy = stats["busy_seconds"] or float("nan")
+        stats["rows_per_s"] = round(stats["rows"] / busy, 1)
+        stats["files_per_s"] = round(stats["files"] / busy, 3)
+        stats["busy_seconds"] = round(stats["busy_seconds"], 3)
+
+    wall = wall_seconds or float("nan")
+    return {
+        "files": len(results),
+        "succeeded": len(done),
+        "failed": len(results) - len(done),
+        "rows": total_rows,
+        "wall_seconds": round(wall_seconds, 3),
+        "rows_per_s": round(total_rows / wall, 1),
+        "files_per_s": round(len(done) / wall, 3),
+        "workers": {str(pid): stats for pid, stats in workers.items()},
+    }
+
+
+def run_batch(paths, output_dir, workers=None, output_format="xlsx", combined=None,
+              streaming=False, mapping_db=None, all_sheets=False):
+    """Process many files in a process pool; returns (results, summary)."""
+    files = collect_inputs(paths)
+    if not files:
+        raise ValueError("No CSV/XLS/XLSX input files found")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Read mappings once in the parent so workers never touch the SQLite store
+    store = processing.get_mapping_store(mapping_db)
+    version = store.version()
+    mappings = store.mappings(version)
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(process_one, path, mappings, version, output_dir,
+                            output_format, streaming, combined is not None, all_sheets)
+            for path in files
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            status = result["error"] or f"{result['rows']:,} rows in {result['seconds']:.2f}s"
+            print(f"[{result['worker']}] {result['file']}: {status}")
+            for error in result.get("skipped_sheets", []):
+                print(f"  skipped sheet {error}")
+            results.append(result)
+
+    # Concatenate all frames once, in input order
+    if combined is not None:
+        order = {path: idx for idx, path in enumerate(files)}
+        frames = [r.pop("frame") for r in sorted(results, key=lambda r: order[r["file"]])
+                  if "frame" in r]
+        if frames:
+            combined_df = compact_frame(pd.concat(frames, ignore_index=True))
+            write_output(combined_df, os.path.join(output_dir, combined), output_format)
+
+    summary = throughput_summary(results, time.perf_counter() - start)
+    summary["mapping_version"] = version
+    return results, summary
+
+
+def main(argv=None):
+    """Command-line entry point for headless batch processing."""
+    parser = argparse.ArgumentParser(
+        description="Parse, clean and map many EOC files in parallel without the Streamlit UI."
+    )
+    parser.add_argument("inputs", nargs="+", help="Input files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="processed", help="Directory for outputs")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Worker processes (default: number of CPUs)")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="xlsx",
+                        help="Output format for per-file and combined outputs")
+    parser.add_argument("--combined", default=None, metavar="NAME",
+                        help="Also write all rows to one combined file with this name")
+    parser.add_argument("--stream", action="store_true", help="Use chunked streaming ingestion")
+    parser.add_argument("--all-sheets", action="store_true",
+                        help="Read every sheet of each workbook (adds a source_sheet column)")
+    parser.add_argument("--mapping-db", default=None, help="Path to the cadre mapping database")
+    parser.add_argument("--summary", default=None,
+                        help="Where to write the JSON throughput summary "
+                             "(default: <output-dir>/batch_summary.json)")
+    args = parser.parse_args(argv)
+
+    combined = args.combined
+    if combined and not os.path.splitext(combined)[1]:
+        combined = export_file_name(combined, args.format)
+
+    results, summary = run_batch(
+        args.inputs, args.output_dir, args.workers, args.format,
+        combined, args.stream, args.mapping_db, args.all_sheets
+    )
+
+    summary_path = args.summary or os.path.join(args.output_dir, "batch_summary.json")
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=4)
+
+    print(
+        f"\nProcessed {summary['succeeded']}/{summary['files']} files, {summary['rows']:,} rows "
+        f"in {summary['wall_seconds']:.2f}s ({summary['rows_per_s']:,.1f} rows/s, "
+        f"{summary['files_per_s']:.3f} files/s)"
+    )
+    if summary["workers"]:
+        print(pd.DataFrame.from_dict(summary["workers"], orient="index").to_string())
+    print(f"Summary written to {summary_path}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
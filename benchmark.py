@@ -0,0 +1,232 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+# Load environment variables (before the local modules read their settings)
+load_dotenv()
+
+import numpy as np
+import pandas as pd
+
+import llm
+import processing
+from aggregates import AggregateStore
+from columnar_store import ColumnarDataset
+from exporters import EXPORT_FORMATS, export_bytes
+from instrumentation import SpanRecorder, row_count
+from search_index import SearchIndex
+from startup import import_report
+from synthetic_data import SIZES, XLSX_MAX_ROWS, generate_eoc_frame, write_eoc_file
+
+# Questions whose context is built in the "context" stage (the app's suggested questions)
+BENCHMARK_QUESTIONS = [
+    "How many total records are in the dataset?",
+    "What is the exact count and percentage for each Cadre level?",
+    "How many unmapped designations are there?",
+    "What is the most common Cadre level?",
+    "What percentage of staff is at the District Level?",
+    "Which district has most data?",
+]
+
+SEARCH_TERMS = ["ucmo", "coordinator", "karachi"]
+
+
+def run_size(n_rows, work_dir, input_format="auto", export_formats=("xlsx",), seed=0,
+             streaming=False, trace_memory=False, columnar=False):
+    """Benchmark every pipeline stage on one synthetic dataset; returns the stage records."""
+    recorder = SpanRecorder(trace_memory=trace_memory)
+
+    def timed(stage, func, rows_in=None):
+        gc.collect()
+        with recorder.span(stage, rows_in) as record:
+            result = func()
+            record["rows_out"] = row_count(result)
+        print(f"  {stage:<14} {record['seconds']:>9.3f}s  rss {record.get('rss_mb', '-')} MB")
+        return result
+
+    # Setup: generate and write the input file (not part of the app's pipeline)
+    if input_format == "auto":
+        input_format = "xlsx" if n_rows <= XLSX_MAX_ROWS else "csv"
+    path = os.path.join(work_dir, f"eoc_{n_rows}.{input_format}")
+    df = timed("generate", lambda: generate_eoc_frame(n_rows, seed=seed))
+    timed("write_input", lambda: write_eoc_file(df, path), len(df))
+    del df
+
+    store = processing.get_mapping_store(os.path.join(work_dir, "mappings.db"))
+    version = store.version()
+    mappings = store.mappings(version)
+
+    if streaming:
+        df = timed("stream_process", lambda: processing.stream_and_process_file(
+            path, mappings, version, file_name=path
+        ))
+    else:
+        df = timed("parse", lambda: processing.upload_and_parse_file(path))
+        df = timed("clean", lambda: processing.clean_data(df), len(df))
+        df = timed("map", lambda: processing.map_designations(df, mappings, version), len(df))
+
+    # Preview: build the search index, search and filter as the preview does
+    index = timed("search_index", lambda: SearchIndex(df), len(df))
+
+    def search():
+        masks = [index.search(term, mode="Contains") for term in SEARCH_TERMS]
+        return df[np.logical_or.reduce(masks)]
+    timed("search", search, len(df))
+
+    def filter_rows():
+        districts = df["district_name"].value_counts().index[:3]
+        return df[df["district_name"].isin(districts)]
+    timed("filter", filter_rows, len(df))
+
+    # Out-of-core preview: the same search and filter on the memory-mapped Arrow copy
+    if columnar:
+        dataset = timed("columnar_write", lambda: ColumnarDataset.from_frame(
+            df, os.path.join(work_dir, f"eoc_{n_rows}.arrow")
+        ), len(df))
+
+        def columnar_search():
+            masks = [dataset.search(term, mode="Contains") for term in SEARCH_TERMS]
+            return dataset.head(50, mask=np.logical_or.reduce(masks))
+        timed("columnar_search", columnar_search, len(df))
+
+        def columnar_filter():
+            districts = list(dataset.value_counts("district_name").index[:3])
+            return dataset.head(50, mask=dataset.filter_values("district_name", districts))
+        timed("columnar_filter", columnar_filter, len(df))
+        del dataset
+
+    for export_format in export_formats:
+        if export_format == "xlsx" and len(df) > XLSX_MAX_ROWS:
+            print(f"  export_{export_format}: skipped (more rows than an XLSX sheet holds)")
+            continue
+        data = timed(f"export_{export_format}", lambda: export_bytes(df, export_format), len(df))
+        recorder.spans()[-1]["bytes"] = len(data)
+        del data
+
+    # Context building for the suggested questions, including the aggregate cube
+    def build_contexts():
+        aggregates = AggregateStore()
+        return [llm.build_context(df, question, ("benchmark", version), aggregates)
+                for question in BENCHMARK_QUESTIONS]
+    timed("context", build_contexts, len(df))
+
+    return [{key: value for key, value in record.items() if key not in ("run", "depth")}
+            for record in recorder.spans()]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def environment_info():
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline):
+    """Print the time ratio of every stage against a baseline results file."""
+    base = {
+        (run["rows"], stage["stage"]): stage
+        for run in baseline["runs"] for stage in run["stages"]
+    }
+    print(f"\nCompared with {baseline['environment'].get('commit')} "
+          f"({baseline['environment'].get('timestamp')}):")
+    for run in results["runs"]:
+        for stage in run["stages"]:
+            before = base.get((run["rows"], stage["stage"]))
+            if not before or not before["seconds"]:
+                continue
+            ratio = stage["seconds"] / before["seconds"]
+            print(f"  {run['rows']:>10,} {stage['stage']:<14} {before['seconds']:>9.3f}s -> "
+                  f"{stage['seconds']:>9.3f}s  ({ratio:.2f}x)")
+
+    base_imports = {row["module"]: row for row in baseline.get("imports", [])}
+    for row in results.get("imports", []):
+        before = base_imports.get(row["module"])
+        if not before or not before["seconds"] or row["seconds"] is None:
+            continue
+        print(f"  {'import':>10} {row['module']:<14} {before['seconds']:>9.3f}s -> "
+              f"{row['seconds']:>9.3f}s  ({row['seconds'] / before['seconds']:.2f}x)")
+
+
+def main(argv=None):
+    """Command-line entry point for the benchmark suite."""
+    parser = argparse.ArgumentParser(
+        description="Time and memory-profile each pipeline stage on synthetic EOC data."
+    )
+    parser.add_argument("-s", "--sizes", nargs="+", default=["10k"],
+                        help=f"Dataset sizes: {', '.join(SIZES)} or a row count")
+    parser.add_argument("--input-format", choices=["auto", "xlsx", "csv"], default="auto",
+                        help="Input file format (auto: XLSX when it fits in one sheet)")
+    parser.add_argument("-e", "--export-formats", nargs="+", choices=list(EXPORT_FORMATS),
+                        default=["xlsx"], help="Export formats to benchmark")
+    parser.add_argument("--stream", action="store_true", help="Use chunked streaming ingestion")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also record peak Python allocations with tracemalloc (slower)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Also benchmark the out-of-core (memory-mapped Arrow) preview")
+    parser.add_argument("--imports", action="store_true",
+                        help="Also record the app's import-time (cold start) report")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None,
+                        help="Results JSON (default: benchmark_results/<timestamp>.json)")
+    parser.add_argument("--compare", default=None, metavar="BASELINE",
+                        help="Results JSON of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    results = {"environment": environment_info(), "runs": []}
+    if args.imports:
+        results["imports"] = import_report()
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in args.sizes:
+            n_rows = SIZES.get(size.lower()) or int(size)
+            print(f"\n{n_rows:,} rows")
+            stages = run_size(
+                n_rows, work_dir, args.input_format, args.export_formats, args.seed,
+                args.stream, args.trace_memory, args.columnar
+            )
+            results["runs"].append({
+                "rows": n_rows,
+                "streaming": args.stream,
+                "trace_memory": args.trace_memory,
+                "columnar": args.columnar,
+                "stages": stages,
+            })
+
+    output = args.output
+    if output is None:
+        os.makedirs("benchmark_results", exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join("benchmark_results", f"{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
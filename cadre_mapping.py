@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+UNMAPPED = "Unmapped"
+
+
+def _designation_codes(df, column_name):
+    """Return (codes, categories) for the designation column, categorizing it if needed."""
+    if not isinstance(df[column_name].dtype, pd.CategoricalDtype):
+        df[column_name] = df[column_name].astype("category")
+    column = df[column_name]
+    return column.cat.codes.to_numpy(), column.cat.categories
+
+
+def apply_mappings(df, mappings, column_name="designation_title"):
+    """Create the Cadre column by mapping the unique designations only.
+
+    Each designation category is looked up once and the result is spread to
+    the rows through the categorical codes, so the cost grows with the number
+    of distinct designations rather than rows.
+    """
+    codes, designations = _designation_codes(df, column_name)
+    cadres = [mappings.get(designation, UNMAPPED) for designation in designations]
+
+    cadre_categories = pd.Index(sorted(set(cadres) | {UNMAPPED}), dtype=object)
+    lookup = cadre_categories.get_indexer(cadres)
+    # Missing designations (code -1) are unmapped, like NaN.map(...) was before
+    lookup = np.append(lookup, cadre_categories.get_loc(UNMAPPED))
+
+    df["Cadre"] = pd.Categorical.from_codes(lookup[codes], categories=cadre_categories)
+    return df
+
+
+def remap_changed(df, changed, column_name="designation_title"):
+    """Update Cadre only on rows whose designation appears in changed."""
+    if "Cadre" not in df.columns or not isinstance(df["Cadre"].dtype, pd.CategoricalDtype):
+        raise ValueError("Cadre must be a categorical column created by apply_mappings")
+
+    codes, designations = _designation_codes(df, column_name)
+    affected = designations.get_indexer(list(changed))
+    affected = affected[affected >= 0]
+    if len(affected) == 0:
+        return df
+
+    cadre = df["Cadre"].cat.add_categories(
+        [value for value in set(changed.values()) if value not in df["Cadre"].cat.categories]
+    )
+    cadre_codes = cadre.cat.codes.to_numpy().copy()
+    categories = cadre.cat.categories
+
+    # Per designation code, the new cadre code (or -1 when unaffected)
+    new_codes = np.full(len(designations), -1)
+    for code in affected:
+        new_codes[code] = categories.get_loc(changed[designations[code]])
+
+    rows = np.flatnonzero(np.isin(codes, affected))
+    cadre_codes[rows] = new_codes[codes[rows]]
+
+    df["Cadre"] = pd.Categorical.from_codes(cadre_codes, categories=categories)
+    return df
+
+
+def unmapped_designations(df, column_name="designation_title"):
+    """Return the designations present in df that have no cadre, in O(unique) lookups."""
+    codes, designations = _designation_codes(df, column_name)
+    if len(designations) == 0:
+        return []
+
+    # Cadre of each designation category, taken from any row that uses it
+    present = np.bincount(codes[codes >= 0], minlength=len(designations)) > 0
+    sample_row = np.zeros(len(designations), dtype=np.int64)
+    valid = np.flatnonzero(codes >= 0)
+    sample_row[codes[valid]] = valid
+
+    cadre_codes = df["Cadre"].cat.codes.to_numpy()
+    unmapped_code = df["Cadre"].cat.categories.get_indexer([UNMAPPED])[0]
+    return [
+        designations[code]
+        for code in np.flatnonzero(present)
+        if cadre_codes[sample_row[code]] == unmapped_code
+    ]
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+# Pie slices beyond this are merged into "Other"
+MAX_PIE_SLICES = 12
+
+# Histogram bins computed server-side
+HISTOGRAM_BINS = 50
+
+# Correlation is computed on a sample of rows above this size
+CORR_SAMPLE_ROWS = 200000
+
+# Only the most variable numeric columns are shown in the correlation matrix
+MAX_CORR_COLUMNS = 40
+
+
+def top_counts(counts, max_slices=MAX_PIE_SLICES):
+    """Keep the largest counts and merge the rest into an "Other" entry."""
+    if len(counts) <= max_slices:
+        return counts
+    top = counts.iloc[:max_slices - 1]
+    other = pd.Series([counts.iloc[max_slices - 1:].sum()], index=["Other"])
+    return pd.concat([top, other])
+
+
+def histogram_bins(values, bins=HISTOGRAM_BINS):
+    """Return (counts, edges) of the finite values with np.histogram."""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(1)
+    # A constant column still gets one visible bin
+    if values.min() == values.max():
+        bins = 1
+    return np.histogram(values, bins=bins)
+
+
+def sampled_correlation(df, columns, sample_rows=CORR_SAMPLE_ROWS,
+                        max_columns=MAX_CORR_COLUMNS, seed=0):
+    """Correlation matrix of numeric columns on at most sample_rows rows.
+
+    Wide frames keep only the max_columns columns with the highest variance.
+    """
+    columns = list(columns)
+    if len(columns) > max_columns:
+        variances = df[columns].var(numeric_only=True).sort_values(ascending=False)
+        columns = list(variances.index[:max_columns])
+    frame = df[columns]
+    if len(frame) > sample_rows:
+        rows = np.random.default_rng(seed).choice(len(frame), sample_rows, replace=False)
+        frame = frame.iloc[np.sort(rows)]
+    return frame.corr()
+
+
+def pie_figure(counts, title):
+    """Pie chart from precomputed counts (one value per slice)."""
+    import plotly.express as px
+
+    counts = top_counts(counts)
+    return px.pie(names=counts.index.astype(str), values=counts.to_numpy(), title=title)
+
+
+def histogram_figure(counts, edges, column):
+    """Bar chart of precomputed histogram bins (one bar per bin)."""
+    import plotly.graph_objects as go
+
+    centers = (edges[:-1] + edges[1:]) / 2
+    fig = go.Figure(go.Bar(x=centers, y=counts, width=np.diff(edges), name=column))
+    fig.update_layout(
+        title=f"Distribution of {column}",
+        xaxis_title=column,
+        yaxis_title="count",
+        bargap=0
+    )
+    return fig
+
+
+def correlation_figure(corr_matrix):
+    """Heatmap of a correlation matrix."""
+    import plotly.express as px
+
+    return px.imshow(corr_matrix, title="Correlation Matrix")
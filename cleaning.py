@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from dedup import Deduplicator
+
+# Columns that are always stored as categoricals, whatever their cardinality
+CATEGORY_COLUMNS = ["district_name", "designation_title", "Cadre"]
+
+# Other text columns become categoricals when unique values / rows is at most this ratio
+CATEGORY_MAX_RATIO = 0.5
+
+# Placeholder used for missing text values (numeric columns keep real nulls)
+MISSING_TEXT = "N/A"
+
+
+def string_columns(df):
+    """Return the names of text (object/string) columns."""
+    return [col for col in df.columns
+            if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])]
+
+
+def clean_text_column(series, as_category):
+    """Strip and fill one text column by working on its unique values only.
+
+    The column is factorized once; stripping and null filling happen on the
+    uniques, and the result is rebuilt from the codes either as a categorical
+    or as a plain object column.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+
+    # Strip the unique strings, leaving any non-string values untouched
+    uniques = pd.Series(np.asarray(uniques, dtype=object), dtype=object)
+    stripped = uniques.map(lambda value: value.strip() if isinstance(value, str) else value)
+
+    # Stripping can merge values ("UCMO " and "UCMO"), so factorize the uniques again
+    stripped_codes, categories = pd.factorize(stripped, use_na_sentinel=True)
+    categories = list(categories)
+
+    # Missing values share a single placeholder entry
+    if (codes < 0).any():
+        if MISSING_TEXT in categories:
+            missing_code = categories.index(MISSING_TEXT)
+        else:
+            categories.append(MISSING_TEXT)
+            missing_code = len(categories) - 1
+        merged = np.where(codes < 0, missing_code, stripped_codes[np.maximum(codes, 0)])
+    else:
+        merged = stripped_codes[codes]
+
+    if as_category:
+        # Mixed-type columns cannot always form categories; fall back to plain values
+        try:
+            values = pd.Categorical.from_codes(merged, categories=pd.Index(categories, dtype=object))
+            return pd.Series(values, index=series.index, name=series.name)
+        except (TypeError, ValueError):
+            pass
+
+    values = np.asarray(categories, dtype=object).take(merged) if categories else merged.astype(object)
+    result = pd.Series(values, index=series.index, name=series.name, dtype=object)
+
+    # Keep compact string dtypes (e.g. pandas' Arrow-backed "str") for high-cardinality text
+    if pd.api.types.is_string_dtype(series.dtype) and not pd.api.types.is_object_dtype(series.dtype):
+        result = result.astype(series.dtype)
+    return result
+
+
+def memory_report(before, after):
+    """Return per-column memory usage before and after cleaning as a list of dicts."""
+    report = []
+    for col in after.index:
+        before_bytes = int(before.get(col, 0))
+        after_bytes = int(after[col])
+        report.append({
+            "Column": col,
+            "Before (KB)": round(before_bytes / 1024, 2),
+            "After (KB)": round(after_bytes / 1024, 2),
+            "Saved (KB)": round((before_bytes - after_bytes) / 1024, 2),
+        })
+    return report
+
+
+def compact_frame(df, category_columns=CATEGORY_COLUMNS, max_ratio=CATEGORY_MAX_RATIO):
+    """Strip text columns and convert low-cardinality ones to categoricals."""
+    rows = max(len(df), 1)
+    for col in string_columns(df):
+        as_category = col in category_columns or df[col].nunique(dropna=False) / rows <= max_ratio
+        df[col] = clean_text_column(df[col], as_category)
+    return df
+
+
+def _as_categorical(series):
+    """Return series as a Categorical with object categories, factorizing plain values."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.array
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    return pd.Categorical.from_codes(codes, categories=pd.Index(uniques, dtype=object))
+
+
+def concat_column(parts, keep_category=False, max_ratio=CATEGORY_MAX_RATIO):
+    """Concatenate pieces of one text column that were compacted separately.
+
+    The pieces are merged with union_categoricals, so categorical pieces are
+    never decoded back to strings. The result stays categorical when
+    keep_category is set or its unique values / rows is at most max_ratio,
+    otherwise it is rebuilt as plain text.
+    """
+    try:
+        merged = union_categoricals([_as_categorical(part) for part in parts], ignore_order=True)
+    except TypeError:
+        # Mixed-type categories cannot be merged; fall back to plain values
+        return pd.concat([part.astype(object) for part in parts], ignore_index=True)
+
+    if keep_category or len(merged.categories) / max(len(merged), 1) <= max_ratio:
+        # union_categoricals infers the categories' dtype again; keep object like compact_frame
+        categories = pd.Index(merged.categories, dtype=object)
+        return pd.Series(pd.Categorical.from_codes(merged.codes, categories=categories))
+    values = np.asarray(merged.categories, dtype=object).take(merged.codes)
+    plain = [part.dtype for part in parts if not isinstance(part.dtype, pd.CategoricalDtype)]
+    return pd.Series(values, dtype=plain[0] if plain else object)
+
+
+def _is_text(dtype):
+    return (pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+            or isinstance(dtype, pd.CategoricalDtype))
+
+
+def _fill_empty_text(frames):
+    """Fill text columns that were read as all-missing float64 in some frames.
+
+    A chunk where a text column is empty throughout infers float64 for it, so
+    its missing values never got MISSING_TEXT; give them the placeholder and
+    the dtype of the text frames, as a full read would.
+    """
+    filled = list(frames)
+    for col in frames[0].columns:
+        text = [frame[col].dtype for frame in frames if _is_text(frame[col].dtype)]
+        if not text or len(text) == len(frames):
+            continue
+        plain = [dtype for dtype in text if not isinstance(dtype, pd.CategoricalDtype)]
+        for idx, frame in enumerate(filled):
+            if not _is_text(frame[col].dtype) and frame[col].isna().all():
+                values = pd.Series(MISSING_TEXT, index=frame.index, dtype=object)
+                frame = frame.copy(deep=False)
+                frame[col] = values.astype(plain[0]) if plain else values
+                filled[idx] = frame
+    return filled
+
+
+def concat_frames(frames, category_columns=CATEGORY_COLUMNS, max_ratio=CATEGORY_MAX_RATIO):
+    """Concatenate compacted frames with the same columns, e.g. streamed chunks.
+
+    Columns that are categorical in any frame go through concat_column;
+    the rest are concatenated as usual.
+    """
+    frames = _fill_empty_text(frames)
+    columns = frames[0].columns
+    categorical = [col for col in columns
+                   if any(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames)]
+    df = pd.concat([frame.drop(columns=categorical) for frame in frames], ignore_index=True)
+    for col in categorical:
+        df[col] = concat_column([frame[col] for frame in frames], col in category_columns, max_ratio)
+    return df[columns]
+
+
+def clean_frame(df, compact=True, deduplicator=None):
+    """Drop duplicates and clean text columns without touching numeric dtypes.
+
+    Duplicates are found by hashing the key columns (DEDUP_KEY_COLUMNS, all
+    columns by default); pass a shared Deduplicator to also drop rows seen
+    in earlier chunks or uploads. Returns the cleaned frame and a
+    per-column memory report.
+    """
+    before = df.memory_usage(deep=True, index=False)
+
+    # Remove duplicate rows
+    if deduplicator is None:
+        deduplicator = Deduplicator()
+    df = deduplicator.drop(df)
+
+    if compact:
+        df = compact_frame(df)
+    else:
+        # Plain strip/fill only, text columns stay uncategorized
+        for col in string_columns(df):
+            df[col] = clean_text_column(df[col], as_category=False)
+
+    after = df.memory_usage(deep=True, index=False)
+    return df, memory_report(before, after)
@@ -0,0 +1,257 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from charts import HISTOGRAM_BINS, CORR_SAMPLE_ROWS, sampled_correlation
+from pipeline_cache import prune_files
+from search_index import check_term, match_text, search_text
+
+# Defaults can be overridden through the environment (.env)
+COLUMNAR_STORE_DIR = os.getenv("COLUMNAR_STORE_DIR", os.path.join(".cache", "columnar"))
+
+# Datasets at least this large are previewed from disk by default
+COLUMNAR_THRESHOLD_MB = float(os.getenv("COLUMNAR_THRESHOLD_MB", "256"))
+
+# Arrow copies (one per dataset and mapping version) are kept within this size
+COLUMNAR_STORE_MAX_MB = float(os.getenv("COLUMNAR_STORE_MAX_MB", "4096"))
+
+# Rows per record batch in the on-disk file (the unit of chunked scans)
+COLUMNAR_BATCH_ROWS = 262144
+
+
+def write_columnar(df, path, batch_rows=COLUMNAR_BATCH_ROWS):
+    """Write df as an uncompressed Arrow IPC file that can be memory-mapped."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=batch_rows)
+    os.replace(tmp_path, path)
+    return path
+
+
+class ColumnarDataset:
+    """A processed dataset queried from a memory-mapped Arrow file.
+
+    Search, filters, value counts, histograms and the first rows of a view
+    are computed with pyarrow.compute over the mapped columns, one record
+    batch at a time where possible, so only the rows that are shown (or
+    exported) are turned into a DataFrame. Row selections are boolean numpy
+    masks over the whole dataset.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._source = pa.memory_map(path)
+        # read_all() on a memory map references the file pages instead of copying them
+        self.table = pa.ipc.open_file(self._source).read_all()
+        self.columns = self.table.column_names
+        self.n_rows = self.table.num_rows
+        self.file_bytes = os.path.getsize(path)
+        self._histograms = {}
+        self._correlation = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df, path, max_mb=COLUMNAR_STORE_MAX_MB):
+        """Write df to path (unless a file is already there) and open it.
+
+        Older copies in the same directory are deleted, least recently used
+        first, to keep the store within max_mb.
+        """
+        if os.path.exists(path):
+            # Mark the copy as recently used for the disk budget
+            os.utime(path)
+        else:
+            write_columnar(df, path)
+            prune_files(os.path.dirname(path) or ".", ".arrow", int(max_mb * 1024 * 1024), keep=[path])
+        return cls(path)
+
+    def __len__(self):
+        return self.n_rows
+
+    def is_numeric(self, column):
+        value_type = self.table.schema.field(column).type
+        return pa.types.is_integer(value_type) or pa.types.is_floating(value_type)
+
+    @property
+    def numeric_columns(self):
+        return [column for column in self.columns if self.is_numeric(column)]
+
+    def min_max(self, column):
+        """Return the (min, max) of a numeric column, ignoring missing values."""
+        result = pc.min_max(self.table[column])
+        return result["min"].as_py(), result["max"].as_py()
+
+    def unique(self, column):
+        """Return the distinct values of a column as a list."""
+        values = pc.unique(self.table[column])
+        if pa.types.is_dictionary(values.type):
+            values = values.cast(values.type.value_type)
+        return values.to_pylist()
+
+    def search(self, term, columns=None, mode="Contains"):
+        """Return a boolean row mask for rows where any column matches term.
+
+        Same arguments and matching as SearchIndex.search. Each record batch
+        of a column is dictionary-encoded (categoricals already are), its
+        distinct values are formatted like SearchIndex formats them and the
+        hits are expanded through the indices.
+        """
+        term = check_term(term, mode)
+        columns = [col for col in (columns or self.columns) if col in self.columns]
+
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for col in columns:
+            offset = 0
+            for chunk in self.table[col].chunks:
+                if not pa.types.is_dictionary(chunk.type):
+                    chunk = chunk.dictionary_encode(null_encoding="encode")
+                hits = match_text(search_text(chunk.dictionary.to_pandas()), term, mode)
+                if chunk.indices.null_count:
+                    # Null indices (missing categoricals) point one past the dictionary, at a missing entry
+                    hits = np.append(hits, match_text(search_text([np.nan]), term, mode))
+                if hits.any():
+                    indices = pc.fill_null(chunk.indices, len(chunk.dictionary))
+                    mask[offset:offset + len(chunk)] |= hits[indices.to_numpy(zero_copy_only=False)]
+                offset += len(chunk)
+        return mask
+
+    def filter_values(self, column, values):
+        """Return a boolean row mask for rows whose column is one of values."""
+        value_type = self.table.schema.field(column).type
+        if pa.types.is_dictionary(value_type):
+            value_type = value_type.value_type
+        mask = pc.is_in(self.table[column], value_set=pa.array(values, type=value_type))
+        return pc.fill_null(mask, False).to_numpy(zero_copy_only=False)
+
+    def filter_range(self, column, low, high):
+        """Return a boolean row mask for rows with low <= column <= high."""
+        values = self.table[column]
+        mask = pc.and_(pc.greater_equal(values, low), pc.less_equal(values, high))
+        return pc.fill_null(mask, False).to_numpy(zero_copy_only=False)
+
+    def _select(self, columns=None, mask=None):
+        table = self.table.select(list(columns)) if columns is not None else self.table
+        if mask is not None:
+            table = table.filter(pa.array(mask))
+        return table
+
+    def slice(self, start, n, columns=None):
+        """Return n rows from position start as a DataFrame (only those rows are read)."""
+        return self._select(columns).slice(start, n).to_pandas()
+
+    def take(self, positions, columns=None):
+        """Return the rows at positions as a DataFrame."""
+        return self._select(columns).take(pa.array(positions)).to_pandas()
+
+    def head(self, n, columns=None, mask=None):
+        """Return the first n rows (of those selected by mask) as a DataFrame."""
+        if mask is None:
+            return self.slice(0, n, columns)
+        return self.take(np.flatnonzero(mask)[:n], columns)
+
+    def to_pandas(self, columns=None, mask=None):
+        """Materialize the dataset (or the rows selected by mask) as a DataFrame."""
+        return self._select(columns, mask).to_pandas()
+
+    def value_counts(self, column, mask=None):
+        """Return counts per value, largest first (like Series.value_counts)."""
+        values = self.table[column]
+        if mask is not None:
+            values = values.filter(pa.array(mask))
+        counts = pc.value_counts(values)
+        index = counts.field("values")
+        if pa.types.is_dictionary(index.type):
+            index = index.cast(index.type.value_type)
+        counts = pd.Series(
+            counts.field("counts").to_numpy(),
+            index=pd.Index(index.to_pylist(), dtype=object, name=column),
+            name="count",
+        )
+        counts = counts[counts.index.notna()]
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def _float_chunks(self, column):
+        for chunk in self.table[column].chunks:
+            values = chunk.cast(pa.float64()).to_numpy(zero_copy_only=False)
+            yield values[np.isfinite(values)]
+
+    def histogram(self, column, bins=HISTOGRAM_BINS):
+        """Return (counts, edges) like charts.histogram_bins, one record batch at a time."""
+        with self._lock:
+            if column in self._histograms:
+                return self._histograms[column]
+
+        # First pass finds the range, the second bins each batch with the shared edges
+        low, high = np.inf, -np.inf
+        for values in self._float_chunks(column):
+            if len(values):
+                low, high = min(low, values.min()), max(high, values.max())
+        if low > high:
+            result = (np.zeros(0, dtype=np.int64), np.zeros(1))
+        else:
+            bins = 1 if low == high else bins
+            counts, edges = None, None
+            for values in self._float_chunks(column):
+                chunk_counts, edges = np.histogram(values, bins=bins, range=(low, high))
+                counts = chunk_counts if counts is None else counts + chunk_counts
+            result = (counts, edges)
+
+        with self._lock:
+            self._histograms[column] = result
+        return result
+
+    def correlation(self, sample_rows=CORR_SAMPLE_ROWS, seed=0):
+        """Correlation matrix of the numeric columns on at most sample_rows rows."""
+        with self._lock:
+            if self._correlation is not None:
+                return self._correlation
+        columns = self.numeric_columns
+        table = self.table.select(columns)
+        if self.n_rows > sample_rows:
+            rows = np.sort(np.random.default_rng(seed).choice(self.n_rows, sample_rows, replace=False))
+            table = table.take(pa.array(rows))
+        correlation = sampled_correlation(table.to_pandas(), columns, sample_rows=sample_rows, seed=seed)
+        with self._lock:
+            self._correlation = correlation
+        return correlation
+
+
+class ColumnarView:
+    """Rows of a ColumnarDataset selected by position (None: all rows).
+
+    Stands in for the filtered DataFrame of the preview, like views.FrameView;
+    rows are only read from the mapped file by page(), head() and to_pandas().
+    """
+
+    def __init__(self, dataset, positions=None):
+        self.dataset = dataset
+        self.positions = positions
+        self.attrs = {}
+
+    def __len__(self):
+        return self.dataset.n_rows if self.positions is None else len(self.positions)
+
+    @property
+    def columns(self):
+        return pd.Index(self.dataset.columns)
+
+    def page(self, number, size, columns=None):
+        """Return page `number` (from 0) of `size` rows, limited to columns."""
+        start = number * size
+        if self.positions is None:
+            return self.dataset.slice(start, size, columns)
+        return self.dataset.take(self.positions[start:start + size], columns)
+
+    def head(self, n, columns=None):
+        return self.page(0, n, columns)
+
+    def to_pandas(self):
+        if self.positions is None:
+            return self.dataset.to_pandas()
+        return self.dataset.take(self.positions)
@@ -0,0 +1,205 @@
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from settings import env_flag
+
+# Columns identifying a row for deduplication (comma-separated; empty: all columns)
+DEDUP_KEY_COLUMNS = [col.strip() for col in os.getenv("DEDUP_KEY_COLUMNS", "").split(",") if col.strip()]
+
+# Hashes of earlier uploads, one file per upload
+DEDUP_STORE_DIR = os.getenv("DEDUP_STORE_DIR", os.path.join(".cache", "dedup"))
+
+# Skip rows already seen in earlier uploads by default
+DEDUP_ACROSS_UPLOADS = env_flag("DEDUP_ACROSS_UPLOADS")
+
+# Hash of a missing value (the same one pandas uses for missing categoricals)
+MISSING_HASH = np.iinfo(np.uint64).max
+
+_HASH_MULTIPLIER = np.uint64(1000003)
+
+# In-run hash batches are merged once there are this many
+MAX_PENDING_BATCHES = 8
+
+
+def column_hashes(series):
+    """Return a uint64 hash per value of a column.
+
+    Numbers are hashed as float64 so 1 and 1.0 match across uploads; other
+    columns are factorized and only their unique values are hashed, which
+    is much faster on repetitive string columns and gives the same hashes
+    for object, string and categorical columns. Missing values hash the same
+    whatever the dtype, since a chunk where a text column is empty reads it
+    as float64.
+    """
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        return np.where(np.isnan(values), MISSING_HASH, pd.util.hash_array(values))
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    unique_hashes = pd.util.hash_array(np.asarray(uniques, dtype=object))
+    return np.where(codes < 0, MISSING_HASH, unique_hashes[np.maximum(codes, 0)])
+
+
+def key_columns_of(df, key_columns=None):
+    """Return the configured key columns present in df (all columns when none are)."""
+    columns = [col for col in (key_columns or []) if col in df.columns]
+    return sorted(columns or df.columns, key=str)
+
+
+def row_hashes(df, key_columns=None):
+    """Return one 64-bit hash per row of the key columns (in name order)."""
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for col in key_columns_of(df, key_columns):
+        # uint64 arithmetic wraps around, which is what a hash combine wants
+        hashes = (hashes * _HASH_MULTIPLIER) ^ column_hashes(df[col])
+    return hashes
+
+
+def sorted_contains(sorted_hashes, hashes):
+    """Boolean mask of hashes present in a sorted uint64 array."""
+    if len(sorted_hashes) == 0:
+        return np.zeros(len(hashes), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_hashes, hashes), len(sorted_hashes) - 1)
+    return np.asarray(sorted_hashes[positions] == hashes)
+
+
+class SeenHashStore:
+    """Row hashes of earlier uploads persisted as sorted .npy files.
+
+    Each upload (identified by its content digest) gets one file of the
+    hashes it contributed, under a subdirectory per key-column set. Files
+    are memory-mapped and searched with binary search, so earlier data is
+    never reloaded. An upload is never compared with its own file, so
+    processing the same upload again gives the same rows. fingerprint()
+    changes whenever the hashes an upload is compared with change, so
+    results can be cached under it.
+    """
+
+    def __init__(self, directory=DEDUP_STORE_DIR, key_columns=None):
+        self.key_columns = list(key_columns or [])
+        namespace = ",".join(self.key_columns) or "*"
+        self.directory = os.path.join(directory, hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:12])
+
+    def _path(self, source):
+        return os.path.join(self.directory, f"{source}.npy")
+
+    def generation(self):
+        """Return how many times the store was cleared."""
+        try:
+            with open(f"{self.directory}.generation") as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 0
+
+    def fingerprint(self, exclude=None):
+        """Digest of the generation and of the files contains(..., exclude) reads."""
+        digest = hashlib.sha1(str(self.generation()).encode("utf-8"))
+        for source in self.sources():
+            if source == exclude:
+                continue
+            stat = os.stat(self._path(source))
+            digest.update(f"|{source}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def sources(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [name[:-4] for name in sorted(os.listdir(self.directory)) if name.endswith(".npy")]
+
+    def contains(self, hashes, exclude=None):
+        """Return a boolean mask of hashes recorded by any upload other than exclude."""
+        seen = np.zeros(len(hashes), dtype=bool)
+        for source in self.sources():
+            if source == exclude:
+                continue
+            seen |= sorted_contains(np.load(self._path(source), mmap_mode="r"), hashes)
+        return seen
+
+    def save(self, source, hashes):
+        """Record the (unique) hashes contributed by one upload, replacing earlier ones."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(source)
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, np.sort(np.asarray(hashes, dtype=np.uint64)))
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        sources = self.sources()
+        rows = sum(len(np.load(self._path(source), mmap_mode="r")) for source in sources)
+        return {"uploads": len(sources), "hashes": rows}
+
+    def clear(self):
+        generation = self.generation() + 1
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(os.path.dirname(self.directory) or ".", exist_ok=True)
+        with open(f"{self.directory}.generation", "w") as f:
+            f.write(str(generation))
+
+
+class Deduplicator:
+    """Drops repeated rows, chunk by chunk, by hashing the key columns.
+
+    A row is dropped when its key hash appeared earlier in the same frame, in
+    an earlier chunk passed to drop(), among the hashes passed to remember()
+    (e.g. those of an earlier version of the dataset) or (with a store) in
+    another upload. commit() saves the hashes of the kept rows to the store
+    under source.
+    """
+
+    def __init__(self, key_columns=None, store=None, source=None):
+        self.key_columns = DEDUP_KEY_COLUMNS if key_columns is None else list(key_columns)
+        self.store = store
+        self.source = source
+        self._batches = []
+        self._unsorted = []
+        self.stats = {"rows": 0, "duplicates": 0, "seen_before": 0}
+
+    def _sorted_batches(self):
+        # Kept hashes are unique, so batches are only sorted (lazily, when first searched)
+        self._batches.extend(np.sort(hashes) for hashes in self._unsorted)
+        self._unsorted = []
+        # Merge the sorted batches now and then so lookups stay a few binary searches
+        if len(self._batches) > MAX_PENDING_BATCHES:
+            self._batches = [np.sort(np.concatenate(self._batches))]
+        return self._batches
+
+    def remember(self, hashes):
+        """Treat rows with these key hashes as already seen."""
+        self._unsorted.append(np.asarray(hashes, dtype=np.uint64))
+
+    def _seen(self, hashes):
+        seen = np.zeros(len(hashes), dtype=bool)
+        for batch in self._sorted_batches():
+            seen |= sorted_contains(batch, hashes)
+        return seen
+
+    def drop(self, df):
+        """Return df without rows whose key was already seen."""
+        hashes = row_hashes(df, self.key_columns)
+        keep = ~pd.Series(hashes).duplicated().to_numpy() & ~self._seen(hashes)
+        duplicates = len(df) - int(keep.sum())
+        if self.store is not None and keep.any():
+            earlier = self.store.contains(hashes, exclude=self.source) & keep
+            keep &= ~earlier
+            self.stats["seen_before"] += int(earlier.sum())
+
+        self.stats["rows"] += len(df)
+        self.stats["duplicates"] += duplicates
+        self._unsorted.append(hashes[keep])
+        if keep.all():
+            return df
+        return df[keep]
+
+    def kept_hashes(self):
+        """Return the key hashes of all kept (and initially seen) rows."""
+        batches = self._batches + self._unsorted
+        return np.concatenate(batches) if batches else np.zeros(0, dtype=np.uint64)
+
+    def commit(self):
+        """Persist the kept rows' hashes for later uploads (no-op without a store)."""
+        if self.store is None or self.source is None:
+            return
+        self.store.save(self.source, self.kept_hashes())
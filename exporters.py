@@ -0,0 +1,80 @@
+import gzip
+import io
+
+# Rows converted to Python values at a time by the streaming XLSX writer
+XLSX_CHUNK_ROWS = 10000
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def iter_row_values(df, chunk_rows=XLSX_CHUNK_ROWS):
+    """Yield rows as tuples of plain Python values (None for missing), one chunk at a time."""
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def write_xlsx_streaming(df, target, sheet_name="Sheet1"):
+    """Write an XLSX file row by row with openpyxl's write-only mode.
+
+    Only one chunk of rows is held as Python objects at a time, so memory
+    stays flat regardless of the number of rows. target is a path or a
+    binary file object.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_name)
+    sheet.append([str(col) for col in df.columns])
+    for row in iter_row_values(df):
+        sheet.append(row)
+    workbook.save(target)
+
+
+def write_csv(df, target):
+    df.to_csv(target, index=False)
+
+
+def write_csv_gzip(df, target):
+    if isinstance(target, str):
+        df.to_csv(target, index=False, compression="gzip")
+    else:
+        with gzip.GzipFile(fileobj=target, mode="wb") as gz:
+            df.to_csv(gz, index=False)
+
+
+def write_parquet(df, target):
+    df.to_parquet(target, index=False)
+
+
+# Format name -> (file extension, MIME type, writer)
+EXPORT_FORMATS = {
+    "xlsx": ("xlsx", XLSX_MIME, write_xlsx_streaming),
+    "csv": ("csv", "text/csv", write_csv),
+    "csv.gz": ("csv.gz", "application/gzip", write_csv_gzip),
+    "parquet": ("parquet", "application/vnd.apache.parquet", write_parquet),
+}
+
+
+def write_export(df, target, export_format):
+    """Write df to a path or binary file object in one of EXPORT_FORMATS."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}'")
+    EXPORT_FORMATS[export_format][2](df, target)
+
+
+def export_bytes(df, export_format):
+    """Serialize df to bytes in one of EXPORT_FORMATS."""
+    buffer = io.BytesIO()
+    write_export(df, buffer, export_format)
+    return buffer.getvalue()
+
+
+def export_file_name(base_name, export_format):
+    """Return base_name with the extension for export_format."""
+    return f"{base_name}.{EXPORT_FORMATS[export_format][0]}"
+
+
+def export_mime(export_format):
+    return EXPORT_FORMATS[export_format][1]
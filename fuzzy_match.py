@@ -0,0 +1,186 @@
+import re
+from collections import defaultdict
+
+import numpy as np
+
+try:
+    from cdifflib import CSequenceMatcher as SequenceMatcher
+except ImportError:
+    from difflib import SequenceMatcher
+
+# Size of the character q-grams used for candidate blocking
+QGRAM_SIZE = 3
+
+# Only the best candidates by shared q-grams are scored with SequenceMatcher
+MAX_CANDIDATES = 5
+
+# Candidates need at least this fraction of the best candidate's shared q-grams
+CANDIDATE_SHARE = 0.9
+
+# Only the rarest q-grams of a query are used to find its candidates (at most 255)
+QUERY_GRAMS = 12
+
+# Cells of the dense (query, known) count block gathered at once
+BLOCK_CELLS = 4_000_000
+
+# Suggestions scoring below this similarity are not offered
+MIN_SCORE = 0.6
+
+# Grade suffixes such as "UCMO-II" do not change the designation
+_GRADE_SUFFIX = re.compile(r"(\s+(i{1,3}|iv|v|vi{1,3}|\d+))+$")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_designation(designation):
+    """Normalize a designation for matching: 'U.C.M.O-II ' -> 'ucmo'."""
+    text = str(designation).lower()
+    # Dotted abbreviations collapse into one token
+    text = text.replace(".", "")
+    text = _NON_ALNUM.sub(" ", text).strip()
+    text = _GRADE_SUFFIX.sub("", text).strip()
+    return text
+
+
+def qgrams(text, q=QGRAM_SIZE):
+    """Return the set of padded character q-grams of text."""
+    padded = f"{' ' * (q - 1)}{text} "
+    return {padded[i:i + q] for i in range(len(padded) - q + 1)}
+
+
+class FuzzyMatcher:
+    """Suggest the closest known designation using a q-gram blocking index.
+
+    Known designations are indexed by their q-grams. Queries are processed in
+    blocks: shared counts of each query's rarest q-grams are gathered for every
+    known designation with NumPy, and only the few best candidates per query
+    are scored with SequenceMatcher instead of comparing against all of them.
+    """
+
+    def __init__(self, known_designations, q=QGRAM_SIZE):
+        self.q = q
+        self.keys = list(dict.fromkeys(known_designations))
+        self.normalized = [normalize_designation(key) for key in self.keys]
+        self._exact = {}
+        postings = defaultdict(list)
+        for idx, norm in enumerate(self.normalized):
+            self._exact.setdefault(norm, idx)
+            for gram in qgrams(norm, q):
+                postings[gram].append(idx)
+
+        # Posting lists stored back to back (CSR layout) for vectorized gathering
+        self._gram_ids = {gram: gram_id for gram_id, gram in enumerate(postings)}
+        lengths = np.array([len(ids) for ids in postings.values()], dtype=np.int64)
+        self._offsets = np.concatenate([[0], np.cumsum(lengths)])
+        self._gram_lengths = lengths.tolist()
+        self._postings = np.array(
+            [idx for ids in postings.values() for idx in ids], dtype=np.int32
+        )
+        self._memo = {}
+
+    def _query_grams(self, norms):
+        """Return each query's QUERY_GRAMS rarest q-gram ids as rows of an array (padded with -1)."""
+        rows = []
+        gram_id, rarity = self._gram_ids.get, self._gram_lengths.__getitem__
+        for norm in norms:
+            grams = [gram for gram in map(gram_id, qgrams(norm, self.q)) if gram is not None]
+            # Rare q-grams identify a designation; common ones ("officer") match half the list
+            grams.sort(key=rarity)
+            rows.append(grams[:QUERY_GRAMS] + [-1] * (QUERY_GRAMS - len(grams)))
+        return np.array(rows, dtype=np.int64).reshape(len(norms), QUERY_GRAMS)
+
+    def _candidates(self, norms):
+        """Return, per normalized query, known indices ordered by shared q-grams.
+
+        Only the QUERY_GRAMS rarest q-grams of each query are counted. For a
+        block of queries, the known designations containing each q-gram used
+        in the block form a dense 0/1 row, and a query's shared counts are
+        the sum of its q-grams' rows.
+        """
+        n_keys = len(self.keys)
+        candidates = [[] for _ in norms]
+        if n_keys == 0:
+            return candidates
+        query_grams = self._query_grams(norms)
+        # Rows per block so that the dense count block stays around BLOCK_CELLS
+        block = max(1, BLOCK_CELLS // n_keys)
+        for start in range(0, len(norms), block):
+            ids = query_grams[start:start + block]
+            used, inverse = np.unique(ids, return_inverse=True)
+            inverse = inverse.reshape(ids.shape)
+            incidence = np.zeros((len(used), n_keys), dtype=np.uint8)
+            for row, gram_id in enumerate(used):
+                if gram_id >= 0:  # -1 pads short queries and stays all zero
+                    incidence[row, self._postings[self._offsets[gram_id]:self._offsets[gram_id + 1]]] = 1
+
+            # Shared q-gram count for every (query, known) pair of the block
+            counts = np.zeros((len(ids), n_keys), dtype=np.uint8)
+            for column in range(ids.shape[1]):
+                counts += incidence[inverse[:, column]]
+
+            # Candidates sharing far fewer q-grams than the best one are not scored
+            threshold = np.maximum(np.ceil(CANDIDATE_SHARE * counts.max(axis=1)), 1).astype(np.uint8)
+            pair_rows, pair_cols = np.nonzero(counts >= threshold[:, None])
+            pair_counts = counts[pair_rows, pair_cols]
+
+            # Keep the MAX_CANDIDATES best known designations per query, best first
+            order = np.lexsort((-pair_counts.astype(np.int64), pair_rows))
+            pair_rows, pair_cols = pair_rows[order], pair_cols[order]
+            group_starts = np.searchsorted(pair_rows, pair_rows, side="left")
+            keep = np.arange(len(pair_rows)) - group_starts < MAX_CANDIDATES
+            pair_rows, pair_cols = pair_rows[keep], pair_cols[keep]
+            bounds = np.flatnonzero(np.diff(pair_rows)) + 1
+            for group_rows, group_cols in zip(np.split(pair_rows, bounds), np.split(pair_cols, bounds)):
+                if len(group_rows):
+                    candidates[start + group_rows[0]] = group_cols.tolist()
+        return candidates
+
+    def _score(self, norm, candidates, matcher):
+        """Return (key index, score) of the best scoring candidate."""
+        best_idx, best_score = None, 0.0
+        # Clearing seq1 first keeps set_seq2 from re-checking the previous candidate
+        matcher.set_seqs("", norm)
+        for idx in candidates:
+            candidate = self.normalized[idx]
+            # Length-only upper bound on the ratio; skip candidates that cannot win
+            total = len(norm) + len(candidate)
+            if total == 0 or 2.0 * min(len(norm), len(candidate)) / total <= best_score:
+                continue
+            matcher.set_seq1(candidate)
+            score = matcher.ratio()
+            if score > best_score:
+                best_idx, best_score = idx, score
+        return best_idx, best_score
+
+    def _match(self, norms):
+        """Fill the memo for normalized designations not matched yet."""
+        pending = [norm for norm in dict.fromkeys(norms) if norm not in self._memo]
+        fuzzy = []
+        for norm in pending:
+            if norm in self._exact:
+                self._memo[norm] = (self._exact[norm], 1.0)
+            else:
+                fuzzy.append(norm)
+
+        # One matcher for all queries; set_seq2 re-indexes it per query
+        matcher = SequenceMatcher(None)
+        for norm, candidates in zip(fuzzy, self._candidates(fuzzy)):
+            self._memo[norm] = self._score(norm, candidates, matcher)
+
+    def suggest_many(self, designations, min_score=MIN_SCORE):
+        """Return {designation: (known designation, score) or None} for many designations."""
+        designations = list(designations)
+        norms = [normalize_designation(designation) for designation in designations]
+        self._match(norms)
+
+        suggestions = {}
+        for designation, norm in zip(designations, norms):
+            idx, score = self._memo[norm]
+            if idx is None or score < min_score:
+                suggestions[designation] = None
+            else:
+                suggestions[designation] = (self.keys[idx], round(score, 3))
+        return suggestions
+
+    def suggest(self, designation, min_score=MIN_SCORE):
+        """Return (known designation, score) for the best match, or None."""
+        return self.suggest_many([designation], min_score)[designation]
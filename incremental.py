@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from dedup import row_hashes, sorted_contains
+from settings import env_flag
+
+# Process only the rows added since the previous upload of the same dataset
+INCREMENTAL_PROCESSING = env_flag("INCREMENTAL_PROCESSING")
+
+# Row hashes and metadata of the last processed upload of each dataset
+INCREMENTAL_DIR = os.getenv("INCREMENTAL_DIR", os.path.join(".cache", "incremental"))
+
+
+def lineage_key(file_names, options=""):
+    """Identify a dataset across uploads by its file names (a daily report keeps its name)."""
+    digest = hashlib.sha256()
+    for file_name in sorted(os.path.basename(str(name)) for name in file_names):
+        digest.update(file_name.encode("utf-8") + b"\0")
+    digest.update(options.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def find_new_rows(raw_hashes, previous_hashes):
+    """Return (positions of new rows, how they were found), or None if rows were removed.
+
+    An upload that starts with exactly the previous rows is an append and
+    its new rows are everything past the old end. Otherwise every previous
+    row must still be present (in any order) and the new rows are those
+    whose hash was not there before.
+    """
+    n_previous = len(previous_hashes)
+    if len(raw_hashes) >= n_previous and np.array_equal(raw_hashes[:n_previous], previous_hashes):
+        return np.arange(n_previous, len(raw_hashes)), "append"
+
+    if not sorted_contains(np.sort(raw_hashes), np.asarray(previous_hashes)).all():
+        return None
+    is_new = ~sorted_contains(np.sort(previous_hashes), raw_hashes)
+    return np.flatnonzero(is_new), "hash"
+
+
+class DeltaState:
+    """Per-dataset record of the last processed upload, kept on disk.
+
+    For each lineage it stores the raw row hashes in upload order (for the
+    append check), the deduplication key hashes of the kept rows and a
+    small JSON record with the digest and columns of that upload.
+    """
+
+    def __init__(self, directory=INCREMENTAL_DIR):
+        self.directory = directory
+
+    def _path(self, lineage, name):
+        return os.path.join(self.directory, lineage, name)
+
+    def load(self, lineage):
+        """Return the saved record (with "raw_hashes" and "kept_hashes" arrays) or None."""
+        try:
+            with open(self._path(lineage, "state.json")) as f:
+                state = json.load(f)
+            state["raw_hashes"] = np.load(self._path(lineage, "raw_hashes.npy"), mmap_mode="r")
+            state["kept_hashes"] = np.load(self._path(lineage, "kept_hashes.npy"), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        return state
+
+    def save(self, lineage, raw_hashes, kept_hashes, **fields):
+        """Record an upload; fields (digest, columns, ...) are stored as JSON."""
+        os.makedirs(os.path.join(self.directory, lineage), exist_ok=True)
+        # Kept hashes are only searched, so they are stored sorted
+        for name, values in [("raw_hashes.npy", raw_hashes), ("kept_hashes.npy", np.sort(kept_hashes))]:
+            path = self._path(lineage, name)
+            np.save(f"{path}.tmp.npy", np.asarray(values, dtype=np.uint64))
+            os.replace(f"{path}.tmp.npy", path)
+        path = self._path(lineage, "state.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(fields, f)
+        os.replace(f"{path}.tmp", path)
+
+
+def raw_row_hashes(df):
+    """Hash every column of the raw (unprocessed) rows."""
+    return row_hashes(df, list(df.columns))
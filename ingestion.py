@@ -0,0 +1,148 @@
+import os
+import re
+
+import pandas as pd
+
+from cleaning import concat_frames
+
+# Rows per chunk and the upload size above which streaming is switched on by default
+CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "50000"))
+STREAMING_THRESHOLD_MB = float(os.getenv("STREAMING_THRESHOLD_MB", "50"))
+
+
+# pandas' name for blank header cells, e.g. "Unnamed: 3_level_1"
+_UNNAMED_LEVEL = re.compile(r"^Unnamed: \d+_level_\d+$")
+
+
+def flatten_columns(columns):
+    """Join two-level header tuples into single column names, skipping blanks."""
+    flattened = []
+    for cols in columns:
+        parts = [str(col) for col in cols if str(col) != 'nan']
+        named = [part for part in parts if not _UNNAMED_LEVEL.match(part)]
+        flattened.append(' '.join(named or parts).strip())
+    return flattened
+
+
+def header_from_rows(top, bottom):
+    """Flatten the first two sheet rows the same way pd.read_excel(header=[0, 1]) would."""
+    # Read-only sheets drop trailing empty cells, so pad both rows to the same width
+    width = max(len(top), len(bottom))
+    top = list(top) + [None] * (width - len(top))
+    bottom = list(bottom) + [None] * (width - len(bottom))
+
+    columns = []
+    last_top = None
+    for idx, (upper, lower) in enumerate(zip(top, bottom)):
+        # Merged cells only carry a value in their first column, so fill forward
+        if upper is not None and str(upper).strip() != "":
+            last_top = upper
+        upper = last_top if last_top is not None else f"Unnamed: {idx}_level_0"
+        if lower is None or str(lower).strip() == "":
+            lower = f"Unnamed: {idx}_level_1"
+        columns.append((upper, lower))
+    return flatten_columns(columns)
+
+
+def file_size(file_obj):
+    """Return the total byte size of a path or seekable file object, or None."""
+    if isinstance(file_obj, str):
+        return os.path.getsize(file_obj)
+    try:
+        pos = file_obj.tell()
+        file_obj.seek(0, os.SEEK_END)
+        size = file_obj.tell()
+        file_obj.seek(pos)
+        return size
+    except Exception:
+        return None
+
+
+def iter_csv_chunks(file_obj, chunk_rows=CHUNK_ROWS):
+    """Yield (chunk, progress) pairs from a CSV file without loading it whole."""
+    size = file_size(file_obj)
+    for chunk in pd.read_csv(file_obj, chunksize=chunk_rows):
+        progress = None
+        if size:
+            try:
+                progress = min(file_obj.tell() / size, 1.0)
+            except Exception:
+                progress = None
+        yield chunk, progress
+
+
+def iter_xlsx_chunks(file_obj, chunk_rows=CHUNK_ROWS):
+    """Yield (chunk, progress) pairs from the first sheet using a read-only row iterator."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total_rows = sheet.max_row
+        rows = sheet.iter_rows(values_only=True)
+
+        top = next(rows, None)
+        bottom = next(rows, None)
+        if top is None or bottom is None:
+            return
+        columns = header_from_rows(top, bottom)
+        width = len(columns)
+
+        buffer = []
+        seen = 2
+        for row in rows:
+            seen += 1
+            # Skip fully blank rows, as read_csv does
+            if all(value is None for value in row):
+                continue
+            buffer.append(row[:width])
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=columns), _fraction(seen, total_rows)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns), 1.0
+    finally:
+        workbook.close()
+
+
+def _fraction(done, total):
+    if not total:
+        return None
+    return min(done / total, 1.0)
+
+
+def iter_chunks(file_obj, file_name, chunk_rows=CHUNK_ROWS):
+    """Pick the chunked reader for a file based on its extension."""
+    if file_name.lower().endswith(".csv"):
+        return iter_csv_chunks(file_obj, chunk_rows)
+    if file_name.lower().endswith(".xlsx"):
+        return iter_xlsx_chunks(file_obj, chunk_rows)
+    raise ValueError(f"Streaming is not supported for '{file_name}'")
+
+
+def supports_streaming(file_name):
+    """Legacy .xls workbooks have no read-only iterator and must be read whole."""
+    return file_name.lower().endswith((".csv", ".xlsx"))
+
+
+def stream_process(file_obj, file_name, process_chunk=None, on_chunk=None, chunk_rows=CHUNK_ROWS):
+    """Read a file chunk by chunk, process each chunk and concatenate the results once.
+
+    process_chunk(chunk) returns the processed chunk; categorical columns of the
+    processed chunks are merged without decoding them. on_chunk(chunk, progress,
+    rows) is called after every chunk so callers can update progress and previews.
+    """
+    parts = []
+    rows = 0
+    for chunk, progress in iter_chunks(file_obj, file_name, chunk_rows):
+        if process_chunk is not None:
+            chunk = process_chunk(chunk)
+
+        parts.append(chunk)
+        rows += len(chunk)
+        if on_chunk is not None:
+            on_chunk(chunk, progress, rows)
+
+    if not parts:
+        return pd.DataFrame()
+    return concat_frames(parts)
@@ -0,0 +1,177 @@
+import functools
+import json
+import os
+import platform
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from settings import env_flag
+
+# Append every span to a JSON-lines log for offline analysis
+INSTRUMENTATION_LOG = env_flag("INSTRUMENTATION_LOG")
+INSTRUMENTATION_LOG_PATH = os.getenv("INSTRUMENTATION_LOG_PATH", "instrumentation.jsonl")
+
+# tracemalloc makes allocation-heavy stages several times slower, so it is opt-in
+INSTRUMENTATION_TRACE_MEMORY = env_flag("INSTRUMENTATION_TRACE_MEMORY")
+
+# Spans kept in memory per recorder
+MAX_SPANS = 500
+
+
+def current_rss_mb():
+    """Resident memory of this process in MB (None where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None on Windows, which lacks resource)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def row_count(value):
+    """Rows of a DataFrame (or of the first item of a tuple result), else None."""
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+
+class SpanRecorder:
+    """Records timing and memory spans for the stages of a run.
+
+    Each span holds the stage name, wall time, rows in and out, RSS after
+    the stage and its change, and (when trace_memory is on) the peak of
+    Python allocations during the outermost span. A run groups the spans
+    of one pass through the app.
+    """
+
+    def __init__(self, max_spans=MAX_SPANS, log_path=None, trace_memory=INSTRUMENTATION_TRACE_MEMORY):
+        self.log_path = log_path
+        self.trace_memory = trace_memory
+        self.run_id = 0
+        self._spans = deque(maxlen=max_spans)
+        self._depth = 0
+        self._lock = threading.Lock()
+
+    def start_run(self):
+        """Start a new run; later spans are grouped under it."""
+        self.run_id += 1
+        return self.run_id
+
+    @contextmanager
+    def span(self, stage, rows_in=None, **fields):
+        """Time the enclosed block; set record["rows_out"] (or other fields) inside it."""
+        record = {"stage": stage, "run": self.run_id, "depth": self._depth,
+                  "rows_in": rows_in, "rows_out": None, **fields}
+        # Only the outermost span owns tracemalloc, nested ones report RSS only
+        tracing = self.trace_memory and self._depth == 0 and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        rss_before = current_rss_mb()
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = str(e)
+            raise
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 4)
+            self._depth -= 1
+            if tracing:
+                record["peak_alloc_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+                tracemalloc.stop()
+            rss_after = current_rss_mb()
+            if rss_after is not None:
+                record["rss_mb"] = round(rss_after, 1)
+                record["rss_delta_mb"] = round(rss_after - rss_before, 1)
+            peak_rss = peak_rss_mb()
+            record["peak_rss_mb"] = "n/a" if peak_rss is None else round(peak_rss, 1)
+            self._add(record)
+
+    def _add(self, record):
+        with self._lock:
+            self._spans.append(record)
+        if self.log_path:
+            entry = {"timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), **record}
+            try:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+            except OSError:
+                pass
+
+    def spans(self, run_id=None):
+        """Return recorded spans, optionally only those of one run."""
+        with self._lock:
+            spans = list(self._spans)
+        if run_id is not None:
+            spans = [record for record in spans if record["run"] == run_id]
+        return spans
+
+    def summary(self):
+        """Return per-stage totals over all recorded spans, slowest first."""
+        spans = self.spans()
+        if not spans:
+            return pd.DataFrame()
+        frame = pd.DataFrame(spans)
+        summary = frame.groupby("stage")["seconds"].agg(["count", "mean", "max", "sum"])
+        return summary.sort_values("sum", ascending=False).round(4)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+_local = threading.local()
+
+
+def set_recorder(recorder):
+    """Make recorder the target of span() and @instrumented in this thread."""
+    _local.recorder = recorder
+
+
+def current_recorder():
+    return getattr(_local, "recorder", None)
+
+
+@contextmanager
+def span(stage, rows_in=None, **fields):
+    """Record a span with the current thread's recorder (a no-op without one)."""
+    recorder = current_recorder()
+    if recorder is None:
+        yield {"stage": stage, "rows_in": rows_in, **fields}
+        return
+    with recorder.span(stage, rows_in, **fields) as record:
+        yield record
+
+
+def instrumented(stage):
+    """Decorator recording a span per call, with rows from DataFrame arguments and results."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            rows_in = next((row_count(arg) for arg in args if row_count(arg) is not None), None)
+            with span(stage, rows_in) as record:
+                result = func(*args, **kwargs)
+                record["rows_out"] = row_count(result)
+            return result
+        return wrapper
+    return decorator
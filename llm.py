@@ -0,0 +1,294 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from local_answers import answer_locally
+
+# Bump whenever the prompt template changes so cached answers are not reused
+PROMPT_VERSION = 1
+
+# Backend used by default ("gemini" or "fake")
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
+
+# Response cache settings
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+
+PROMPT_TEMPLATE = """You are an expert Operational data analyst who has more than 15 years of experience in Polio Program internationally. Answer the following question using the provided data:
+
+        Context:
+        {context}
+
+        Question: {question}
+
+        Requirements for your answer:
+        1. Give ONLY the exact answer with specific numbers
+        2. For questions about "most" or "highest", give the specific name and count
+        3. Format: "[Name/Value] with [count] records" or similar
+        4. If asking about a specific column, give values from that column only
+        5. Do not mention other columns unless specifically asked
+        6. Do not explain methodology
+        7. Keep response to one sentence
+        8. If data isn't available, say "Data not available"
+
+        Examples:
+        Q: "Which district has most data?"
+        A: "Karachi South with 1,234 records."
+
+        Q: "What is the total count?"
+        A: "The dataset contains 5,678 total records."
+
+        Answer the question directly and concisely."""
+
+
+class BackendUnavailable(Exception):
+    """Raised when a question needs the LLM but no backend is configured."""
+
+
+class GeminiBackend:
+    """LLM backend that calls Gemini through LangChain."""
+
+    def __init__(self, api_key, model=GEMINI_MODEL, temperature=0.1):
+        # Imported here so that sessions that never ask a question do not load the Gemini stack
+        import google.generativeai as genai
+        from langchain_google_genai import GoogleGenerativeAI
+
+        genai.configure(api_key=api_key)
+        self.client = GoogleGenerativeAI(
+            model=model,
+            google_api_key=api_key,
+            temperature=temperature
+        )
+
+    def invoke(self, prompt):
+        return self.client.invoke(prompt)
+
+    async def ainvoke(self, prompt):
+        return await self.client.ainvoke(prompt)
+
+
+class FakeBackend:
+    """Local stand-in backend for tests and benchmarks.
+
+    Returns a deterministic answer after an optional simulated latency and
+    counts how often it was called.
+    """
+
+    def __init__(self, latency=0.0, response=None):
+        self.latency = latency
+        self.response = response
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _answer(self, prompt):
+        with self._lock:
+            self.calls += 1
+        if self.response is not None:
+            return self.response
+        question = re.search(r"Question: (.*)", prompt)
+        return f"[fake] {question.group(1).strip() if question else 'answer'}"
+
+    def invoke(self, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(prompt)
+
+    async def ainvoke(self, prompt):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+
+# Backend name -> factory(**config)
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "fake": FakeBackend,
+}
+
+_backend_pool = {}
+_pool_lock = threading.Lock()
+
+
+def get_backend(name=None, **config):
+    """Return a pooled backend client, creating it on first use.
+
+    Clients are shared per (backend name, configuration), so repeated
+    questions never construct a new client.
+    """
+    name = name or LLM_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'")
+    key = (name, tuple(sorted(config.items())))
+    with _pool_lock:
+        if key not in _backend_pool:
+            _backend_pool[key] = BACKENDS[name](**config)
+        return _backend_pool[key]
+
+
+def normalize_question(question):
+    """Normalize a question for cache lookups (case, whitespace, trailing punctuation)."""
+    return re.sub(r"\s+", " ", question.strip().lower()).rstrip(" ?!.")
+
+
+def build_context(df, question, dataset_key, aggregates):
+    """Build the data context relevant to a question from the dataset's aggregate cube.
+
+    aggregates is an aggregates.AggregateStore.
+    """
+    question_lower = question.lower()
+    context_parts = []
+
+    # Add basic dataset info
+    context_parts.append(f"Total Records: {len(df)}")
+    context_parts.append(f"Available Columns: {', '.join(str(col) for col in df.columns)}")
+
+    # Add relevant data based on question
+    if 'district' in question_lower and 'district_name' in df.columns:
+        district_counts = aggregates.value_counts(dataset_key, df, 'district_name')
+        context_parts.append("\nDistrict Information:")
+        context_parts.append(f"Total Districts: {len(district_counts)}")
+        context_parts.append("Top Districts by Count:")
+        context_parts.append(district_counts.head().to_string())
+
+    if 'cadre' in question_lower and 'Cadre' in df.columns:
+        cadre_counts = aggregates.value_counts(dataset_key, df, 'Cadre')
+        context_parts.append("\nCadre Information:")
+        context_parts.append(cadre_counts.to_string())
+
+    if 'designation' in question_lower and 'designation_title' in df.columns:
+        designation_counts = aggregates.value_counts(dataset_key, df, 'designation_title')
+        context_parts.append("\nDesignation Information:")
+        context_parts.append(designation_counts.head().to_string())
+
+    # For questions about "most" or "highest"
+    if any(word in question_lower for word in ['most', 'highest', 'maximum', 'top']):
+        if 'district' in question_lower and 'district_name' in df.columns:
+            top_district = aggregates.value_counts(dataset_key, df, 'district_name').head(1)
+            if len(top_district) > 0:
+                context_parts.append("\nHighest Count District:")
+                context_parts.append(f"{top_district.index[0]}: {top_district.values[0]} records")
+
+    return "\n".join(context_parts)
+
+
+def build_prompt(context, question):
+    """Fill the analyst prompt template."""
+    return PROMPT_TEMPLATE.format(context=context, question=question)
+
+
+class ResponseCache:
+    """LRU cache of LLM responses with a time-to-live."""
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0}
+
+    @staticmethod
+    def make_key(dataset_key, question):
+        return (dataset_key, normalize_question(question), PROMPT_VERSION)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            stored_at, response = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return response
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def summary(self):
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
+
+
+class LatencyStats:
+    """Answer latency per source ("local", "cache" or "llm")."""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, source, seconds):
+        with self._lock:
+            stats = self._stats.setdefault(source, {"count": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+
+    def summary(self):
+        """Return {source: {"count", "mean_ms", "max_ms"}}."""
+        with self._lock:
+            return {
+                source: {
+                    "count": stats["count"],
+                    "mean_ms": round(1000 * stats["total"] / stats["count"], 2),
+                    "max_ms": round(1000 * stats["max"], 2),
+                }
+                for source, stats in self._stats.items()
+            }
+
+
+def local_answer(df, question, dataset_key, aggregates):
+    """Return (response, context) when the question can be answered without the LLM, else None."""
+    answer = answer_locally(df, question, dataset_key, aggregates)
+    if answer is None:
+        return None
+    response, intent = answer
+    return response, f"Answered locally from precomputed aggregates (intent: {intent})"
+
+
+def ask(df, question, dataset_key, backend, aggregates, response_cache=None,
+        latency_stats=None, use_local=True):
+    """Answer a question about df locally, from the cache or with the LLM.
+
+    Returns (response, context, source, seconds) where source is "local",
+    "cache" or "llm".
+    """
+    start = time.perf_counter()
+
+    def finish(response, context, source):
+        seconds = time.perf_counter() - start
+        if latency_stats is not None:
+            latency_stats.record(source, seconds)
+        return response, context, source, seconds
+
+    if use_local:
+        local = local_answer(df, question, dataset_key, aggregates)
+        if local is not None:
+            return finish(*local, "local")
+
+    context = build_context(df, question, dataset_key, aggregates)
+
+    key = ResponseCache.make_key(dataset_key, question)
+    if response_cache is not None:
+        response = response_cache.get(key)
+        if response is not None:
+            return finish(response, context, "cache")
+
+    if backend is None:
+        raise BackendUnavailable("No LLM backend configured")
+    response = backend.invoke(build_prompt(context, question))
+    if response_cache is not None:
+        response_cache.put(key, response)
+    return finish(response, context, "llm")
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import time
+
+import llm
+
+# Defaults for running many questions at once
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+LLM_RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", "60"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_RETRY_BACKOFF_SECONDS = 1.0
+
+FOLLOW_UP_TEMPLATE = (
+    "Based on the previous analysis about '{question}', what are 3 relevant "
+    "follow-up questions we could ask about this data?"
+)
+
+
+def follow_up_question(question):
+    """Return the follow-up prompt used by "Generate Follow-up Questions"."""
+    return FOLLOW_UP_TEMPLATE.format(question=question)
+
+
+class RateLimiter:
+    """Spaces out request starts so at most rate_per_minute begin per minute."""
+
+    def __init__(self, rate_per_minute):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+async def _invoke(backend, prompt, timeout):
+    """Call the backend asynchronously, in a worker thread if it has no ainvoke."""
+    if hasattr(backend, "ainvoke"):
+        call = backend.ainvoke(prompt)
+    else:
+        call = asyncio.to_thread(backend.invoke, prompt)
+    return await asyncio.wait_for(call, timeout)
+
+
+async def _answer(df, question, dataset_key, backend, aggregates, response_cache,
+                  semaphore, limiter, timeout, retries, latency_stats, use_local):
+    """Answer one question with caching, concurrency and rate limits, timeout and retries."""
+    start = time.perf_counter()
+    result = {"question": question, "response": None, "context": None, "source": None,
+              "cached": False, "error": None, "attempts": 0}
+
+    def finish(source):
+        result["source"] = source
+        result["seconds"] = time.perf_counter() - start
+        if latency_stats is not None and result["error"] is None:
+            latency_stats.record(source, result["seconds"])
+        return result
+
+    # Plain counts and percentages never need the LLM
+    local = llm.local_answer(df, question, dataset_key, aggregates) if use_local else None
+    if local is not None:
+        result.update(response=local[0], context=local[1])
+        return finish("local")
+
+    context = llm.build_context(df, question, dataset_key, aggregates)
+    result["context"] = context
+
+    key = llm.ResponseCache.make_key(dataset_key, question)
+    cached = response_cache.get(key) if response_cache is not None else None
+    if cached is not None:
+        result.update(response=cached, cached=True)
+        return finish("cache")
+
+    if backend is None:
+        result["error"] = "No LLM backend configured"
+        return finish("llm")
+
+    prompt = llm.build_prompt(context, question)
+    for attempt in range(retries + 1):
+        result["attempts"] = attempt + 1
+        try:
+            async with semaphore:
+                await limiter.acquire()
+                response = await _invoke(backend, prompt, timeout)
+            if response_cache is not None:
+                response_cache.put(key, response)
+            result.update(response=response, error=None)
+            break
+        except asyncio.TimeoutError:
+            result["error"] = f"Timed out after {timeout:.0f}s"
+        except Exception as e:
+            result["error"] = str(e)
+        if attempt < retries:
+            await asyncio.sleep(LLM_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+    return finish("llm")
+
+
+async def run_questions_async(df, questions, dataset_key, backend, aggregates, response_cache=None,
+                              concurrency=LLM_CONCURRENCY, rate_per_minute=LLM_RATE_PER_MINUTE,
+                              timeout=LLM_TIMEOUT_SECONDS, retries=LLM_RETRIES, on_result=None,
+                              latency_stats=None, use_local=True):
+    """Answer many questions concurrently; on_result(index, result) fires as each completes.
+
+    Returns the results in the order of questions.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = RateLimiter(rate_per_minute)
+
+    async def indexed(idx, question):
+        return idx, await _answer(df, question, dataset_key, backend, aggregates, response_cache,
+                                  semaphore, limiter, timeout, retries, latency_stats, use_local)
+
+    results = [None] * len(questions)
+    for future in asyncio.as_completed([indexed(idx, q) for idx, q in enumerate(questions)]):
+        idx, result = await future
+        results[idx] = result
+        if on_result is not None:
+            on_result(idx, result)
+    return results
+
+
+def run_questions(df, questions, dataset_key, backend, aggregates, response_cache=None, **options):
+    """Synchronous wrapper around run_questions_async for scripts and Streamlit."""
+    return asyncio.run(run_questions_async(
+        df, list(questions), dataset_key, backend, aggregates, response_cache, **options
+    ))
@@ -0,0 +1,195 @@
+import re
+
+from cadre_mapping import UNMAPPED
+
+# Words used in questions -> the column they refer to
+COLUMN_WORDS = {
+    "cadre": "Cadre",
+    "district": "district_name",
+    "designation": "designation_title",
+}
+
+# Questions asking for explanation or judgement always go to the LLM
+_OPEN_ENDED = re.compile(
+    r"\b(why|explain|suggest|recommend|trends?|compare|comparison|insights?|anomal\w*|"
+    r"should|follow-up|correlat\w*|predict\w*)\b"
+)
+_BREAKDOWN = re.compile(r"\b(each|per|by|every|distribution|breakdown|all)\b")
+_MOST = re.compile(r"\b(most|highest|maximum|top|largest|biggest)\b")
+_LEAST = re.compile(r"\b(least|lowest|minimum|fewest|smallest)\b")
+_PERCENT = re.compile(r"\b(percent|percentage|share|proportion)\b|%")
+_COUNT = re.compile(r"\b(how many|count|number of|total)\b")
+_DISTINCT = re.compile(r"\b(distinct|unique|different)\b")
+# Statistics of a numeric column, answered from the cube's numeric summary
+NUMERIC_STAT_WORDS = {
+    "mean": re.compile(r"\b(average|avg|mean)\b"),
+    "min": re.compile(r"\b(minimum|min|lowest|smallest|youngest)\b"),
+    "max": re.compile(r"\b(maximum|max|highest|largest|biggest|oldest)\b"),
+}
+# Conditions on other values ("above 50000", "missing age") need the LLM
+_CONDITION = re.compile(
+    r"\b(above|below|over|under|more|less|greater|fewer|than|between|older|younger|missing|null|"
+    r"empty|blank|duplicat\w*|without|not|no)\b|[<>=]|\d"
+)
+# Words of an unqualified "how many records are there" question
+_TOTAL_WORDS = {
+    "how", "many", "what", "whats", "s", "is", "the", "total", "overall", "count", "number", "of",
+    "records", "rows", "entries", "staff", "data", "are", "there", "in", "this", "that", "dataset",
+    "file", "sheet", "does", "do", "contain", "have", "has", "we", "a",
+}
+
+# Values shorter than this are too ambiguous to look for in a question
+MIN_VALUE_LENGTH = 3
+
+
+def _column_in(question, df):
+    """Return the first column mentioned in question that exists in df."""
+    for word, column in COLUMN_WORDS.items():
+        if re.search(rf"\b{word}", question) and column in df.columns:
+            return column
+    return None
+
+
+def _mentioned_values(question, df, dataset_key, aggregates):
+    """Return [(column, value, count)] with the longest value of each column named in question."""
+    mentioned = []
+    for column in COLUMN_WORDS.values():
+        if column not in df.columns:
+            continue
+        best = None
+        counts = aggregates.value_counts(dataset_key, df, column)
+        for value, count in counts.items():
+            text = str(value).lower()
+            if len(text) < MIN_VALUE_LENGTH or text == "n/a":
+                continue
+            if best is not None and len(text) <= len(str(best[1])):
+                continue
+            if re.search(rf"(?<!\w){re.escape(text)}(?!\w)", question):
+                best = (column, value, int(count))
+        if best is not None:
+            mentioned.append(best)
+    return mentioned
+
+
+def _names_other_column(question, df, column):
+    """Return True if question names a column of df other than column."""
+    for word, name in COLUMN_WORDS.items():
+        if name != column and name in df.columns and re.search(rf"\b{word}", question):
+            return True
+    for name in df.columns:
+        text = str(name).lower().replace("_", " ")
+        if name != column and len(text) >= MIN_VALUE_LENGTH and re.search(rf"\b{re.escape(text)}\b", question):
+            return True
+    return False
+
+
+def _numeric_column(question, columns):
+    """Return the longest numeric column name (underscores read as spaces) in question."""
+    best = None
+    for name in columns:
+        text = str(name).lower().replace("_", " ")
+        if re.search(rf"\b{re.escape(text)}\b", question) and (best is None or len(text) > len(best[1])):
+            best = (name, text)
+    return best
+
+
+def _number(value):
+    return f"{value:,.0f}" if float(value).is_integer() else f"{value:,.2f}"
+
+
+def _asks_total(question):
+    """Return True for an unqualified question about the number of records."""
+    words = re.findall(r"[a-z]+|\d+", question)
+    return bool(words) and set(words) <= _TOTAL_WORDS
+
+
+def _percent(count, total):
+    return 100.0 * count / total if total else 0.0
+
+
+def answer_locally(df, question, dataset_key, aggregates):
+    """Answer simple count/percentage/statistic questions from the dataset's aggregate cube.
+
+    Returns (answer, intent), or None when the question is not recognized
+    and should go to the LLM instead.
+    """
+    q = question.lower().strip()
+    if not q or _OPEN_ENDED.search(q):
+        return None
+    total = len(df)
+    column = _column_in(q, df)
+    # Questions filtered to a specific value ("... in Karachi South") need the LLM
+    mentioned = _mentioned_values(q, df, dataset_key, aggregates)
+
+    # Unmapped designations
+    if "unmapped" in q and "Cadre" in df.columns and all(m[1] == UNMAPPED for m in mentioned):
+        cube = aggregates.cube(dataset_key, df)
+        unmapped = cube.rows_where("Cadre", UNMAPPED)
+        rows = int(unmapped["count"].sum())
+        if "designation_title" in cube.dims:
+            unique = unmapped["designation_title"].nunique()
+            return (f"There are {unique:,} unmapped designations covering {rows:,} records "
+                    f"({_percent(rows, total):.1f}% of all records).", "unmapped")
+        return f"There are {rows:,} records with unmapped designations.", "unmapped"
+
+    # Average, minimum or maximum of a numeric column, e.g. "What is the average age?"
+    stats = [stat for stat, words in NUMERIC_STAT_WORDS.items() if words.search(q)]
+    cube = aggregates.cube(dataset_key, df) if stats else None
+    numeric = _numeric_column(q, cube.numeric_columns) if stats else None
+    if numeric is not None:
+        column, text = numeric
+        rest = q.replace(text, " ")
+        # "average age per district" or "highest salary of UCMO" need the LLM
+        if (len(stats) > 1 or mentioned or _BREAKDOWN.search(rest) or _CONDITION.search(rest)
+                or _names_other_column(rest, df, column)):
+            return None
+        value = cube.numeric_stat(column, stats[0])
+        if value is None:
+            return "Data not available", f"{stats[0]}:{column}"
+        word = {"mean": "average", "min": "minimum", "max": "maximum"}[stats[0]]
+        count = int(cube.numeric_stat(column, "count"))
+        return (f"The {word} {text} is {_number(value)} (over {count:,} records with a value).",
+                f"{stats[0]}:{column}")
+
+    # Count and percentage for each value of a column
+    asks_amount = _COUNT.search(q) or _PERCENT.search(q)
+    if column is not None and not mentioned and _BREAKDOWN.search(q) and asks_amount:
+        counts = aggregates.value_counts(dataset_key, df, column)
+        lines = [f"- {value}: {int(count):,} records ({_percent(count, total):.1f}%)"
+                 for value, count in counts.items()]
+        return "\n".join(lines) if lines else "Data not available", f"breakdown:{column}"
+
+    # Most / least common value of a column
+    if column is not None and not mentioned and (_MOST.search(q) or _LEAST.search(q)):
+        counts = aggregates.value_counts(dataset_key, df, column)
+        if len(counts) == 0:
+            return "Data not available", f"top:{column}"
+        least = bool(_LEAST.search(q)) and not _MOST.search(q)
+        value = counts.index[-1] if least else counts.index[0]
+        count = int(counts.iloc[-1] if least else counts.iloc[0])
+        return (f"{value} with {count:,} records ({_percent(count, total):.1f}%).",
+                f"{'bottom' if least else 'top'}:{column}")
+
+    # Number of distinct values of a column
+    if column is not None and not mentioned and _DISTINCT.search(q) and _COUNT.search(q):
+        distinct = len(aggregates.value_counts(dataset_key, df, column))
+        word = next(word for word, name in COLUMN_WORDS.items() if name == column)
+        return f"There are {distinct:,} distinct {word} values.", f"distinct:{column}"
+
+    # Percentage or count for a specific value, e.g. "District Level" or a district name
+    if len(mentioned) == 1 and asks_amount:
+        column, value, count = mentioned[0]
+        # "... per Cadre in Karachi South" or "UCMO with age above 40" are not a plain count
+        rest = q.replace(str(value).lower(), " ")
+        if _BREAKDOWN.search(rest) or _CONDITION.search(rest) or _names_other_column(rest, df, column):
+            return None
+        if _PERCENT.search(q):
+            return (f"{_percent(count, total):.1f}% of records ({count:,} of {total:,}) "
+                    f"are {value}.", f"percent:{column}")
+        return f"{value} with {count:,} records.", f"count:{column}"
+
+    # Total number of records, only when nothing narrows the question down
+    if not mentioned and _COUNT.search(q) and _asks_total(q):
+        return f"The dataset contains {total:,} total records.", "total"
+
+    return None
@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from types import MappingProxyType
+
+# Location of the persistent designation → cadre mapping database
+MAPPING_DB_PATH = os.getenv("MAPPING_DB_PATH", "cadre_mappings.db")
+
+# Read-only mapping snapshots kept in memory (one per version)
+MAPPING_SNAPSHOTS = 8
+
+
+class MappingStore:
+    """Versioned designation → cadre mappings persisted in SQLite.
+
+    Every update creates a new version and only records the designations that
+    changed, so the mapping at any version (and the changes between two
+    versions) can be rebuilt from the history. Versions never change once
+    written, so each is loaded once into a read-only snapshot shared by all
+    sessions of the process.
+    """
+
+    def __init__(self, path=MAPPING_DB_PATH):
+        self.path = path
+        # Reentrant so that update() can read the current mapping under the same lock
+        self._lock = threading.RLock()
+        self._snapshots = OrderedDict()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS mapping_versions (
+                    version INTEGER PRIMARY KEY,
+                    created_at TEXT NOT NULL,
+                    note TEXT
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS mappings (
+                    designation TEXT NOT NULL,
+                    cadre TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    PRIMARY KEY (designation, version)
+                )"""
+            )
+
+    def version(self):
+        """Return the current mapping version (0 for an empty store)."""
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(version) FROM mapping_versions").fetchone()
+        return row[0] or 0
+
+    def snapshot(self, version=None):
+        """Return the read-only designation → cadre mapping as of version (default: latest)."""
+        with self._lock:
+            if version is None:
+                version = self.version()
+            if version in self._snapshots:
+                self._snapshots.move_to_end(version)
+                return self._snapshots[version]
+            rows = self._conn.execute(
+                """SELECT m.designation, m.cadre FROM mappings m
+                   JOIN (SELECT designation, MAX(version) AS version FROM mappings
+                         WHERE version <= ? GROUP BY designation) latest
+                   ON m.designation = latest.designation AND m.version = latest.version""",
+                (version,)
+            ).fetchall()
+            return self._keep_snapshot(version, dict(rows))
+
+    def _keep_snapshot(self, version, mappings):
+        snapshot = MappingProxyType(mappings)
+        self._snapshots[version] = snapshot
+        while len(self._snapshots) > MAPPING_SNAPSHOTS:
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+    def mappings(self, version=None):
+        """Return the designation → cadre dict as of version (default: latest), as a new dict."""
+        return dict(self.snapshot(version))
+
+    def changes_since(self, version, until=None):
+        """Return {designation: cadre} for designations changed after version (up to until)."""
+        if until is None:
+            until = self.version()
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT designation, cadre FROM mappings
+                   WHERE version > ? AND version <= ? ORDER BY version""",
+                (version, until)
+            ).fetchall()
+        return dict(rows)
+
+    def update(self, new_mappings, note=""):
+        """Record changed mappings as a new version.
+
+        Returns (version, changed) where changed holds only the entries that
+        differ from the current mapping; no version is created if nothing changed.
+        The comparison and the insert happen under one lock, so concurrent
+        sessions never create the same version or overwrite each other's change.
+        """
+        with self._lock:
+            current = self.snapshot()
+            changed = {designation: cadre for designation, cadre in new_mappings.items()
+                       if current.get(designation) != cadre}
+            if not changed:
+                return self.version(), {}
+            version = self._insert_version(changed, note)
+            # Copy-on-write: the new snapshot is built from the current one, which is left as is
+            self._keep_snapshot(version, {**current, **changed})
+        return version, changed
+
+    def _insert_version(self, changed, note):
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT MAX(version) FROM mapping_versions").fetchone()
+            version = (row[0] or 0) + 1
+            self._conn.execute(
+                "INSERT INTO mapping_versions (version, created_at, note) VALUES (?, ?, ?)",
+                (version, datetime.now(timezone.utc).isoformat(), note)
+            )
+            self._conn.executemany(
+                "INSERT INTO mappings (designation, cadre, version) VALUES (?, ?, ?)",
+                [(designation, cadre, version) for designation, cadre in changed.items()]
+            )
+        return version
+
+    def seed(self, defaults):
+        """Store the built-in mappings as version 1 if the store is empty."""
+        if self.version() == 0:
+            self.update(defaults, note="Built-in defaults")
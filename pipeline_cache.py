@@ -0,0 +1,283 @@
+import hashlib
+import itertools
+import os
+import threading
+import weakref
+from collections import Counter, OrderedDict
+
+import pandas as pd
+
+# Defaults can be overridden through the environment (.env)
+DEFAULT_MAX_MB = float(os.getenv("PIPELINE_CACHE_MAX_MB", "512"))
+DEFAULT_SPILL_DIR = os.getenv("PIPELINE_CACHE_DIR", os.path.join(".cache", "pipeline"))
+DEFAULT_DISK_MB = float(os.getenv("PIPELINE_CACHE_DISK_MB", "2048"))
+
+
+def file_digest(file_bytes, file_name):
+    """Return a content hash of the uploaded bytes and the file extension."""
+    digest = hashlib.sha256()
+    digest.update(file_bytes)
+    # The extension decides how the bytes are parsed, so it is part of the digest
+    digest.update(os.path.splitext(file_name)[1].lower().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def combined_digest(file_digests, options=""):
+    """Return one digest for several uploaded files (in upload order) and parse options."""
+    digest = hashlib.sha256()
+    for part in file_digests:
+        digest.update(part.encode("utf-8"))
+    digest.update(options.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def make_cache_key(dataset_digest, mappings_version):
+    """Build a content-addressed key from the dataset digest and mapping version."""
+    return f"{dataset_digest}-v{mappings_version}"
+
+
+def shared_copy(df):
+    """Return a frame that shares df's data; changes to either copy the touched columns only.
+
+    This relies on copy-on-write, which is always on from pandas 3 (see requirements.txt).
+    """
+    return df.copy(deep=False)
+
+
+def prune_files(directory, suffix, max_bytes, keep=()):
+    """Delete the least recently used files ending in suffix until the rest fit in max_bytes.
+
+    Files are ordered by modification time, so readers should touch a file
+    they reuse. Paths in keep are never deleted. Returns the deleted paths.
+    """
+    try:
+        entries = [entry for entry in os.scandir(directory) if entry.name.endswith(suffix)]
+        entries = [(entry.path, entry.stat()) for entry in entries if entry.is_file()]
+    except OSError:
+        return []
+    keep = {os.path.abspath(path) for path in keep}
+    # Kept files count first, then the others newest first
+    entries.sort(key=lambda item: (os.path.abspath(item[0]) not in keep, -item[1].st_mtime))
+    removed = []
+    total = 0
+    for path, info in entries:
+        total += info.st_size
+        if total > max_bytes and os.path.abspath(path) not in keep:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= info.st_size
+            removed.append(path)
+    return removed
+
+
+def read_spill(path):
+    """Read a spilled frame back with the dtypes it was written with.
+
+    Parquet brings text back as "str" and categories as "str" indexes, while
+    clean_data keeps object categories (and some object columns), so those
+    are restored from the pandas metadata stored in the file.
+    """
+    import pyarrow.parquet as pq
+
+    df = pd.read_parquet(path)
+    columns = (pq.read_schema(path).pandas_metadata or {}).get("columns", [])
+    object_columns = {column["name"] for column in columns if column.get("numpy_type") == "object"}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            if not pd.api.types.is_object_dtype(dtype.categories.dtype):
+                categories = pd.Index(dtype.categories, dtype=object)
+                df[col] = pd.Categorical.from_codes(df[col].cat.codes, categories=categories)
+        elif col in object_columns and not pd.api.types.is_object_dtype(dtype):
+            df[col] = df[col].astype(object)
+    return df
+
+
+class SessionLease:
+    """Token of one session's use of a cached dataset.
+
+    Kept in the session's state; when the session ends and the lease is
+    garbage collected, its reference in the cache is released.
+    """
+
+    _ids = itertools.count()
+
+    def __init__(self, cache):
+        self.id = next(self._ids)
+        self.cache = cache
+        self.key = None
+        weakref.finalize(self, cache.release, self.id)
+
+    def hold(self, key):
+        """Reference key (releasing the dataset this session held before)."""
+        if key != self.key:
+            self.cache.acquire(self.id, key)
+            self.key = key
+
+
+class PipelineCache:
+    """Process-wide store of processed DataFrames, shared by all sessions.
+
+    Each dataset (content digest + mapping version) is held once in memory
+    and handed out as copy-on-write frames, so sessions viewing the same
+    file share one copy and their own changes never leak into it. Sessions
+    reference the dataset they are viewing; when memory is over budget the
+    least recently used datasets that no session references are spilled to
+    Parquet and dropped. Spill files are kept within max_disk_mb, least
+    recently used first out.
+    """
+
+    def __init__(self, max_mb=DEFAULT_MAX_MB, spill_dir=DEFAULT_SPILL_DIR, max_disk_mb=DEFAULT_DISK_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.spill_dir = spill_dir
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._holders = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "spill_hits": 0, "misses": 0, "evictions": 0, "spill_errors": 0,
+                      "spill_removed": 0}
+
+    @property
+    def used_bytes(self):
+        return sum(self._sizes.values())
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"{key}.parquet")
+
+    def get(self, key):
+        """Return a (copy-on-write) copy of the cached DataFrame for key, or None on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return shared_copy(self._entries[key])
+
+        # Fall back to the on-disk spill before declaring a miss
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            try:
+                df = read_spill(path)
+                # Mark the file as recently used for the disk budget
+                os.utime(path)
+            except Exception:
+                df = None
+            if df is not None:
+                with self._lock:
+                    self.stats["spill_hits"] += 1
+                self.put(key, df)
+                return shared_copy(df)
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def contains(self, key):
+        """Return True if key is cached in memory or on disk, without touching the counters."""
+        with self._lock:
+            if key in self._entries:
+                return True
+        return os.path.exists(self._spill_path(key))
+
+    def put(self, key, df):
+        """Store df under key, evicting least recently used entries over budget.
+
+        The cache keeps its own copy-on-write copy, so later changes to df by
+        the caller do not alter the stored dataset.
+        """
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = shared_copy(df)
+            self._sizes[key] = size
+            evicted = self._evict(keep=key)
+
+        for old_key, old_df in evicted:
+            self._spill(old_key, old_df)
+
+    def _evict(self, keep=None):
+        """Drop unreferenced entries, oldest first, until within budget (lock held).
+
+        keep (default: the most recently used entry) is never dropped.
+        """
+        if keep is None and self._entries:
+            keep = next(reversed(self._entries))
+        evicted = []
+        held = set(self._holders.values())
+        # Entries in use stay: their memory is not freed while a session holds them anyway
+        for old_key in [key for key in self._entries if key != keep and key not in held]:
+            if self.used_bytes <= self.max_bytes:
+                break
+            evicted.append((old_key, self._entries.pop(old_key)))
+            self._sizes.pop(old_key, None)
+            self.stats["evictions"] += 1
+        return evicted
+
+    def acquire(self, holder, key):
+        """Record that holder (a session) uses key, releasing what it held before."""
+        with self._lock:
+            self._holders[holder] = key
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            evicted = self._evict(keep=key)
+        for old_key, old_df in evicted:
+            self._spill(old_key, old_df)
+
+    def release(self, holder):
+        """Drop holder's reference and evict what became unreferenced over budget."""
+        with self._lock:
+            if self._holders.pop(holder, None) is None:
+                return
+            evicted = self._evict()
+        for old_key, old_df in evicted:
+            self._spill(old_key, old_df)
+
+    def references(self, key):
+        """Return how many sessions currently hold key."""
+        with self._lock:
+            return sum(1 for held in self._holders.values() if held == key)
+
+    def _spill(self, key, df):
+        """Write an evicted entry to Parquet so a later rerun can reload it."""
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            # Keep the index: deduplicated frames have gaps that later deltas line up with
+            df.to_parquet(tmp_path, index=True)
+            os.replace(tmp_path, path)
+        except Exception:
+            # Mixed-type object columns cannot always be written; just drop them
+            with self._lock:
+                self.stats["spill_errors"] += 1
+            return
+        removed = prune_files(self.spill_dir, ".parquet", self.max_disk_bytes, keep=[path])
+        if removed:
+            with self._lock:
+                self.stats["spill_removed"] += len(removed)
+
+    def clear(self, spilled=False):
+        """Drop all in-memory entries, and the spilled files too when spilled is set."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+        if spilled:
+            prune_files(self.spill_dir, ".parquet", 0)
+
+    def summary(self):
+        """Return counters and usage for display."""
+        with self._lock:
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "sessions": len(self._holders),
+                "shared": sum(1 for count in Counter(self._holders.values()).values() if count > 1),
+                "used_mb": round(self.used_bytes / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+            }
@@ -0,0 +1,341 @@
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from cadre_mapping import apply_mappings
+from cleaning import clean_frame, concat_column, memory_report
+from dedup import Deduplicator
+from ingestion import file_size, flatten_columns, stream_process
+from mapping_store import MappingStore
+
+# Built-in mappings, used to seed the persistent mapping store on first run.
+# "Federal/Provincial/District Facilitator" and "ComNET staff" used to appear twice;
+# only the entry that actually took effect (the later one) is kept.
+CADRE_MAPPINGS = {
+    "District NSTOP Officer": "District Level",
+    "DCO/DHCSO": "District Level",
+    "Disease Surveillance Officer": "District Level",
+    "Immunization Officer": "District Level",
+    "Divisional NSTOP Officer": "District Level",
+    "Area Coordinator / District Coordinator": "District Level",
+    "Provincial Facilitator (M&E, Campaign, HRMP, etc.)": "District Level",
+    "DDHO": "District Level",
+    "CEO/DHO": "District Level",
+    "DSV / ASV": "District Level",
+    "Federal Facilitator (UNICEF)": "Federal Level",
+    "EPI Coordinator": "Provincial Level",
+    "Provincial Facilitator (EPI, Coordinator etc)": "Provincial Level",
+    "Federal/Provincial/District Facilitator": "Provincial Level",
+    "TPO/ TDO": "Town Level",
+    "ComNET staff": "Town Level",
+    "TCO": "Town Level",
+    "UCPO / UCSP/ UCDO": "UC Level",
+    "UCMO": "UC Level",
+    "TTSP/TUSP": "UC Level",
+    "Social Mobilizers": "UC Level",
+    "Independent Monitor": "UC Level",
+}
+
+# Worker processes for multi-file / multi-sheet parsing (0: one per CPU)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))
+
+# Smaller uploads are parsed in-process; starting workers would cost more than it saves
+PARALLEL_MIN_MB = float(os.getenv("INGEST_PARALLEL_MIN_MB", "5"))
+
+# Columns identifying where each row came from when several sheets or files are combined
+SOURCE_FILE_COLUMN = "source_file"
+SOURCE_SHEET_COLUMN = "source_sheet"
+
+
+def get_mapping_store(path=None):
+    """Open the persistent mapping store, seeding it with the built-in mappings."""
+    store = MappingStore(path) if path else MappingStore()
+    store.seed(CADRE_MAPPINGS)
+    return store
+
+
+def upload_and_parse_file(uploaded_file, file_name=None, sheet_name=0):
+    """Parse an uploaded file (or a path) into a DataFrame with flat column names."""
+    file_name = file_name or getattr(uploaded_file, "name", str(uploaded_file))
+
+    # Detect file type and parse accordingly
+    if file_name.lower().endswith(".csv"):
+        df = pd.read_csv(uploaded_file)
+    else:
+        # Handle multi-level headers
+        df = pd.read_excel(uploaded_file, header=[0, 1], sheet_name=sheet_name)
+
+    # If multi-level headers exist, combine them
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = flatten_columns(df.columns.values)
+
+    return df
+
+
+def sheet_names(uploaded_file, file_name=None):
+    """Return the sheet names of a workbook, or [None] for a CSV file."""
+    file_name = file_name or getattr(uploaded_file, "name", str(uploaded_file))
+    if file_name.lower().endswith(".csv"):
+        return [None]
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+    with pd.ExcelFile(uploaded_file) as workbook:
+        return list(workbook.sheet_names)
+
+
+def _column_key(column):
+    """Key under which differently spelled headers are aligned ("District_Name " -> "district name")."""
+    return re.sub(r"[\s_]+", " ", str(column)).strip().lower()
+
+
+def align_columns(frames):
+    """Rename columns so headers differing only in case, spaces or underscores match.
+
+    Each header takes the spelling it had in the first frame where it appeared.
+    """
+    canonical = {}
+    aligned = []
+    for frame in frames:
+        names = [canonical.setdefault(_column_key(column), column) for column in frame.columns]
+        if len(set(names)) < len(names):
+            # Two headers of this sheet collapse to one name; keep them apart
+            names = list(frame.columns)
+        aligned.append(frame.set_axis(names, axis=1))
+    return aligned
+
+
+def _parse_sheet(source, file_name, sheet_name):
+    """Parse one sheet (or CSV file), naming it in any error."""
+    try:
+        return upload_and_parse_file(source, file_name, sheet_name)
+    except Exception as e:
+        label = file_name if sheet_name in (None, 0) else f"{file_name} [{sheet_name}]"
+        raise ValueError(f"{label}: {e}") from e
+
+
+def _parse_sheets(source, file_name, sheets=None, skip_errors=False):
+    """Parse sheets of one file, opening the workbook once; sheets=None reads all of them.
+
+    Returns ([(sheet name, frame)], [error messages]); the sheet name is None
+    for CSV files. With skip_errors, a sheet that cannot be parsed (e.g. a
+    one-line notes sheet without the two header rows) is reported and left
+    out instead of failing the whole file.
+    """
+    if file_name.lower().endswith(".csv"):
+        return [(None, _parse_sheet(source, file_name, None))], []
+    parsed, skipped = [], []
+    with pd.ExcelFile(source) as workbook:
+        if sheets is None:
+            sheets = workbook.sheet_names
+        for sheet in sheets:
+            try:
+                parsed.append((sheet, _parse_sheet(workbook, file_name, sheet)))
+            except ValueError as e:
+                if not skip_errors:
+                    raise
+                skipped.append(str(e))
+    return parsed, skipped
+
+
+def _sheet_groups(source, file_name, groups):
+    """Split a workbook's sheets into at most `groups` contiguous groups."""
+    if groups <= 1 or file_name.lower().endswith(".csv"):
+        return [None]
+    names = sheet_names(source, file_name)
+    size = -(-len(names) // min(groups, len(names)))
+    return [names[start:start + size] for start in range(0, len(names), size)]
+
+
+def parse_uploads(uploads, all_sheets=True, workers=None):
+    """Parse several files (and all their sheets) in parallel into one frame.
+
+    uploads is a list of (path or file object, file name). Files, or groups
+    of sheets when there are fewer files than workers, are parsed in a
+    process pool that opens each workbook once per task. Headers are
+    flattened and aligned, source columns are added when more than one sheet
+    is read, and the frames are concatenated once at the end. When reading
+    all sheets, sheets that fail to parse are skipped and their errors are
+    listed in df.attrs["skipped_sheets"]; the upload only fails when no
+    sheet could be read.
+    """
+    workers = workers or INGEST_WORKERS or os.cpu_count() or 1
+    total_mb = sum(file_size(source) or 0 for source, _ in uploads) / (1024 * 1024)
+    if total_mb < PARALLEL_MIN_MB:
+        workers = 1
+    groups_per_file = max(1, workers // len(uploads)) if all_sheets else 1
+
+    tasks = []
+    for source, file_name in uploads:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        groups = _sheet_groups(source, file_name, groups_per_file) if all_sheets else [[0]]
+        tasks.extend((source, file_name, group) for group in groups)
+
+    if len(tasks) == 1 or workers == 1:
+        results = []
+        for source, file_name, group in tasks:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            results.append(_parse_sheets(source, file_name, group, all_sheets))
+    else:
+        with tempfile.TemporaryDirectory() as spill_dir:
+            # Workers read uploads from disk instead of receiving a pickled copy per task
+            spilled = {}
+            for idx, (source, file_name, _) in enumerate(tasks):
+                if not isinstance(source, str) and id(source) not in spilled:
+                    path = os.path.join(spill_dir, f"{idx}_{os.path.basename(file_name)}")
+                    source.seek(0)
+                    with open(path, "wb") as f:
+                        f.write(source.read())
+                    spilled[id(source)] = path
+            tasks = [(spilled.get(id(source), source), file_name, group)
+                     for source, file_name, group in tasks]
+
+            # Parsing holds the GIL, so tasks go to processes; spawn is safe inside threaded servers
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(min(workers, len(tasks)), mp_context=context) as executor:
+                skip_errors = [all_sheets] * len(tasks)
+                results = list(executor.map(_parse_sheets, *zip(*tasks), skip_errors))
+
+    parsed = [(file_name, sheet if all_sheets else None, frame)
+              for (_, file_name, _), (sheets, _) in zip(tasks, results) for sheet, frame in sheets]
+    skipped = [error for _, errors in results for error in errors]
+    if not parsed:
+        raise ValueError(skipped[0])
+    if len(parsed) == 1:
+        df = parsed[0][2]
+        df.attrs["skipped_sheets"] = skipped
+        return df
+
+    # Empty sheets (cover pages, notes) have no rows to combine
+    parsed = [item for item in parsed if len(item[2]) > 0] or parsed[:1]
+    for file_name, sheet, frame in parsed:
+        frame.insert(0, SOURCE_FILE_COLUMN, os.path.basename(file_name))
+        if sheet is not None:
+            frame.insert(1, SOURCE_SHEET_COLUMN, sheet)
+    frames = align_columns([frame for _, _, frame in parsed])
+    df = pd.concat(frames, ignore_index=True, sort=False)
+    df.attrs["skipped_sheets"] = skipped
+    return df
+
+
+def clean_data(df, compact=True, deduplicator=None):
+    """Clean the DataFrame and keep the per-column memory report in df.attrs."""
+    if deduplicator is None:
+        deduplicator = Deduplicator()
+    # Remove duplicates, strip and fill text columns, keep numeric dtypes with real nulls
+    df, report = clean_frame(df, compact=compact, deduplicator=deduplicator)
+    df.attrs["cleaning_report"] = report
+    df.attrs["dedup_report"] = dict(deduplicator.stats)
+    return df
+
+
+def map_designations(df, mappings, version=None, column_name="designation_title"):
+    """Create the Cadre column from mappings, looked up once per unique designation."""
+    if column_name not in df.columns:
+        raise KeyError(f"Column '{column_name}' not found in the uploaded file.")
+
+    df = apply_mappings(df, mappings, column_name)
+    df.attrs["mapping_version"] = version
+    return df
+
+
+def _append_column(old, new):
+    """Append new values to a processed column, keeping its dtype.
+
+    Categoricals keep their categories and codes; values not seen before are
+    appended as new categories, so only the new rows are encoded.
+    """
+    if isinstance(old.dtype, pd.CategoricalDtype):
+        return concat_column([old, new], keep_category=True).array
+    if isinstance(new.dtype, pd.CategoricalDtype):
+        new = new.astype(object)
+    if pd.api.types.is_string_dtype(old.dtype) and not pd.api.types.is_object_dtype(old.dtype):
+        new = new.astype(old.dtype)
+    return pd.concat([old, new], ignore_index=True).array
+
+
+def append_processed(previous, delta):
+    """Append processed delta rows (same columns) to a processed frame."""
+    if len(delta) == 0:
+        return previous
+    df = pd.DataFrame(
+        {col: _append_column(previous[col], delta[col]) for col in previous.columns},
+        index=previous.index.append(delta.index),
+    )
+    df.attrs = dict(previous.attrs)
+    return df
+
+
+def process_delta(raw, previous, new_rows, mappings, version=None, deduplicator=None):
+    """Clean and map only the new rows of raw and append them to the processed previous frame.
+
+    previous must already be mapped at version. deduplicator should remember
+    the key hashes of the previous rows so repeats of them are dropped.
+    Returns the combined frame and the processed delta.
+    """
+    if deduplicator is None:
+        deduplicator = Deduplicator()
+    delta = clean_data(raw.take(new_rows), deduplicator=deduplicator)
+    if "designation_title" in delta.columns:
+        delta = map_designations(delta, mappings, version)
+
+    df = append_processed(previous, delta)
+    previous_report = previous.attrs.get("dedup_report") or {}
+    df.attrs["dedup_report"] = {
+        key: previous_report.get(key, 0) + value for key, value in deduplicator.stats.items()
+    }
+    if "Cadre" in df.columns:
+        df.attrs["mapping_version"] = version
+    return df, delta
+
+
+def stream_and_process_file(uploaded_file, mappings, version=None, on_chunk=None, file_name=None,
+                            deduplicator=None):
+    """Read a large file in chunks, cleaning and mapping each chunk as it arrives.
+
+    One deduplicator is shared by all chunks, so rows repeated in different
+    chunks are dropped without keeping earlier chunks' rows around. Each
+    chunk is compacted as it arrives, so only categorical codes pile up.
+    """
+    file_name = file_name or getattr(uploaded_file, "name", str(uploaded_file))
+    if deduplicator is None:
+        deduplicator = Deduplicator()
+    before = []
+
+    def process_chunk(chunk):
+        before.append(chunk.memory_usage(deep=True, index=False))
+        chunk = clean_data(chunk, deduplicator=deduplicator)
+        if "designation_title" in chunk.columns:
+            chunk = map_designations(chunk, mappings, version)
+        return chunk
+
+    df = stream_process(uploaded_file, file_name, process_chunk, on_chunk)
+    before = pd.concat(before, axis=1).sum(axis=1) if before else pd.Series(dtype="int64")
+    df.attrs["cleaning_report"] = memory_report(before, df.memory_usage(deep=True, index=False))
+    df.attrs["dedup_report"] = dict(deduplicator.stats)
+    if "Cadre" in df.columns:
+        df.attrs["mapping_version"] = version
+    return df
+
+
+def process_file(uploaded_file, mappings, version=None, streaming=False, file_name=None,
+                 all_sheets=False):
+    """Run the full parse → clean → map pipeline on one file."""
+    if streaming:
+        return stream_and_process_file(uploaded_file, mappings, version, file_name=file_name)
+
+    if all_sheets:
+        # Already inside a worker process: parse the sheets one after another
+        file_name = file_name or getattr(uploaded_file, "name", str(uploaded_file))
+        df = parse_uploads([(uploaded_file, file_name)], all_sheets=True, workers=1)
+    else:
+        df = upload_and_parse_file(uploaded_file, file_name)
+    df = clean_data(df)
+    if "designation_title" in df.columns:
+        df = map_designations(df, mappings, version)
+    return df
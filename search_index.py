@@ -0,0 +1,106 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+SEARCH_MODES = ["Contains", "Exact", "Regex"]
+
+# Number of recent query results kept per index
+QUERY_CACHE_SIZE = 32
+
+
+def search_text(values):
+    """Return values as lowercased text, formatted like DataFrame.astype(str)."""
+    return pd.Series(values).astype(str).str.lower()
+
+
+def match_text(text, term, mode):
+    """Return a boolean array over search_text values matching a check_term term."""
+    if mode == "Exact":
+        return (text == term).to_numpy()
+    if mode == "Regex":
+        return text.str.contains(term, case=False, regex=True, na=False).to_numpy()
+    return text.str.contains(term, regex=False, na=False).to_numpy()
+
+
+def check_term(term, mode):
+    """Validate the search mode and term; returns the term as it is matched."""
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}'")
+    if mode == "Regex":
+        try:
+            re.compile(term)
+        except re.error as e:
+            raise ValueError(f"Invalid regular expression: {e}")
+        return term
+    return term.lower()
+
+
+def compact_codes(codes, n_values):
+    """Return codes in the smallest signed integer dtype that holds n_values codes."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_values <= np.iinfo(dtype).max + 1:
+            return codes.astype(dtype, copy=False)
+    return codes.astype(np.int64, copy=False)
+
+
+class SearchIndex:
+    """Per-dataset search index built once when the data is loaded.
+
+    Every column is factorized into integer codes plus its lowercased unique
+    values (as text, like DataFrame.astype(str)). A search only scans the
+    unique values of each column and expands the hits back to rows through
+    the codes, so repeated searches never stringify the full frame.
+    Categorical columns reuse their own codes, and codes are kept in the
+    smallest integer dtype that fits.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.columns = df.columns.tolist()
+        self._codes = {}
+        self._uniques = {}
+        for col in self.columns:
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                uniques = pd.Index(series.cat.categories, dtype=object)
+                codes = series.cat.codes.to_numpy()
+                if (codes < 0).any():
+                    # Missing values (code -1) point one past the categories, at a missing entry
+                    codes = np.where(codes < 0, len(uniques), codes)
+                    uniques = uniques.append(pd.Index([np.nan], dtype=object))
+            else:
+                codes, uniques = pd.factorize(series, use_na_sentinel=False)
+            self._codes[col] = compact_codes(codes, len(uniques))
+            self._uniques[col] = search_text(uniques)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def search(self, term, columns=None, mode="Contains"):
+        """Return a boolean row mask for rows where any column matches term.
+
+        columns limits the search to the given columns (all columns when empty).
+        mode is one of SEARCH_MODES; matching is case-insensitive.
+        """
+        term = check_term(term, mode)
+        columns = [col for col in (columns or self.columns) if col in self._codes]
+
+        key = (term, tuple(columns), mode)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for col in columns:
+            hits = match_text(self._uniques[col], term, mode)
+            if hits.any():
+                mask |= hits[self._codes[col]]
+
+        with self._lock:
+            self._cache[key] = mask
+            while len(self._cache) > QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return mask
@@ -0,0 +1,9 @@
+import os
+
+
+def env_flag(name, default=False):
+    """Read an on/off setting from the environment; "1", "true" and "yes" turn it on."""
+    value = os.getenv(name, "").strip()
+    if not value:
+        return default
+    return value.lower() in ("1", "true", "yes")
@@ -0,0 +1,156 @@
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from settings import env_flag
+
+# Import the LLM and plotting stacks in the background as soon as the app starts
+STARTUP_WARM_UP = env_flag("STARTUP_WARM_UP")
+
+# Modules the app only imports when the feature that needs them is first used
+LAZY_GROUPS = {
+    "llm": ["langchain_google_genai", "google.generativeai"],
+    "plotting": ["plotly.express"],
+    "xlsx": ["openpyxl"],
+}
+
+# Module whose import is the cold-start cost of the app
+APP_MODULE = "app"
+
+_warm_up_times = {}
+_warm_up_lock = threading.Lock()
+
+
+def warm_up(groups=None):
+    """Import the lazily loaded modules of groups (all when None) in this process.
+
+    Returns {module: seconds}; modules that are already imported take no
+    time and missing ones are reported as None. Safe to call from a
+    background thread while the app is serving.
+    """
+    times = {}
+    for group in groups or LAZY_GROUPS:
+        for module in LAZY_GROUPS[group]:
+            start = time.perf_counter()
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                times[module] = None
+                continue
+            times[module] = time.perf_counter() - start
+    with _warm_up_lock:
+        _warm_up_times.update(times)
+    return times
+
+
+def warm_up_in_background(groups=None):
+    """Start warm_up in a daemon thread and return the thread."""
+    thread = threading.Thread(target=warm_up, args=(groups,), name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_up_times():
+    with _warm_up_lock:
+        return dict(_warm_up_times)
+
+
+def loaded_groups():
+    """Return {group: True when all of its modules are imported in this process}."""
+    return {group: all(module in sys.modules for module in modules)
+            for group, modules in LAZY_GROUPS.items()}
+
+
+def import_times(module, python=sys.executable):
+    """Import module in a fresh interpreter and return its -X importtime records.
+
+    Returns {imported module: (cumulative seconds, depth)} for every
+    module loaded by the import, depth 0 being module itself.
+    """
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise ImportError(f"import {module} failed: {result.stderr.strip().splitlines()[-1]}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # Header line
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times[name.strip()] = (int(parts[1]) / 1e6, depth)
+    return times
+
+
+def import_report(top=10, python=sys.executable):
+    """Measure the app's cold-start imports and each lazily loaded module.
+
+    Each module is imported in its own fresh interpreter. Rows are dicts
+    with module, group ("startup" for the app and its slowest direct
+    imports), cumulative seconds and, for lazy modules, whether the app
+    import pulled them in anyway (which would be a startup regression).
+    """
+    app_times = import_times(APP_MODULE, python)
+    rows = [{"module": APP_MODULE, "group": "startup", "seconds": app_times[APP_MODULE][0]}]
+    direct = [(name, seconds) for name, (seconds, depth) in app_times.items() if depth == 1]
+    for name, seconds in sorted(direct, key=lambda item: item[1], reverse=True)[:top]:
+        rows.append({"module": name, "group": "startup", "seconds": seconds})
+
+    for group, modules in LAZY_GROUPS.items():
+        for module in modules:
+            try:
+                seconds = import_times(module, python)[module][0]
+            except ImportError:
+                seconds = None
+            rows.append({
+                "module": module,
+                "group": group,
+                "seconds": seconds,
+                "loaded_at_startup": module in app_times,
+            })
+    return rows
+
+
+def print_import_report(rows):
+    for row in rows:
+        seconds = "missing" if row["seconds"] is None else f"{row['seconds']:.3f}s"
+        note = "  (loaded at startup!)" if row.get("loaded_at_startup") else ""
+        print(f"  {row['group']:<10} {row['module']:<28} {seconds:>9}{note}")
+
+
+def main(argv=None):
+    """Pre-compile hook for container start: byte-compile and pre-cache the lazy stacks.
+
+    The imports run in this short-lived process, not in the Streamlit server,
+    so the server still imports the stacks on first use; it only finds their
+    bytecode already written and their files in the OS page cache.
+    """
+    parser = argparse.ArgumentParser(
+        description="Byte-compile and pre-cache the app's lazily loaded modules, or report import times."
+    )
+    parser.add_argument("-g", "--groups", nargs="+", choices=list(LAZY_GROUPS), default=None,
+                        help="Groups to pre-compile (default: all)")
+    parser.add_argument("--report", action="store_true",
+                        help="Print the import-time report instead of pre-compiling")
+    args = parser.parse_args(argv)
+
+    if args.report:
+        print_import_report(import_report())
+        return 0
+
+    for module, seconds in warm_up(args.groups).items():
+        print(f"  {module:<28} {'missing' if seconds is None else f'{seconds:.3f}s':>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+from processing import CADRE_MAPPINGS
+
+# Benchmark sizes by name
+SIZES = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+# Excel sheets hold at most this many rows (including the two header rows)
+XLSX_MAX_ROWS = 1_048_576 - 2
+
+DISTRICTS = [
+    "Karachi South", "Karachi East", "Karachi West", "Karachi Central", "Korangi",
+    "Malir", "Keamari", "Hyderabad", "Sukkur", "Larkana", "Jacobabad", "Quetta",
+    "Pishin", "Killa Abdullah", "Peshawar", "Bannu", "Lakki Marwat", "Tank",
+    "North Waziristan", "South Waziristan", "Lahore", "Rawalpindi", "Faisalabad",
+    "Multan", "Dera Ghazi Khan", "Islamabad",
+]
+
+# Numeric columns grouped under a shared top-level header in XLSX output
+ATTENDANCE_DAYS = ["Day 1", "Day 2", "Day 3"]
+
+
+def noisy_variants(designation):
+    """Spellings of a designation that are not in CADRE_MAPPINGS (mostly)."""
+    variants = [
+        designation.upper(),
+        f"{designation}-II",
+        f"{designation} ",
+        designation.replace(" ", ""),
+    ]
+    if designation.isupper() and 2 < len(designation) < 8:
+        variants.append(".".join(designation) + ".")
+    return [variant for variant in variants if variant != designation]
+
+
+def _pick(rng, n_rows, n_values, weights=None):
+    """Random codes in [0, n_values) with an optional skewed distribution."""
+    if weights is None:
+        return rng.integers(0, n_values, n_rows, dtype=np.int32)
+    return rng.choice(n_values, n_rows, p=weights / weights.sum()).astype(np.int32)
+
+
+def generate_eoc_frame(n_rows, seed=0, unmapped_fraction=0.05, duplicate_fraction=0.02,
+                       na_fraction=0.01):
+    """Generate a realistic EOC staff sheet.
+
+    Designations are drawn from CADRE_MAPPINGS with a long-tailed
+    distribution, with unmapped_fraction of the rows using noisy variants
+    instead. duplicate_fraction of the rows repeat earlier rows and
+    na_fraction of the cells in each column are missing.
+    """
+    rng = np.random.default_rng(seed)
+
+    known = list(CADRE_MAPPINGS)
+    variants = list(dict.fromkeys(
+        variant for designation in known for variant in noisy_variants(designation)
+    ))
+    designations = pd.Index(known + variants, dtype=object)
+
+    # Few designations (UCMO, Area Coordinator, ...) cover most of the staff
+    known_codes = _pick(rng, n_rows, len(known), 1.0 / np.arange(1, len(known) + 1))
+    variant_codes = len(known) + _pick(rng, n_rows, len(variants))
+    designation_codes = np.where(rng.random(n_rows) < unmapped_fraction, variant_codes, known_codes)
+
+    district_codes = _pick(rng, n_rows, len(DISTRICTS), rng.uniform(0.2, 1.0, len(DISTRICTS)))
+    uc_numbers = rng.integers(1, 400, n_rows)
+    columns = {
+        "district_name": district_codes,
+        "uc_name": uc_numbers,
+        "designation_title": designation_codes,
+        "staff_id": np.arange(1, n_rows + 1),
+        "age": rng.integers(20, 60, n_rows).astype(np.float64),
+        "monthly_salary": np.round(rng.lognormal(10.8, 0.4, n_rows), 0),
+    }
+    for day in ATTENDANCE_DAYS:
+        columns[day] = rng.integers(0, 2, n_rows).astype(np.float64)
+
+    # Duplicated rows copy every column of an earlier row
+    n_duplicates = int(n_rows * duplicate_fraction)
+    if n_duplicates:
+        targets = rng.choice(np.arange(1, n_rows), n_duplicates, replace=False)
+        sources = (rng.random(n_duplicates) * targets).astype(np.int64)
+        for values in columns.values():
+            values[targets] = values[sources]
+
+    df = pd.DataFrame({
+        "district_name": pd.Categorical.from_codes(columns["district_name"], categories=DISTRICTS),
+        "uc_name": pd.Series(columns["uc_name"]).map(lambda number: f"UC-{number}"),
+        "designation_title": pd.Categorical.from_codes(
+            columns["designation_title"], categories=designations
+        ),
+        "staff_id": columns["staff_id"],
+        "age": columns["age"],
+        "monthly_salary": columns["monthly_salary"],
+        **{day: columns[day] for day in ATTENDANCE_DAYS},
+    })
+
+    # Missing cells
+    if na_fraction:
+        for column in ["district_name", "designation_title", "age", "monthly_salary"]:
+            missing = rng.random(n_rows) < na_fraction
+            df.loc[missing, column] = np.nan
+    return df
+
+
+def two_level_header(columns):
+    """Return (top, bottom) header rows: attendance days share an "Attendance" cell."""
+    top, bottom = [], []
+    for column in columns:
+        if column in ATTENDANCE_DAYS:
+            # Merged cell: only the first column of the group carries the label
+            top.append("Attendance" if column == ATTENDANCE_DAYS[0] else None)
+            bottom.append(column)
+        else:
+            top.append(column)
+            bottom.append(None)
+    return top, bottom
+
+
+def write_eoc_file(df, path):
+    """Write df as CSV (single header) or XLSX (two-level header) depending on the extension."""
+    if path.lower().endswith(".csv"):
+        df.to_csv(path, index=False)
+        return path
+    if len(df) > XLSX_MAX_ROWS:
+        raise ValueError(f"XLSX sheets hold at most {XLSX_MAX_ROWS:,} data rows")
+
+    from openpyxl import Workbook
+
+    from exporters import iter_row_values
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title="EOC")
+    top, bottom = two_level_header(df.columns)
+    sheet.append(top)
+    sheet.append(bottom)
+    for row in iter_row_values(df):
+        sheet.append(row)
+    workbook.save(path)
+    return path
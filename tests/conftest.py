@@ -0,0 +1,51 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The app's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import processing
+from synthetic_data import generate_eoc_frame
+
+
+def assert_same_rows(actual, expected):
+    """Assert two processed frames hold the same columns, dtypes and values (index ignored)."""
+    assert list(actual.columns) == list(expected.columns)
+    assert len(actual) == len(expected)
+    for col in expected.columns:
+        assert actual[col].dtype == expected[col].dtype, col
+        left = actual[col].astype(object).to_numpy()
+        right = expected[col].astype(object).to_numpy()
+        assert ((left == right) | (pd.isna(left) & pd.isna(right))).all(), col
+
+
+@pytest.fixture
+def mapping_store(tmp_path):
+    return processing.get_mapping_store(str(tmp_path / "mappings.db"))
+
+
+@pytest.fixture
+def raw_frame():
+    return generate_eoc_frame(3000, seed=1)
+
+
+@pytest.fixture
+def processed_frame(raw_frame, mapping_store):
+    df = processing.clean_data(raw_frame)
+    return processing.map_designations(df, mapping_store.mappings(), mapping_store.version())
+
+
+@pytest.fixture
+def mixed_frame():
+    return pd.DataFrame({
+        "float": [1.0, 2.5, np.nan, 10.0] * 3,
+        "int": [1, 22, 3, 4] * 3,
+        "text": pd.Series(["Lahore", None, "nan", "UC-1"] * 3, dtype="str"),
+        "category": pd.Categorical(["UCMO", None, "TCO", "UCMO"] * 3),
+        "flag": [True, False, True, False] * 3,
+        "date": pd.to_datetime(["2024-01-01", None, "2024-02-03", "2024-01-01"] * 3),
+    })
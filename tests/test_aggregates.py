@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import NUMERIC_STATS, AggregateCube, AggregateStore
+from cadre_mapping import remap_changed
+
+
+def assert_same_cube(actual, expected):
+    assert actual.n_rows == expected.n_rows
+    assert actual.dims == expected.dims
+    for column in expected.dims:
+        pd.testing.assert_series_equal(
+            actual.value_counts(column).sort_index(), expected.value_counts(column).sort_index()
+        )
+    key = actual.dims + ["count"]
+    left = actual.counts.astype({column: object for column in actual.dims}).sort_values(actual.dims)
+    right = expected.counts.astype({column: object for column in expected.dims}).sort_values(expected.dims)
+    assert left[key].to_numpy().tolist() == right[key].to_numpy().tolist()
+    np.testing.assert_allclose(
+        actual.numeric_summary.loc[NUMERIC_STATS].to_numpy(dtype=float),
+        expected.numeric_summary.loc[NUMERIC_STATS].to_numpy(dtype=float),
+    )
+
+
+def test_remap_matches_rebuild(processed_frame, mapping_store):
+    before = mapping_store.version()
+    unmapped = processed_frame.loc[processed_frame["Cadre"] == "Unmapped", "designation_title"].unique()
+    changes = {"UCMO": "Town Level", str(unmapped[0]): "UC Level", str(unmapped[1]): "New Level"}
+    version, changed = mapping_store.update(changes, note="test")
+    assert changed == changes
+
+    store = AggregateStore(changes_since=mapping_store.changes_since)
+    store.cube(("data", before), processed_frame)
+    remapped_df = remap_changed(processed_frame.copy(), mapping_store.changes_since(before, version))
+    remapped = store.cube(("data", version), remapped_df)
+
+    assert store.stats["remaps"] == 1
+    assert_same_cube(remapped, AggregateCube.from_frame(remapped_df))
+
+
+def test_numeric_stat(processed_frame):
+    cube = AggregateCube.from_frame(processed_frame)
+    assert cube.numeric_stat("age", "mean") == processed_frame["age"].mean()
+    assert cube.numeric_stat("monthly_salary", "max") == processed_frame["monthly_salary"].max()
+    assert cube.numeric_stat("age", "count") == processed_frame["age"].count()
@@ -0,0 +1,34 @@
+import datetime
+
+import pandas as pd
+
+import processing
+from cleaning import MISSING_TEXT, clean_text_column
+
+
+def test_strip_and_fill():
+    series = pd.Series(["UCMO ", "UCMO", None, " TCO"], dtype=object)
+    cleaned = clean_text_column(series, as_category=True)
+
+    assert cleaned.tolist() == ["UCMO", "UCMO", MISSING_TEXT, "TCO"]
+    assert len(cleaned.cat.categories) == 3
+
+
+def test_columns_without_strings():
+    # Excel time cells and booleans with blanks are object columns holding no strings
+    times = pd.Series([datetime.time(9, 30), None, datetime.time(17, 0)], dtype=object)
+    flags = pd.Series([True, None, False], dtype=object)
+
+    assert clean_text_column(times, as_category=False).tolist() == [
+        datetime.time(9, 30), MISSING_TEXT, datetime.time(17, 0)
+    ]
+    assert clean_text_column(flags, as_category=True).tolist() == [True, MISSING_TEXT, False]
+
+
+def test_clean_data_keeps_numeric_dtypes(raw_frame):
+    df = processing.clean_data(raw_frame)
+
+    for col in raw_frame.select_dtypes("number").columns:
+        assert df[col].dtype == raw_frame[col].dtype, col
+    assert isinstance(df["district_name"].dtype, pd.CategoricalDtype)
+    assert not df["district_name"].isna().any()
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from columnar_store import ColumnarDataset
+from search_index import SEARCH_MODES, SearchIndex
+
+TERMS = ["1.0", "1", "nan", "ucmo", "lahore", "uc-1", "2024-01", "true", "n/a", "^uc-\\d$"]
+
+
+@pytest.mark.parametrize("frame", ["mixed_frame", "processed_frame"])
+def test_columnar_search_matches_index(tmp_path, request, frame):
+    df = request.getfixturevalue(frame)
+    index = SearchIndex(df)
+    dataset = ColumnarDataset.from_frame(df, str(tmp_path / "data.arrow"))
+
+    for term in TERMS:
+        for mode in SEARCH_MODES:
+            for columns in [None] + [[col] for col in df.columns]:
+                expected = index.search(term, columns, mode)
+                assert (dataset.search(term, columns, mode) == expected).all(), (term, mode, columns)
+
+
+def test_invalid_search(mixed_frame, tmp_path):
+    dataset = ColumnarDataset.from_frame(mixed_frame, str(tmp_path / "data.arrow"))
+    with pytest.raises(ValueError):
+        dataset.search("(", None, "Regex")
+    with pytest.raises(ValueError):
+        dataset.search("x", None, "Fuzzy")
+
+
+def test_store_stays_within_budget(mixed_frame, tmp_path):
+    first = ColumnarDataset.from_frame(mixed_frame, str(tmp_path / "first.arrow"))
+    # A budget below two copies keeps only the newest one
+    ColumnarDataset.from_frame(mixed_frame, str(tmp_path / "second.arrow"), max_mb=first.file_bytes * 1.5 / 2**20)
+
+    assert sorted(os.listdir(tmp_path)) == ["second.arrow"]
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from dedup import Deduplicator, SeenHashStore, column_hashes, row_hashes
+from synthetic_data import generate_eoc_frame
+
+
+def test_row_hashes_follow_row_equality():
+    df = pd.DataFrame({
+        "district_name": ["Lahore", "Lahore", "Quetta", "Lahore", None],
+        "staff_id": [1, 1, 1, 2, 3],
+        "age": [30.0, 30.0, 30.0, 30.0, np.nan],
+    })
+    hashes = row_hashes(df)
+
+    assert hashes.dtype == np.uint64
+    assert hashes[0] == hashes[1]
+    assert len(set(hashes[1:].tolist())) == 4
+    # Column order does not matter; keys are combined in name order
+    assert (row_hashes(df[["age", "staff_id", "district_name"]]) == hashes).all()
+    assert (row_hashes(df, ["staff_id"]) == row_hashes(df[["staff_id"]])).all()
+
+
+def test_column_hashes_ignore_dtype():
+    values = ["UCMO", "TCO", None, "UCMO"]
+    expected = column_hashes(pd.Series(values, dtype=object))
+
+    assert (column_hashes(pd.Series(values, dtype="category")) == expected).all()
+    assert (column_hashes(pd.Series([1, 2, 3])) == column_hashes(pd.Series([1.0, 2.0, 3.0]))).all()
+
+
+def test_seen_store_skips_earlier_uploads(tmp_path):
+    store = SeenHashStore(str(tmp_path))
+    first = pd.DataFrame({"staff_id": [1, 2, 3]})
+    second = pd.DataFrame({"staff_id": [3, 4]})
+
+    deduplicator = Deduplicator(store=store, source="first")
+    assert len(deduplicator.drop(first)) == 3
+    deduplicator.commit()
+
+    deduplicator = Deduplicator(store=store, source="second")
+    assert deduplicator.drop(second)["staff_id"].tolist() == [4]
+    assert deduplicator.stats["seen_before"] == 1
+    # An upload is never compared with its own hashes
+    assert len(Deduplicator(store=store, source="first").drop(first)) == 3
+
+
+def test_seen_store_fingerprint(tmp_path):
+    store = SeenHashStore(str(tmp_path))
+    empty = store.fingerprint()
+
+    store.save("first", row_hashes(pd.DataFrame({"staff_id": [1, 2]})))
+    assert store.fingerprint(exclude="first") == empty
+    with_first = store.fingerprint(exclude="second")
+    assert with_first != empty
+
+    store.clear()
+    assert store.summary() == {"uploads": 0, "hashes": 0}
+    assert store.generation() == 1
+    assert store.fingerprint(exclude="second") not in (empty, with_first)
+
+
+def test_duplicates_across_chunks_are_dropped():
+    df = generate_eoc_frame(1000, seed=5, duplicate_fraction=0.1)
+    deduplicator = Deduplicator()
+    kept = [deduplicator.drop(df.iloc[start:start + 250]) for start in range(0, len(df), 250)]
+
+    assert sum(len(chunk) for chunk in kept) == len(df.drop_duplicates())
+    assert deduplicator.stats["duplicates"] == len(df) - len(df.drop_duplicates())
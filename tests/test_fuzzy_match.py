@@ -0,0 +1,39 @@
+from fuzzy_match import FuzzyMatcher, normalize_designation, qgrams
+from processing import CADRE_MAPPINGS
+from synthetic_data import noisy_variants
+
+
+def test_qgrams_and_normalization():
+    assert qgrams("tco") == {"  t", " tc", "tco", "co "}
+    assert qgrams("ucmo") <= qgrams("ucmo officer")
+    assert normalize_designation("U.C.M.O-II ") == "ucmo"
+
+
+def test_noisy_variants_match_their_designation():
+    matcher = FuzzyMatcher(CADRE_MAPPINGS)
+    variants = {variant: designation for designation in CADRE_MAPPINGS for variant in noisy_variants(designation)}
+
+    suggestions = matcher.suggest_many(variants)
+
+    correct = sum(1 for variant, suggestion in suggestions.items()
+                  if suggestion is not None and suggestion[0] == variants[variant])
+    assert correct / len(variants) >= 0.9
+
+
+def test_exact_and_unrelated_designations():
+    matcher = FuzzyMatcher(CADRE_MAPPINGS)
+
+    assert matcher.suggest("  ucmo ") == ("UCMO", 1.0)
+    assert matcher.suggest("Zzqx Vwjk") is None
+
+
+def test_overlapping_vocabulary():
+    # Keys share most of their words, so every query gram hits many keys
+    words = ["district", "provincial", "officer", "coordinator", "facilitator", "surveillance", "monitor"]
+    keys = [f"{a} {b} {c}" for a in words for b in words for c in words if len({a, b, c}) == 3]
+    matcher = FuzzyMatcher(keys)
+
+    queries = {key.replace("o", "0", 1) + " ": key for key in keys[::7]}
+    suggestions = matcher.suggest_many(queries)
+
+    assert all(suggestions[query][0] == key for query, key in queries.items())
@@ -0,0 +1,66 @@
+import processing
+from aggregates import AggregateCube, AggregateStore
+from conftest import assert_same_rows
+from dedup import Deduplicator
+from incremental import DeltaState, find_new_rows, raw_row_hashes
+from synthetic_data import generate_eoc_frame
+from test_aggregates import assert_same_cube
+
+
+def test_find_new_rows():
+    raw = generate_eoc_frame(300, seed=4)
+    hashes = raw_row_hashes(raw)
+
+    new_rows, mode = find_new_rows(hashes, hashes[:200])
+    assert mode == "append" and new_rows.tolist() == list(range(200, 300))
+
+    shuffled = raw_row_hashes(raw.iloc[::-1])
+    new_rows, mode = find_new_rows(shuffled, hashes[:200])
+    assert mode == "hash"
+    assert set(shuffled[new_rows].tolist()) == set(hashes[200:].tolist()) - set(hashes[:200].tolist())
+    # Removing earlier rows means the upload must be processed in full
+    assert find_new_rows(hashes[100:], hashes[:200]) is None
+
+
+def test_delta_state_round_trip(tmp_path):
+    state = DeltaState(str(tmp_path))
+    assert state.load("lineage") is None
+
+    hashes = raw_row_hashes(generate_eoc_frame(50, seed=4))
+    state.save("lineage", hashes, hashes[::-1], columns=["a"], cache_key="key")
+    saved = state.load("lineage")
+
+    assert (saved["raw_hashes"] == hashes).all()
+    assert (saved["kept_hashes"] == sorted(hashes)).all()
+    assert saved["columns"] == ["a"] and saved["cache_key"] == "key"
+
+
+def test_incremental_append_matches_full_reprocess(mapping_store):
+    mappings, version = mapping_store.mappings(), mapping_store.version()
+    raw = generate_eoc_frame(3300, seed=3)
+    earlier = raw.iloc[:3000]
+
+    deduplicator = Deduplicator()
+    previous = processing.clean_data(earlier, deduplicator=deduplicator)
+    previous = processing.map_designations(previous, mappings, version)
+
+    new_rows, mode = find_new_rows(raw_row_hashes(raw), raw_row_hashes(earlier))
+    assert mode == "append" and len(new_rows) == 300
+    delta_deduplicator = Deduplicator()
+    delta_deduplicator.remember(deduplicator.kept_hashes())
+    combined, delta = processing.process_delta(raw, previous, new_rows, mappings, version, delta_deduplicator)
+
+    full = processing.map_designations(processing.clean_data(raw), mappings, version)
+    assert_same_rows(combined, full)
+    assert combined.index.equals(full.index)
+    assert combined.attrs["dedup_report"] == full.attrs["dedup_report"]
+
+
+def test_cube_append_matches_rebuild(processed_frame):
+    head, tail = processed_frame.iloc[:2000], processed_frame.iloc[2000:]
+
+    store = AggregateStore()
+    appended = store.append(("data", 2), ("data", 1), head, tail, processed_frame)
+
+    assert store.stats["appends"] == 1
+    assert_same_cube(appended, AggregateCube.from_frame(processed_frame))
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import pytest
+
+import llm
+import llm_batch
+from aggregates import AggregateStore
+
+DATASET_KEY = ("dataset", 1)
+
+# Open-ended questions are never answered locally, so they all reach the backend
+QUESTIONS = [f"Why does district {n} differ from the others?" for n in range(8)]
+
+
+class TrackingBackend(llm.FakeBackend):
+    """FakeBackend that records call start times and the most calls in flight at once."""
+
+    def __init__(self, latency=0.0, failures=0):
+        super().__init__(latency=latency)
+        self.failures = failures
+        self.starts = []
+        self.active = 0
+        self.max_active = 0
+
+    async def ainvoke(self, prompt):
+        self.starts.append(time.monotonic())
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("backend unavailable")
+            return await super().ainvoke(prompt)
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_batch, "LLM_RETRY_BACKOFF_SECONDS", 0.0)
+
+
+def run(df, backend, questions=QUESTIONS, **options):
+    options.setdefault("rate_per_minute", 0)
+    return llm_batch.run_questions(df, questions, DATASET_KEY, backend, AggregateStore(), **options)
+
+
+def test_concurrency_limit(processed_frame):
+    backend = TrackingBackend(latency=0.05)
+    results = run(processed_frame, backend, concurrency=3)
+
+    assert backend.max_active == 3
+    assert [result["response"] for result in results] == [f"[fake] {q}" for q in QUESTIONS]
+    assert all(result["source"] == "llm" and result["error"] is None for result in results)
+
+
+def test_retry_after_failures(processed_frame):
+    backend = TrackingBackend(failures=2)
+    result, = run(processed_frame, backend, QUESTIONS[:1], retries=2)
+
+    assert result["error"] is None
+    assert result["attempts"] == 3
+    assert result["response"] == f"[fake] {QUESTIONS[0]}"
+
+
+def test_gives_up_after_retries(processed_frame):
+    backend = TrackingBackend(failures=5)
+    result, = run(processed_frame, backend, QUESTIONS[:1], retries=1)
+
+    assert result["attempts"] == 2
+    assert result["response"] is None
+    assert result["error"] == "backend unavailable"
+
+
+def test_timeout(processed_frame):
+    backend = llm.FakeBackend(latency=1.0)
+    start = time.perf_counter()
+    result, = run(processed_frame, backend, QUESTIONS[:1], timeout=0.05, retries=0)
+
+    assert time.perf_counter() - start < 0.5
+    assert result["response"] is None
+    assert result["error"].startswith("Timed out")
+
+
+def test_rate_limit_spaces_out_starts(processed_frame):
+    backend = TrackingBackend()
+    # 600 per minute: one start every 0.1s, whatever the concurrency
+    run(processed_frame, backend, QUESTIONS[:4], concurrency=4, rate_per_minute=600)
+
+    gaps = [later - earlier for earlier, later in zip(backend.starts, backend.starts[1:])]
+    assert len(gaps) == 3
+    assert min(gaps) >= 0.09
+
+
+def test_rate_limiter_without_limit():
+    async def acquire_many():
+        limiter = llm_batch.RateLimiter(0)
+        await asyncio.gather(*(limiter.acquire() for _ in range(20)))
+
+    start = time.perf_counter()
+    asyncio.run(acquire_many())
+    assert time.perf_counter() - start < 0.05
+
+
+def test_local_and_cached_answers_skip_backend(processed_frame):
+    backend = TrackingBackend()
+    cache = llm.ResponseCache()
+    questions = ["How many total records are in the dataset?", QUESTIONS[0]]
+
+    first = run(processed_frame, backend, questions, response_cache=cache)
+    second = run(processed_frame, backend, questions, response_cache=cache)
+
+    assert [result["source"] for result in first] == ["local", "llm"]
+    assert [result["source"] for result in second] == ["local", "cache"]
+    assert second[1]["response"] == first[1]["response"]
+    assert backend.calls == 1
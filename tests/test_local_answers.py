@@ -0,0 +1,46 @@
+import pytest
+
+from aggregates import AggregateStore
+from local_answers import answer_locally
+
+DATASET_KEY = ("dataset", 1)
+
+
+def answer(df, question):
+    result = answer_locally(df, question, DATASET_KEY, AggregateStore())
+    return None if result is None else result[1]
+
+
+@pytest.mark.parametrize("question, intent", [
+    ("How many total records are in the dataset?", "total"),
+    ("How many rows?", "total"),
+    ("What is the exact count and percentage for each Cadre level?", "breakdown:Cadre"),
+    ("What is the most common Cadre level?", "top:Cadre"),
+    ("What percentage of staff is at the District Level?", "percent:Cadre"),
+    ("How many unmapped designations are there?", "unmapped"),
+    ("What is the average age?", "mean:age"),
+    ("What is the maximum monthly salary?", "max:monthly_salary"),
+])
+def test_answered_locally(processed_frame, question, intent):
+    assert answer(processed_frame, question) == intent
+
+
+@pytest.mark.parametrize("question", [
+    "How many rows are duplicated?",
+    "How many staff are in Karachi?",
+    "How many records per Cadre are in Karachi South?",
+    "How many UCMO are older than 40?",
+    "What is the average age per district?",
+    "What is the highest monthly salary of UCMO?",
+    "Why are some designations unmapped?",
+])
+def test_qualified_questions_go_to_llm(processed_frame, question):
+    assert answer(processed_frame, question) is None
+
+
+def test_local_numbers(processed_frame):
+    total, _ = answer_locally(processed_frame, "How many total records?", DATASET_KEY, AggregateStore())
+    assert f"{len(processed_frame):,}" in total
+
+    mean, _ = answer_locally(processed_frame, "What is the average age?", DATASET_KEY, AggregateStore())
+    assert f"{processed_frame['age'].mean():,.2f}" in mean
@@ -0,0 +1,31 @@
+import processing
+from cadre_mapping import UNMAPPED, remap_changed
+
+
+def test_versions_and_changes(mapping_store):
+    first = mapping_store.version()
+    version, changed = mapping_store.update({"TCO": "UC Level", "UCMO": "UC Level", "New Post": "Town Level"})
+
+    assert version == first + 1
+    # UCMO already maps to UC Level, so only real changes are recorded
+    assert changed == {"TCO": "UC Level", "New Post": "Town Level"}
+    assert mapping_store.changes_since(first) == changed
+    assert mapping_store.mappings(first)["TCO"] == "Town Level"
+    assert mapping_store.mappings()["TCO"] == "UC Level"
+
+
+def test_mapping_uses_unique_designations(processed_frame, mapping_store):
+    mappings = mapping_store.mappings()
+    expected = processed_frame["designation_title"].astype(object).map(mappings).fillna(UNMAPPED)
+
+    assert (processed_frame["Cadre"].astype(object) == expected).all()
+
+
+def test_remapped_frame_matches_fresh_mapping(processed_frame, mapping_store):
+    before = mapping_store.version()
+    version, _ = mapping_store.update({"TCO": "UC Level"})
+
+    remapped = remap_changed(processed_frame.copy(), mapping_store.changes_since(before, version))
+    fresh = processing.map_designations(processed_frame.drop(columns="Cadre"), mapping_store.mappings(), version)
+
+    assert (remapped["Cadre"].astype(object) == fresh["Cadre"].astype(object)).all()
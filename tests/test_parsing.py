@@ -0,0 +1,44 @@
+import pytest
+from openpyxl import load_workbook
+
+import processing
+from synthetic_data import generate_eoc_frame, write_eoc_file
+
+
+@pytest.fixture
+def workbook_with_notes(tmp_path):
+    """A data sheet followed by a one-line notes sheet without the two header rows."""
+    path = write_eoc_file(generate_eoc_frame(200, seed=1), str(tmp_path / "eoc.xlsx"))
+    workbook = load_workbook(path)
+    workbook.create_sheet("Notes").append(["Prepared by EOC"])
+    workbook.save(path)
+    return path
+
+
+def test_bad_sheet_is_skipped(workbook_with_notes):
+    df = processing.parse_uploads([(workbook_with_notes, "eoc.xlsx")], all_sheets=True, workers=1)
+
+    assert len(df) == 200
+    skipped, = df.attrs["skipped_sheets"]
+    assert "Notes" in skipped
+
+
+def test_skipped_sheets_survive_processing(workbook_with_notes, mapping_store):
+    df = processing.process_file(
+        workbook_with_notes, mapping_store.mappings(), mapping_store.version(), all_sheets=True
+    )
+
+    assert "Cadre" in df.columns
+    assert len(df.attrs["skipped_sheets"]) == 1
+
+
+def test_upload_fails_when_no_sheet_parses(tmp_path):
+    from openpyxl import Workbook
+
+    path = str(tmp_path / "notes.xlsx")
+    workbook = Workbook()
+    workbook.active.append(["Prepared by EOC"])
+    workbook.save(path)
+
+    with pytest.raises(ValueError):
+        processing.parse_uploads([(path, "notes.xlsx")], all_sheets=True, workers=1)
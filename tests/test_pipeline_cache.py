@@ -0,0 +1,44 @@
+import os
+
+import pandas as pd
+
+from conftest import assert_same_rows
+from pipeline_cache import PipelineCache, prune_files
+
+
+def test_cache_returns_copy_on_write_frames(processed_frame, tmp_path):
+    cache = PipelineCache(spill_dir=str(tmp_path))
+    cache.put("key", processed_frame)
+
+    df = cache.get("key")
+    df.loc[df.index[0], "age"] = -1
+    assert cache.get("key").loc[df.index[0], "age"] == processed_frame.loc[df.index[0], "age"]
+    assert cache.get("other") is None
+    assert cache.stats["hits"] == 2 and cache.stats["misses"] == 1
+
+
+def test_spill_round_trip_keeps_index_and_dtypes(processed_frame, tmp_path):
+    # Deduplicated frames have index gaps; drop some rows to be sure
+    df = processed_frame.drop(processed_frame.index[1::7])
+    df["remarks"] = pd.Series("Transferred", index=df.index, dtype=object)
+    cache = PipelineCache(max_mb=0, spill_dir=str(tmp_path))
+    cache.put("first", df)
+    cache.put("second", df.head())
+
+    assert os.path.exists(tmp_path / "first.parquet")
+    reloaded = PipelineCache(spill_dir=str(tmp_path)).get("first")
+    assert_same_rows(reloaded, df)
+    assert reloaded.index.equals(df.index)
+    assert reloaded["Cadre"].cat.categories.dtype == object
+
+
+def test_spill_files_stay_within_budget(tmp_path):
+    for n, name in enumerate(["old", "middle", "new"]):
+        path = tmp_path / f"{name}.parquet"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (n, n))
+
+    removed = prune_files(str(tmp_path), ".parquet", 250, keep=[str(tmp_path / "old.parquet")])
+
+    assert removed == [str(tmp_path / "middle.parquet")]
+    assert sorted(os.listdir(tmp_path)) == ["new.parquet", "old.parquet"]
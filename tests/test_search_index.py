@@ -0,0 +1,21 @@
+import numpy as np
+
+from search_index import SearchIndex
+
+
+def test_search_matches_text_of_values(mixed_frame):
+    index = SearchIndex(mixed_frame)
+
+    assert index.search("1.0", ["float"], "Exact").tolist() == [True, False, False, False] * 3
+    # Like DataFrame.astype(str), missing values stay missing and only the text "nan" matches
+    assert index.search("nan", None, "Exact").tolist() == [False, False, True, False] * 3
+    assert not index.search("nan", ["float", "category", "date"]).any()
+    assert index.search("ucmo", ["category"]).sum() == 6
+    assert not index.search("zzz").any()
+
+
+def test_search_codes_are_compact(processed_frame):
+    index = SearchIndex(processed_frame)
+
+    assert index._codes["district_name"].dtype == np.int8
+    assert index._codes["staff_id"].dtype == np.int16
@@ -0,0 +1,19 @@
+import pytest
+
+from settings import env_flag
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1", True), ("true", True), (" Yes ", True), ("0", False), ("false", False), ("off", False),
+])
+def test_env_flag(monkeypatch, value, expected):
+    monkeypatch.setenv("TEST_FLAG", value)
+    assert env_flag("TEST_FLAG") is expected
+
+
+def test_env_flag_default(monkeypatch):
+    monkeypatch.delenv("TEST_FLAG", raising=False)
+    assert env_flag("TEST_FLAG") is False
+    assert env_flag("TEST_FLAG", default=True) is True
+    monkeypatch.setenv("TEST_FLAG", "")
+    assert env_flag("TEST_FLAG", default=True) is True
@@ -0,0 +1,55 @@
+import functools
+
+import numpy as np
+import pytest
+
+import ingestion
+import processing
+from cleaning import MISSING_TEXT
+from conftest import assert_same_rows
+from synthetic_data import write_eoc_file
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """Stream in 700-row chunks so a few thousand rows span several chunks."""
+    stream_process = functools.partial(ingestion.stream_process, chunk_rows=700)
+    monkeypatch.setattr(processing, "stream_process", stream_process)
+
+
+def stream_and_read(path, mapping_store):
+    mappings, version = mapping_store.mappings(), mapping_store.version()
+    chunks = []
+    streamed = processing.stream_and_process_file(
+        path, mappings, version, on_chunk=lambda chunk, progress, rows: chunks.append(rows)
+    )
+    full = processing.process_file(path, mappings, version)
+    assert len(chunks) > 1
+    return streamed, full
+
+
+@pytest.mark.parametrize("extension", [".csv", ".xlsx"])
+def test_streaming_matches_full_read(tmp_path, raw_frame, mapping_store, small_chunks, extension):
+    path = write_eoc_file(raw_frame, str(tmp_path / f"eoc{extension}"))
+    streamed, full = stream_and_read(path, mapping_store)
+
+    assert_same_rows(streamed, full)
+    assert streamed.attrs["dedup_report"] == full.attrs["dedup_report"]
+    assert streamed.attrs["mapping_version"] == mapping_store.version()
+
+
+def test_sparse_text_column_matches_full_read(tmp_path, raw_frame, mapping_store, small_chunks):
+    # Remarks only appear in the second chunk, so the other chunks read the column as float64
+    raw_frame["remarks"] = np.nan
+    raw_frame["remarks"] = raw_frame["remarks"].astype(object)
+    raw_frame.loc[700:899, "remarks"] = "Transferred"
+    # Repeat a row from the first chunk in the last one, with a remark in neither copy
+    raw_frame.loc[len(raw_frame) - 1] = raw_frame.loc[0]
+    path = write_eoc_file(raw_frame, str(tmp_path / "eoc.csv"))
+
+    streamed, full = stream_and_read(path, mapping_store)
+
+    assert_same_rows(streamed, full)
+    assert streamed.attrs["dedup_report"] == full.attrs["dedup_report"]
+    assert not streamed["remarks"].isna().any()
+    assert (streamed["remarks"] == MISSING_TEXT).sum() == (full["remarks"] == MISSING_TEXT).sum()
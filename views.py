@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Page sizes offered by the data preview
+PAGE_SIZES = [25, 50, 100, 250, 500, 1000]
+
+# Filtered views whose row positions are kept (per process)
+VIEW_CACHE_SIZE = 16
+
+
+def combine_masks(masks):
+    """AND together boolean row masks, skipping None; None when there are none."""
+    combined = None
+    for mask in masks:
+        if mask is None:
+            continue
+        combined = mask if combined is None else combined & mask
+    return combined
+
+
+def mask_positions(mask):
+    """Row positions selected by a mask (None selects every row)."""
+    if mask is None:
+        return None
+    positions = np.flatnonzero(mask)
+    # Half the memory for the positions of any realistic sheet
+    if len(mask) < np.iinfo(np.int32).max:
+        positions = positions.astype(np.int32)
+    return positions
+
+
+def page_count(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
+
+
+class FrameView:
+    """Rows of a DataFrame selected by position, without copying the frame.
+
+    Pages are taken with iloc from the selected positions, so showing a page
+    costs only its rows; to_pandas() copies all selected rows and is meant
+    for exports.
+    """
+
+    def __init__(self, df, positions=None):
+        self.df = df
+        self.positions = positions
+        self.attrs = {}
+
+    def __len__(self):
+        return len(self.df) if self.positions is None else len(self.positions)
+
+    @property
+    def columns(self):
+        return self.df.columns
+
+    def page(self, number, size, columns=None):
+        """Return page `number` (from 0) of `size` rows, limited to columns."""
+        frame = self.df if columns is None else self.df[list(columns)]
+        start = number * size
+        if self.positions is None:
+            return frame.iloc[start:start + size]
+        return frame.iloc[self.positions[start:start + size]]
+
+    def head(self, n, columns=None):
+        return self.page(0, n, columns)
+
+    def to_pandas(self):
+        frame = self.df if self.positions is None else self.df.iloc[self.positions]
+        frame = frame.copy()
+        frame.attrs = {**self.df.attrs, **self.attrs}
+        return frame
+
+
+class ViewCache:
+    """LRU of the row positions of recent filtered views, keyed by (dataset, view)."""
+
+    def __init__(self, max_entries=VIEW_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key):
+        """Return (True, positions) on a hit, (False, None) on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return True, self._entries[key]
+            self.stats["misses"] += 1
+            return False, None
+
+    def put(self, key, positions):
+        with self._lock:
+            self._entries[key] = positions
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)